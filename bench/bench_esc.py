@@ -0,0 +1,96 @@
+"""
+  bench_esc.py
+  页面最后一步(转义非ascii字符, title 不转义, 编码写出)的微基准: 原来的逐字符算法 vs 现在的 Html2Chm.finish_page_src
+
+  用真实的页面: 取 docs zip 中的html页面源码, 两种算法各处理若干遍, 比较耗时, 并确认结果一样
+  用法: python bench\bench_esc.py python-3.11.9-docs-html.zip [遍数]
+
+History
+2026-10-18: created
+"""
+import html
+import sys
+import time
+import zipfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+from html2chm import *
+
+
+def html_esc_ex_v1(orig_str, esc_html_sym, esc_non_ascii) -> str:
+    """ 原来的 nphtml.html_esc_ex, 逐个字符 ord() 判断 """
+    rst = orig_str
+    if esc_html_sym:
+        rst = html.escape(rst, False)
+        rst = rst.replace('"', '&quot;')
+        rst = rst.replace("'", '&apos;')
+
+    if esc_non_ascii:
+        str_list = []
+        begin = -1
+        for i in range(0, len(orig_str)):
+            char = rst[i]
+            if ord(char) > 127:
+                if begin > -1:
+                    str_list.append(rst[begin:i])
+                    begin = -1
+                str_list.append(f'&#{ord(char)};')
+            elif begin == -1:
+                begin = i
+        if begin == 0:
+            return rst
+        elif begin > 0:
+            str_list.append(rst[begin::])
+        rst = ''.join(str_list)
+    return rst
+
+
+def finish_page_src_v1(html_src: str, tit: str) -> bytes:
+    """ 原来的做法: 整页转义, 再找 title 拼接, 最后再编码一遍(原来由 write_text 完成) """
+    html_src = html_esc_ex_v1(html_src, False, True)
+    pos_1 = html_src.find('<title>')
+    pos_2 = html_src.find('</title>')
+    tit = html_esc_ex_v1(tit, True, False)
+    return (html_src[:pos_1] + '<title>' + tit + html_src[pos_2:]).encode(Html2Chm.PAGE_CS)
+
+
+def load_pages(src_zip) -> list:
+    """ [(页面源码, title), ...] """
+    pages = []
+    with zipfile.ZipFile(src_zip, 'r') as zip_ref:
+        for name in zip_ref.namelist():
+            if not name.endswith('.html'):
+                continue
+            src_ = zip_ref.read(name).decode('utf-8')
+            if (pos_1 := src_.find('<title>')) == -1:
+                continue
+            tit = src_[pos_1 + 7:src_.find('</title>')].rsplit('—', 1)[0].strip()
+            pages.append((src_, html.unescape(tit)))
+    return pages
+
+
+def bench(func, pages, rounds) -> float:
+    t = time.perf_counter()
+    for _ in range(rounds):
+        for src_, tit in pages:
+            func(src_, tit)
+    return time.perf_counter() - t
+
+
+def main():
+    pages = load_pages(sys.argv[1])
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    for src_, tit in pages:
+        assert finish_page_src_v1(src_, tit) == Html2Chm.finish_page_src(src_, tit)
+
+    size = sum(len(src_) for src_, _ in pages)
+    non_ascii = sum(not src_.isascii() for src_, _ in pages)
+    print(f'{len(pages)} pages, {size / 1e6:.1f}M chars, {non_ascii} pages with non-ascii chars, {rounds} rounds')
+    t_v1 = bench(finish_page_src_v1, pages, rounds)
+    t_v2 = bench(Html2Chm.finish_page_src, pages, rounds)
+    print(f'per-char loop : {t_v1:.3f}s')
+    print(f'single pass   : {t_v2:.3f}s  ({t_v1 / t_v2:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+  bench_import.py
+  src 下各模块的 import 耗时预算检查: 每个模块在新的解释器中 import, 取 -X importtime 报告的累计耗时,
+  超出预算或 import 有副作用时返回 1, 可用于提交前的检查
+
+  进程池的每个工作进程都要 import 一遍 html2chm 及其依赖, 所以 import 要便宜, 且不能有副作用:
+    不能在当前目录下生成文件(日志文件等), 不能配置根日志(basicConfig), 不能给 bs4.Tag 附加猴子方法
+  每个模块跑若干遍取最快的一遍(第一遍含 .pyc 编译, 不计), 在空的临时目录中运行
+  结果写到 bench/results/import-<label>.json, label 默认为当前 git 提交
+
+  用法:
+    python bench\bench_import.py
+    python bench\bench_import.py --modules nipow nphtml --scale 2
+
+History
+2026-10-18: created
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / 'src'
+sys.path.insert(0, str(SRC_DIR))
+from bench_pipeline import git_rev
+
+# 各模块 import 的累计耗时预算(ms), 含 bs4, lxml 等第三方库
+BUDGETS = {
+    'nipow': 60,
+    'nplzx': 30,
+    'nplinks': 60,
+    'npminify': 30,
+    'npitsf': 90,
+    'npchmread': 120,
+    'hhawrap': 90,
+    'nphtml': 250,
+    'npchmutil': 250,
+    'npsphinx': 250,
+    'html2chm': 450,
+}
+
+# 在子进程中 import 后检查副作用, 结果以 json 输出到 stdout
+_PROBE = '''
+import sys
+sys.path.insert(0, {src!r})
+import {mod}
+import json, logging
+bs4 = sys.modules.get('bs4')
+print(json.dumps({{'root_handlers': len(logging.getLogger().handlers),
+                  'tag_patched': bool(bs4) and any(hasattr(bs4.Tag, n) for n in ('delete', 'delete_all'))}}))
+'''
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$')
+
+
+def import_once(mod: str) -> dict:
+    """ 在新的解释器, 空的临时目录中 import 一遍 """
+    with tempfile.TemporaryDirectory(prefix='bench_import_') as tmp:
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', _PROBE.format(src=str(SRC_DIR), mod=mod)],
+                              cwd=tmp, capture_output=True, text=True)
+        created = sorted(os.listdir(tmp))
+    if proc.returncode != 0:
+        return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f'exit {proc.returncode}'}
+    cumulative, self_us = None, {}
+    for line in proc.stderr.splitlines():
+        if m := _IMPORTTIME_RE.match(line):
+            self_us[m.group(4)] = int(m.group(1))
+            if m.group(4) == mod and len(m.group(3)) == 1:  # 顶层的那一行
+                cumulative = int(m.group(2))
+    probe = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {'ms': round(cumulative / 1000, 1) if cumulative is not None else None, 'created': created,
+            'top': sorted(self_us.items(), key=lambda kv: -kv[1])[:5], **probe}
+
+
+def check_one(mod: str, rounds: int, budget: float) -> dict:
+    """ 一个模块: 先预热一遍, 再跑 rounds 遍取最快的, 与预算比较 """
+    import_once(mod)
+    runs = [import_once(mod) for _ in range(rounds)]
+    if err := next((run['error'] for run in runs if 'error' in run), None):
+        return {'module': mod, 'error': err, 'ok': False}
+    best = min(runs, key=lambda run: run['ms'])
+    problems = []
+    if best['ms'] > budget:
+        problems.append(f'{best["ms"]}ms > {budget}ms')
+    if created := sorted({fn for run in runs for fn in run['created']}):
+        problems.append(f'created {created}')
+    if any(run['root_handlers'] for run in runs):
+        problems.append('root logger configured')
+    if any(run['tag_patched'] for run in runs):
+        problems.append('bs4.Tag patched')
+    return {'module': mod, 'ms': best['ms'], 'budget': budget, 'top': best['top'], 'problems': problems,
+            'ok': not problems}
+
+
+def main():
+    ap = argparse.ArgumentParser(description='src 下各模块的 import 耗时预算检查')
+    ap.add_argument('--modules', nargs='+', default=list(BUDGETS), help='要检查的模块')
+    ap.add_argument('--rounds', type=int, default=3)
+    ap.add_argument('--scale', type=float, default=1.0, help='预算的倍数, 慢的机器上可放宽')
+    ap.add_argument('--label', help='结果的名字, 默认为当前 git 提交')
+    ap.add_argument('--out', default=str(BENCH_DIR / 'results'), help='结果保存的目录')
+    args = ap.parse_args()
+
+    results = [check_one(mod, args.rounds, round(BUDGETS.get(mod, 100) * args.scale, 1)) for mod in args.modules]
+    print(f'{"module":<12s}{"ms":>9s}{"budget":>9s}  result')
+    for rst in results:
+        if 'error' in rst:
+            print(f'{rst["module"]:<12s}{"":>9s}{"":>9s}  ERROR {rst["error"]}')
+            continue
+        print(f'{rst["module"]:<12s}{rst["ms"]:>9.1f}{rst["budget"]:>9.1f}  '
+              + ('ok' if rst['ok'] else 'FAILED ' + '; '.join(rst['problems'])))
+
+    label = args.label or git_rev()
+    out_fn = Path(args.out, f'import-{label}.json')
+    out_fn.parent.mkdir(parents=True, exist_ok=True)
+    out_fn.write_text(json.dumps({'label': label, 'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                                  'python': platform.python_version(), 'platform': platform.platform(),
+                                  'params': {k: v for k, v in vars(args).items() if k not in ('out', 'label')},
+                                  'results': results}, ensure_ascii=False, indent=2), 'utf-8')
+    print(f'saved to {out_fn}')
+    sys.exit(0 if all(rst['ok'] for rst in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+  bench_lzx.py
+  chm 内容段压缩(nplzx.compress)的基准: 'stored' 与 'lzx' 各级别, 串行与进程池并行, 比较耗时, 吞吐量与压缩率
+
+  数据与 npitsf 编译时的第1段相似: 文档包中各html页面依次拼接(不经过 Html2Chm 的处理), 可用 --mb 只取前面一部分.
+  不指定 --zip 时用 gen_sphinx_docs.py 生成合成的文档包.
+  每种组合跑若干遍取最快的一遍, --verify 时用 nplzx.LzxDecoder 解压一遍, 确认与原数据相同
+  结果写到 bench/results/lzx-<label>.json, label 默认为当前 git 提交
+
+  用法:
+    python bench\bench_lzx.py --mb 4 --workers 0 4 --levels fast default best
+    python bench\bench_lzx.py --zip python-3.11.9-docs-html.zip --verify
+
+History
+2026-10-18: created
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'src'))
+import nplzx
+from bench_pipeline import git_rev
+from gen_sphinx_docs import gen_docs_zip
+
+
+def load_stream(src_zip, max_mb: float) -> bytes:
+    """ 文档包中的 html 页面依次拼接, 不超过 max_mb """
+    limit = int(max_mb * 1e6) if max_mb else None
+    parts, size = [], 0
+    with zipfile.ZipFile(src_zip, 'r') as zip_ref:
+        for name in zip_ref.namelist():
+            if name.endswith('.html'):
+                parts.append(zip_ref.read(name))
+                size += len(parts[-1])
+                if limit and size >= limit:
+                    break
+    return b''.join(parts)[:limit]
+
+
+def verify(data: bytes, comp: bytes, frame_offs: list) -> bool:
+    """ 逐个复位区间解压, 与原数据比较 """
+    dec = nplzx.LzxDecoder()
+    starts = frame_offs[::nplzx.RESET_FRAMES] + [len(comp)]
+    out = bytearray()
+    for k in range(len(starts) - 1):
+        out += dec.decompress_interval(comp[starts[k]:starts[k + 1]], min(nplzx.RESET_SIZE, len(data) - len(out)),
+                                       len(out))
+    return out == data
+
+
+def bench_one(data: bytes, mode, level, workers, rounds, check) -> dict:
+    """ 一种组合: 跑 rounds 遍取最快的; workers > 0 时用进程池(池的启动不计时) """
+    pool = ProcessPoolExecutor(workers) if workers > 0 else None
+    try:
+        if pool is not None:
+            list(pool.map(abs, range(workers)))  # 先把工作进程启动起来
+        best = None
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            comp, frame_offs = nplzx.compress(data, mode, level, pool)
+            secs = time.perf_counter() - t0
+            best = secs if best is None else min(best, secs)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    rst = {'mode': mode, 'level': level if mode == 'lzx' else '', 'workers': workers, 'secs': round(best, 4),
+           'mb_per_sec': round(len(data) / best / 1e6, 3), 'comp_size': len(comp),
+           'ratio': round(len(comp) / len(data), 4)}
+    if check:
+        rst['verified'] = verify(data, comp, frame_offs)
+    return rst
+
+
+def main():
+    ap = argparse.ArgumentParser(description='nplzx 压缩基准')
+    ap.add_argument('--zip', help='文档包, 不指定时生成合成的文档包')
+    ap.add_argument('--pages', type=int, default=200, help='合成文档包的内容页数')
+    ap.add_argument('--mb', type=float, default=4, help='最多取多少 MB 的页面, 0: 全部')
+    ap.add_argument('--levels', nargs='+', default=list(nplzx.LEVELS), choices=list(nplzx.LEVELS))
+    ap.add_argument('--workers', nargs='+', type=int, default=[0, os.cpu_count()], help='进程数, 0: 串行')
+    ap.add_argument('--rounds', type=int, default=1)
+    ap.add_argument('--verify', action='store_true', help='解压一遍, 确认与原数据相同')
+    ap.add_argument('--label', help='结果的名字, 默认为当前 git 提交')
+    ap.add_argument('--out', default=str(BENCH_DIR / 'results'), help='结果保存的目录')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_lzx_') as tmp:
+        src_zip = args.zip or gen_docs_zip(Path(tmp), '3.11.9', pages=args.pages)
+        data = load_stream(src_zip, args.mb)
+    print(f'stream: {len(data) / 1e6:.2f} MB, cpu_count: {os.cpu_count()}')
+
+    results = [bench_one(data, 'stored', 'default', 0, args.rounds, args.verify)]
+    for level in args.levels:
+        for workers in args.workers:
+            results.append(bench_one(data, 'lzx', level, workers, args.rounds, args.verify))
+
+    base = results[0]['secs']
+    print(f'{"mode":<8s}{"level":<9s}{"workers":>8s}{"secs":>10s}{"MB/s":>9s}{"ratio":>8s}{"vs stored":>11s}')
+    for rst in results:
+        print(f'{rst["mode"]:<8s}{rst["level"]:<9s}{rst["workers"]:>8d}{rst["secs"]:>10.3f}{rst["mb_per_sec"]:>9.2f}'
+              f'{rst["ratio"]:>8.3f}{rst["secs"] / base:>10.1f}x' + ('' if rst.get('verified', True) else '  VERIFY FAILED'))
+
+    label = args.label or git_rev()
+    out_fn = Path(args.out, f'lzx-{label}.json')
+    out_fn.parent.mkdir(parents=True, exist_ok=True)
+    out_fn.write_text(json.dumps({'label': label, 'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                                  'python': platform.python_version(), 'platform': platform.platform(),
+                                  'cpu_count': os.cpu_count(), 'stream_size': len(data),
+                                  'params': {k: v for k, v in vars(args).items() if k not in ('out', 'label')},
+                                  'results': results}, ensure_ascii=False, indent=2), 'utf-8')
+    print(f'saved to {out_fn}')
+
+
+if __name__ == '__main__':
+    main()
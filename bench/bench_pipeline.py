@@ -0,0 +1,163 @@
+"""
+  bench_pipeline.py
+  Html2Chm 整个流程的基准测试: 各阶段及端到端的耗时, 结果保存为 json, 用于不同提交之间的对比
+
+  不需要真实的文档包: 默认用 gen_sphinx_docs.py 生成合成的 python-X.Y.Z-docs-html.zip(大小可配置),
+  也可以用 --zip 指定真实的文档包.
+  在临时目录中运行(chm_utils 复制过去), 不影响项目下的 PydocCHM. 每遍都是全新的构建, 各阶段取最快的一遍.
+  结果写到 bench/results/<label>.json, label 默认为当前 git 提交; --compare 与之前保存的结果对比
+
+  用法:
+    python bench\bench_pipeline.py --pages 400 --index-kws 6000 --workers 4 --rounds 3
+    python bench\bench_pipeline.py --zip python-3.11.9-docs-html.zip --engine lxml --compare bench\results\36aa0c6.json
+
+History
+2026-10-18: created
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'src'))
+from html2chm import *
+from gen_sphinx_docs import gen_docs_zip
+
+STAGES = ('upack_html_zip', 'adjust_files', 'gen_hhc_file', 'gen_hhk_file', 'adjust_remains_html', 'gen_hhp_file',
+          'check_links', 'compile')
+
+
+def git_rev() -> str:
+    """ 当前 git 提交, 取不到时返回时间戳 """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return time.strftime('%Y%m%d-%H%M%S')
+
+
+def run_once(src_zip, args, cache_dir='') -> dict:
+    """ 在当前目录下完整地构建一遍, 返回 BuildProfiler 的报告 """
+    shutil.rmtree(Html2Chm.CHM_DIR, ignore_errors=True)
+    h2c = Html2Chm(str(src_zip))
+    h2c.zip_src = args.zip_src
+    h2c.workers = args.workers
+    h2c.engine = args.engine
+    h2c.cache_dir = cache_dir
+    h2c.chm_mode = args.chm_mode
+    h2c.lzx_level = args.lzx_level
+    h2c.prune_unreferenced = args.prune
+    h2c.minify = args.minify
+    h2c.io_pipeline = args.io_pipeline
+    prof = h2c.profiler = BuildProfiler(top_n=args.top)
+    hhp_fn = ''
+    for name in STAGES:
+        with prof.stage(name):
+            match name:
+                case 'gen_hhp_file':
+                    hhp_fn = h2c.gen_hhp_file()
+                case 'check_links':
+                    if args.check_links:
+                        h2c.check_link_targets()
+                case 'compile':
+                    if args.chm_mode != 'none':
+                        h2c.compile_chm(hhp_fn)
+                case _:
+                    getattr(h2c, name)()
+    return prof.report()
+
+
+def summarize(rounds: list) -> dict:
+    """ 各阶段取最快的一遍 """
+    best = {name: min(st['wall'] for rpt in rounds for st in rpt['stages'] if st['name'] == name) for name in STAGES}
+    return {'stages': best,
+            'end_to_end': min(rpt['total_wall'] for rpt in rounds),
+            'pages': min(rpt['pages']['total'] for rpt in rounds),
+            'peak_rss': max(st['peak_rss'] or 0 for rpt in rounds for st in rpt['stages'])}
+
+
+def print_result(result: dict, base: dict | None):
+    best = result['best']
+    rows = [(name, best['stages'][name]) for name in STAGES] + [('end_to_end', best['end_to_end'])]
+    base_best = base['best'] if base else None
+    for name, secs in rows:
+        line = f'{name:<20s}{secs:10.3f}s'
+        if base_best:
+            old = base_best['end_to_end'] if name == 'end_to_end' else base_best['stages'].get(name)
+            if old:
+                line += f'{old:10.3f}s  {(secs - old) / old * 100:+7.1f}%'
+        print(line)
+    print(f'peak rss: {best["peak_rss"]} KB')
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Html2Chm 基准测试')
+    ap.add_argument('--zip', help='文档包, 不指定时生成合成的文档包')
+    ap.add_argument('--version', default='3.11.9', help='合成文档包的版本')
+    ap.add_argument('--pages', type=int, default=200, help='合成文档包的内容页数')
+    ap.add_argument('--index-kws', type=int, default=3000, help='合成文档包 genindex-all 中的关键字数')
+    ap.add_argument('--workers', type=int, default=0)
+    ap.add_argument('--engine', default='bs4', choices=('bs4', 'lxml'))
+    ap.add_argument('--chm-mode', default='stored', choices=('none', 'stored', 'lzx', 'hha'),
+                    help="编译方式, 'none': 不编译")
+    ap.add_argument('--lzx-level', default='default', choices=('fast', 'default', 'best'),
+                    help="--chm-mode lzx 的压缩级别, ref: bench_lzx.py")
+    ap.add_argument('--no-zip-src', dest='zip_src', action='store_false', help='先解压到磁盘')
+    ap.add_argument('--prune', action='store_true', help='删除引用不到的页面及资源文件')
+    ap.add_argument('--io-pipeline', action='store_true', help='页面的读取, 转换, 写出流水线执行')
+    ap.add_argument('--minify', action='store_true', help='压缩输出的页面及 css')
+    ap.add_argument('--check-links', action='store_true', help='检查链接及 #书签 的目标都存在')
+    ap.add_argument('--cache', action='store_true', help='使用增量构建缓存(先构建一遍预热)')
+    ap.add_argument('--rounds', type=int, default=3)
+    ap.add_argument('--top', type=int, default=10, help='报告中列出最慢的多少个页面')
+    ap.add_argument('--label', help='结果的名字, 默认为当前 git 提交')
+    ap.add_argument('--out', default=str(BENCH_DIR / 'results'), help='结果保存的目录')
+    ap.add_argument('--compare', help='与之前保存的结果对比')
+    args = ap.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_h2c_') as tmp:
+        if args.zip:
+            src_zip = Path(args.zip).resolve()
+        else:
+            t = time.perf_counter()
+            src_zip = gen_docs_zip(Path(tmp, 'src'), args.version, pages=args.pages, index_kws=args.index_kws)
+            print(f'generated {src_zip.name}: {src_zip.stat().st_size / 1e6:.1f} MB in {time.perf_counter() - t:.1f}s')
+        shutil.copytree(BENCH_DIR.parent / Html2Chm.CHM_UTILS, Path(tmp, Html2Chm.CHM_UTILS))
+        os.chdir(tmp)
+        try:
+            cache_dir = os.path.join(tmp, '_build_cache') if args.cache else ''
+            if cache_dir:
+                run_once(src_zip, args, cache_dir)
+            rounds = [run_once(src_zip, args, cache_dir) for _ in range(args.rounds)]
+        finally:
+            os.chdir(cwd)
+
+    label = args.label or git_rev()
+    result = {'label': label,
+              'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'params': {k: v for k, v in vars(args).items() if k not in ('out', 'compare', 'label')},
+              'zip_size': src_zip.stat().st_size if args.zip else None,
+              'best': summarize(rounds),
+              'rounds': rounds}
+    out_fn = Path(args.out, f'{label}.json')
+    out_fn.parent.mkdir(parents=True, exist_ok=True)
+    out_fn.write_text(json.dumps(result, ensure_ascii=False, indent=2), 'utf-8')
+
+    base = json.loads(Path(args.compare).read_text('utf-8')) if args.compare else None
+    if base and base['params'] != result['params']:
+        print(f'warning: params differ from {args.compare}')
+    print_result(result, base)
+    print(f'saved to {out_fn}')
+
+
+if __name__ == '__main__':
+    main()
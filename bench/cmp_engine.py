@@ -0,0 +1,104 @@
+"""
+  cmp_engine.py
+  检查 lxml 引擎与 bs4 引擎的转换结果是否一致, ref: Html2Chm.engine
+
+  两种引擎的输出序列化细节不同(属性顺序, 空元素是否写成 <meta .../>, href 中的非ascii字符是否转成 %xx 等),
+  所以不逐字节比较, 而是把两者的输出重新解析后, 比较规范化的 DOM: 元素, 排好序的属性, 文本
+  同时比较两者的提取器结果: 各页面的目录信息(toc), glossary.html 的术语(gloss), py-modindex.html 的模块表(pymod)
+  有差异时返回 1, 可作为 lxml 引擎的等价性检查; 不指定 --zip 时用 gen_sphinx_docs.py 生成合成的文档包
+
+  用法:
+    python bench\cmp_engine.py
+    python bench\cmp_engine.py --zip python-3.11.9-docs-html.zip --max-diff 20
+
+History
+2026-10-18: created
+            按 zip 对应的文档版本选取 DocProfile, ref: npsphinx
+            由 src 移到 bench, 同时比较 gloss, pymod 提取器, 不指定文档包时用合成的
+"""
+import argparse
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+from urllib.parse import unquote
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'src'))
+from html2chm import *
+from gen_sphinx_docs import gen_docs_zip
+
+URI_ATTRS = ('href', 'src', 'action')  # lxml 序列化时会对这些属性中的非ascii字符及空格进行 %xx 编码
+SPECIAL_KINDS = {'glossary.html': 'gloss', 'py-modindex.html': 'pymod'}  # 这些页面另外比较的提取器, ref: PAGE_EXTRACTORS
+
+
+def canon_dom(html_src: str) -> list:
+    """ 将页面源码转换成规范化的 DOM 列表, 每个元素一项: (tag, 排好序的属性, text, tail) """
+    root = lxml.html.document_fromstring(html_src)
+    dom = []
+    for el in root.iter():
+        if isinstance(el.tag, str):
+            attrs = sorted((k, unquote(v) if k in URI_ATTRS else v) for k, v in el.attrib.items())
+            dom.append((el.tag, attrs, el.text or '', el.tail or ''))
+        else:  # 注释等
+            dom.append((str(el.tag), el.text or '', el.tail or ''))
+    return dom
+
+
+def cmp_page(src: bytes, prof: DocProfile, kinds=('toc',)) -> str:
+    """ 比较一个页面在两种引擎下的结果(同 transform_page: 先提取, 再公共调整), 一致返回空串, 否则返回第一处差异的说明 """
+    soup = load_soup_src(src, 'utf-8', True)
+    data_bs4 = run_extractors(kinds, 'bs4', soup, prof)
+    out_bs4 = Html2Chm.adjust_page_src(soup, prof)
+
+    root = Html2Chm.load_page_lx(src)
+    data_lx = run_extractors(kinds, 'lxml', root, prof)
+    out_lx = Html2Chm.adjust_page_src_lx(root, prof)
+
+    for kind in kinds:
+        if data_bs4[kind] != data_lx[kind]:
+            return f'{kind}: {data_bs4[kind]!r} != {data_lx[kind]!r}'
+    dom_bs4, dom_lx = canon_dom(out_bs4.decode(Html2Chm.PAGE_CS)), canon_dom(out_lx.decode(Html2Chm.PAGE_CS))
+    for idx, (it_bs4, it_lx) in enumerate(zip(dom_bs4, dom_lx)):
+        if it_bs4 != it_lx:
+            return f'dom[{idx}]: {it_bs4!r} != {it_lx!r}'
+    if len(dom_bs4) != len(dom_lx):
+        return f'dom size: {len(dom_bs4)} != {len(dom_lx)}'
+    return ''
+
+
+def cmp_zip(src_zip, max_diff: int) -> tuple:
+    """ 比较文档包中的所有页面(Sphinx 的零散文件除外), 列出前 max_diff 个差异 :return: (相同的页面数, 有差异的页面数) """
+    h2c = Html2Chm(str(src_zip))  # 只用来取文档版本对应的 profile
+    same = diff = 0
+    with zipfile.ZipFile(src_zip, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            name = info.filename
+            href = name.split('/', 1)[-1]
+            if not name.endswith('.html') or h2c._is_sphinx_junk(href):
+                continue
+            kinds = ('toc', SPECIAL_KINDS[href]) if href in SPECIAL_KINDS else ('toc',)
+            if msg := cmp_page(zip_ref.read(name), h2c.profile, kinds):
+                diff += 1
+                if diff <= max_diff:
+                    print(f'{href}: {msg}')
+            else:
+                same += 1
+    return same, diff
+
+
+def main():
+    ap = argparse.ArgumentParser(description='lxml 引擎与 bs4 引擎的转换结果是否一致')
+    ap.add_argument('--zip', help='文档包, 不指定时生成合成的文档包')
+    ap.add_argument('--version', default='3.11.9', help='合成文档包的版本')
+    ap.add_argument('--max-diff', type=int, default=10, help='最多列出的差异数')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='cmp_engine_') as tmp:
+        src_zip = args.zip or gen_docs_zip(Path(tmp), args.version)
+        same, diff = cmp_zip(src_zip, args.max_diff)
+    print(f'{same=}, {diff=}')
+    sys.exit(1 if diff else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,498 @@
+"""
+  gen_sphinx_docs.py
+  生成合成的 python-X.Y.Z-docs-html.zip, 用于基准测试(benchmark)
+
+  生成的zip与官方发布的html文档包结构一致(zip中套一个与zip同名的子目录), 包含 Html2Chm 所依赖的 Sphinx 结构:
+    toctree-wrapper compound / toctree-l1   各章节 index.html 及中间提纲页
+    sphinxsidebarwrapper                     内容页的页内书签
+    indextable genindextable                 genindex-all.html
+    glossary 的 dt                           glossary.html
+    indextable modindextable                 py-modindex.html
+  以及 _static, _images, _sources, searchindex.js, objects.inv 等 Sphinx 残余文件
+
+  页面内容是随机的, 但由 seed 决定, 同样的参数总是生成同样的 zip
+
+History
+2026-10-18: created
+"""
+import argparse
+import io
+import random
+import zipfile
+from pathlib import Path
+
+WORDS = ('python object module function class method value return argument list dict string number file '
+         'import error exception attribute instance type iterator generator buffer stream socket thread '
+         'process lock queue event loop async await context manager decorator descriptor protocol '
+         'sequence mapping set tuple bytes unicode encoding codec path directory interpreter').split()
+NON_ASCII = '“”’–—…é©'  # 官方文档中常见的非ascii字符
+
+CHAPTERS = [  # (目录, 标题, 子页面数的权重)
+    ('whatsnew', 'What’s New in Python', 1),
+    ('using', 'Python Setup and Usage', 1),
+    ('tutorial', 'The Python Tutorial', 2),
+    ('reference', 'The Python Language Reference', 2),
+    ('library', 'The Python Standard Library', 8),
+    ('installing', 'Installing Python Modules', 0),
+    ('extending', 'Extending and Embedding the Python Interpreter', 1),
+    ('c-api', 'Python/C API Reference Manual', 3),
+    ('howto', 'Python HOWTOs', 2),
+    ('faq', 'Python Frequently Asked Questions', 1),
+    ('distributing', 'Distributing Python Modules', 0),
+]
+CHAPTERS_312 = [('deprecations', 'Deprecations', 0)]  # 3.12 起多的一级目录
+
+
+class DocGen:
+    """合成文档生成器"""
+
+    def __init__(self, version='3.11.9', pages=200, sections=6, paras=4, index_kws=3000, gloss_terms=120,
+                 modules=150, seed=20261018):
+        self.version = version
+        self.pages = pages  # 内容页的大致数量
+        self.sections = sections  # 每个内容页的章节数
+        self.paras = paras  # 每个章节的段落数
+        self.index_kws = index_kws  # genindex-all 中的关键字数
+        self.gloss_terms = gloss_terms
+        self.modules = modules
+        self.rnd = random.Random(seed)
+        self.files = {}  # 相对路径 -> bytes
+        self.all_pages = []  # (href, 标题), 内容页, 用于生成索引
+        self.chapters = CHAPTERS + (CHAPTERS_312 if tuple(map(int, version.split('.')[:2])) >= (3, 12) else [])
+
+    # ---------- 文本 ----------
+    def words(self, n_min, n_max, non_ascii=True):
+        ws = [self.rnd.choice(WORDS) for _ in range(self.rnd.randint(n_min, n_max))]
+        if non_ascii and self.rnd.random() < 0.3:
+            ws.insert(self.rnd.randrange(len(ws)), self.rnd.choice(NON_ASCII))
+        return ' '.join(ws)
+
+    def title(self):
+        return self.words(2, 5, False).title()
+
+    @staticmethod
+    def slug(tit):
+        return '-'.join(tit.lower().split())
+
+    # ---------- 页面框架 ----------
+    def page(self, rel, title, body, sidebar=''):
+        depth = rel.count('/')
+        up = '../' * depth
+        ver = self.version
+        src = f'''<!DOCTYPE html>
+
+<html lang="en" data-content_root="{up or './'}">
+  <head>
+    <meta charset="utf-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1.0" /><meta name="viewport" content="width=device-width, initial-scale=1" />
+<meta property="og:title" content="{title}" />
+<meta property="og:type" content="website" />
+    <title>{title} &#8212; Python {ver} documentation</title><meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <link rel="stylesheet" type="text/css" href="{up}_static/pygments.css?v=b86133f3" />
+    <link rel="stylesheet" type="text/css" href="{up}_static/pydoctheme.css?v=23252803" />
+    <link id="pygments_dark_css" media="(prefers-color-scheme: dark)" rel="stylesheet" type="text/css" href="{up}_static/pygments_dark.css?v=5349f25f" />
+    <script src="{up}_static/documentation_options.js?v=2c828074"></script>
+    <script src="{up}_static/doctools.js?v=888ff710"></script>
+    <script src="{up}_static/sphinx_highlight.js?v=dc90522c"></script>
+    <script src="{up}_static/menu.js"></script>
+    <script src="{up}_static/search-focus.js"></script>
+    <script src="{up}_static/themetoggle.js"></script>
+    <link rel="search" type="application/opensearchdescription+xml"
+          title="Search within Python {ver} documentation"
+          href="{up}_static/opensearch.xml"/>
+    <link rel="author" title="About these documents" href="{up}about.html" />
+    <link rel="index" title="Index" href="{up}genindex.html" />
+    <link rel="search" title="Search" href="{up}search.html" />
+    <link rel="copyright" title="Copyright" href="{up}copyright.html" />
+    <link rel="shortcut icon" type="image/png" href="{up}_static/py.svg" />
+  </head>
+<body>
+<div class="mobile-nav">
+    <input type="checkbox" id="menuToggler" class="toggler__input" aria-controls="navigation"
+           aria-pressed="false" aria-expanded="false" role="button" aria-label="Menu" />
+    <nav class="nav-content" role="navigation">
+        <a href="https://www.python.org/" class="nav-logo">
+            <img src="{up}_static/py.svg" alt="Python logo"/>
+        </a>
+        <span class="version_switcher_placeholder"></span>
+        <form role="search" class="search" action="{up}search.html" method="get">
+            <input placeholder="Quick search" aria-label="Quick search" type="search" name="q" id="search-field" />
+            <input type="submit" value="Go"/>
+        </form>
+    </nav>
+</div>
+  <div class="related" role="navigation" aria-label="related navigation">
+      <h3>Navigation</h3>
+      <ul>
+        <li class="right" style="margin-right: 10px">
+          <a href="{up}genindex.html" title="General Index" accesskey="I">index</a></li>
+        <li class="right" >
+          <a href="{up}py-modindex.html" title="Python Module Index">modules</a> |</li>
+        <li><img src="{up}_static/py.svg" alt="Python logo" style="vertical-align: middle; margin-top: -1px"/></li>
+        <li><a href="https://www.python.org/">Python</a> &#187;</li>
+        <li class="nav-item nav-item-0"><a href="{up}index.html">{ver} Documentation</a> &#187;</li>
+      </ul>
+    </div>
+
+    <div class="document">
+      <div class="documentwrapper">
+        <div class="bodywrapper">
+          <div class="body" role="main">
+{body}
+            <div class="clearer"></div>
+          </div>
+        </div>
+      </div>
+      <div class="sphinxsidebar" role="navigation" aria-label="main navigation">
+        <div class="sphinxsidebarwrapper">
+{sidebar}
+  <div role="note" aria-label="source link">
+    <h3>This Page</h3>
+    <ul class="this-page-menu">
+      <li><a href="{up}bugs.html">Report a Bug</a></li>
+      <li><a href="https://github.com/python/cpython/blob/main/Doc/{rel}" rel="nofollow">Show Source</a></li>
+    </ul>
+  </div>
+        </div>
+      </div>
+      <div class="clearer"></div>
+    </div>
+  <div class="related" role="navigation" aria-label="related navigation">
+      <h3>Navigation</h3>
+      <ul>
+        <li class="right" style="margin-right: 10px">
+          <a href="{up}genindex.html" title="General Index">index</a></li>
+        <li class="nav-item nav-item-0"><a href="{up}index.html">{ver} Documentation</a> &#187;</li>
+      </ul>
+    </div>
+    <div class="footer">
+    &copy; <a href="{up}copyright.html">Copyright</a> 2001-2024, Python Software Foundation.
+    <br />
+    This page is licensed under the Python Software Foundation License Version 2.
+    <br />
+    Last updated on Apr 02, 2024 (11:41 UTC).
+    </div>
+  </body>
+</html>'''
+        self.files[rel] = src.encode('utf-8')
+
+    # ---------- 内容页 ----------
+    def content_page(self, rel, title, with_bm=True, sub_ul=True):
+        """带 sphinxsidebarwrapper 书签的内容页"""
+        sec_ids = []
+        parts = [f'  <section id="{self.slug(title)}">',
+                 f'<h1>{title}<a class="headerlink" href="#{self.slug(title)}" title="Link to this heading">¶</a></h1>']
+        for _ in range(self.sections):
+            st = self.title()
+            sid = self.slug(st) + f'-{len(sec_ids)}'
+            subs = []
+            parts.append(f'<section id="{sid}">')
+            parts.append(f'<h2>{st}<a class="headerlink" href="#{sid}" title="Link to this heading">¶</a></h2>')
+            for _ in range(self.paras):
+                parts.append(f'<p>{self.words(20, 60)} <code class="docutils literal notranslate">'
+                             f'<span class="pre">{self.rnd.choice(WORDS)}()</span></code> {self.words(5, 20)}.</p>')
+            if self.rnd.random() < 0.5:
+                parts.append('<div class="highlight-python3 notranslate"><div class="highlight"><pre><span></span>'
+                             '<span class="gp">&gt;&gt;&gt; </span><span class="n">x</span> <span class="o">=</span>'
+                             ' <span class="mi">1</span>\n    <span class="nb">print</span>(x)\n</pre></div>\n</div>')
+            if sub_ul:
+                for _ in range(self.rnd.randint(0, 2)):
+                    sst = self.title()
+                    ssid = self.slug(sst) + f'-{len(sec_ids)}-{len(subs)}'
+                    subs.append((ssid, sst))
+                    parts.append(f'<section id="{ssid}">')
+                    parts.append(f'<h3>{sst}<a class="headerlink" href="#{ssid}" title="Link to this heading">¶</a></h3>')
+                    parts.append(f'<p>{self.words(20, 40)}</p>')
+                    parts.append('</section>')
+            parts.append('</section>')
+            sec_ids.append((sid, st, subs))
+        parts.append('</section>')
+
+        sidebar = ''
+        if with_bm:
+            lis = []
+            for sid, st, subs in sec_ids:
+                if subs:
+                    sub = ''.join(f'<li><a class="reference internal" href="#{ssid}">{sst}</a></li>\n'
+                                  for ssid, sst in subs)
+                    lis.append(f'<li><a class="reference internal" href="#{sid}">{st}</a><ul>\n{sub}</ul>\n</li>\n')
+                else:
+                    lis.append(f'<li><a class="reference internal" href="#{sid}">{st}</a></li>\n')
+            sidebar = f'''  <div>
+    <h3><a href="{'../' * rel.count('/')}contents.html">Table of Contents</a></h3>
+    <ul>
+<li><a class="reference internal" href="#">{title}</a><ul>
+{''.join(lis)}</ul>
+</li>
+</ul>
+
+  </div>'''
+        self.page(rel, title, '\n'.join(parts), sidebar)
+        self.all_pages.append((rel, title, [s[0] for s in sec_ids]))
+
+    def toc_page(self, rel, title, children):
+        """带 toctree-wrapper compound 的提纲页, children: [(href, 标题, [(书签, 标题)])]"""
+        lis = []
+        for href, ct, bms in children:
+            sub = ''.join(f'<li class="toctree-l2"><a class="reference internal" href="{href}#{b}">{bt}</a></li>\n'
+                          for b, bt in bms)
+            sub = f'<ul>\n{sub}</ul>\n' if sub else ''
+            lis.append(f'<li class="toctree-l1"><a class="reference internal" href="{href}">{ct}</a>{sub}</li>\n')
+        body = f'''  <section id="{self.slug(title)}">
+<h1>{title}<a class="headerlink" href="#{self.slug(title)}" title="Link to this heading">¶</a></h1>
+<p>{self.words(20, 40)}</p>
+<div class="toctree-wrapper compound">
+<ul>
+{''.join(lis)}</ul>
+</div>
+</section>'''
+        self.page(rel, title, body)
+
+    def chapter(self, dirname, title, n_pages):
+        children = []
+        if dirname == 'library' and n_pages > 8:  # library 多一层: 提纲页 -> 内容页
+            per = max(2, n_pages // 8)
+            for g in range(8):
+                gt = self.title()
+                g_rel = f'{dirname}/group{g}.html'
+                sub = []
+                for i in range(per):
+                    ct = self.title()
+                    fn = f'mod{g}_{i}.html'
+                    self.content_page(f'{dirname}/{fn}', ct)
+                    sub.append((fn, ct, []))
+                self.toc_page(g_rel, gt, sub)
+                children.append((f'group{g}.html', gt, []))
+        else:
+            for i in range(n_pages):
+                ct = self.title()
+                fn = f'page{i}.html'
+                # c-api/sys.html 的情况: 总标题下没有ul
+                self.content_page(f'{dirname}/{fn}', ct, sub_ul=(i % 5 != 4))
+                children.append((fn, ct, [(self.slug(ct), ct)] if i % 3 == 0 else []))
+        if dirname == 'c-api':  # 总标题后没有下级ul的情况
+            self.flat_sidebar_page(f'{dirname}/sys.html', 'Operating System Utilities')
+            children.append(('sys.html', 'Operating System Utilities', []))
+        self.toc_page(f'{dirname}/index.html', title, children)
+
+    def flat_sidebar_page(self, rel, title):
+        body = f'''  <section id="os-utils">
+<h1>{title}<a class="headerlink" href="#os-utils" title="Link to this heading">¶</a></h1>
+<p>{self.words(20, 40)}</p>
+<section id="system-functions">
+<h2>System Functions<a class="headerlink" href="#system-functions" title="Link to this heading">¶</a></h2>
+<p>{self.words(20, 40)}</p>
+</section>
+</section>'''
+        sidebar = '''  <div>
+    <h4>Previous topic</h4>
+    <ul>
+<li><a class="reference internal" href="#">Operating System Utilities</a></li>
+<li><a class="reference internal" href="#system-functions">System Functions</a></li>
+</ul>
+  </div>'''
+        self.page(rel, title, body, sidebar)
+        self.all_pages.append((rel, title, ['os-utils', 'system-functions']))
+
+    # ---------- 特殊页 ----------
+    def glossary(self):
+        dts = []
+        terms = set()
+        special = ['&gt;&gt;&gt;', '...', '__future__', '2to3']
+        for i in range(self.gloss_terms):
+            if i < len(special):
+                t = special[i]
+            else:
+                t = self.words(1, 3, False)
+                while t in terms:
+                    t += ' ' + self.rnd.choice(WORDS)
+            terms.add(t)
+            tid = f'term-{i}'
+            dts.append(f'<dt id="{tid}"><strong>{t}</strong><a class="headerlink" href="#{tid}" '
+                       f'title="Link to this term">¶</a></dt><dd><p>{self.words(10, 40)}</p>\n</dd>')
+        body = f'''  <section id="glossary">
+<span id="id1"></span><h1>Glossary<a class="headerlink" href="#glossary" title="Link to this heading">¶</a></h1>
+<dl class="glossary">
+{chr(10).join(dts)}
+</dl>
+</section>'''
+        self.page('glossary.html', 'Glossary', body, '''  <div>
+    <h4>Previous topic</h4>
+  </div>''')
+
+    def modindex(self):
+        names = sorted({'_' + self.rnd.choice(WORDS) for _ in range(3)} |
+                       {self.rnd.choice(WORDS) + str(i) for i in range(self.modules)})
+        rows = ['<tr class="pcap"><td></td><td>&#160;</td><td></td></tr>']
+        targets = {}  # 页面 -> [模块的书签], 与 Sphinx 一样放在页面的总标题前
+        cur_cap = None
+        for i, n in enumerate(names):
+            cap = n[0]
+            if cap != cur_cap:
+                cur_cap = cap
+                rows.append(f'<tr class="cap" id="cap-{cap}"><td></td><td>\n<strong>{cap}</strong></td><td></td></tr>')
+            page = self.rnd.choice(self.all_pages)[0]
+            if i % 7 == 3:  # 带子模块的包, 包本身没有链接
+                rows.append(f'<tr>\n<td><img src="_static/minus.png" class="toggler"\n id="toggle-{i}" '
+                            f'style="display: none" alt="-" /></td>\n<td>\n<code class="xref">{n}</code></td><td>\n<em></em></td></tr>')
+                for j in range(self.rnd.randint(1, 4)):
+                    targets.setdefault(page, []).append(f'module-{n}.sub{j}')
+                    rows.append(f'<tr class="cg-{i}">\n<td></td>\n<td>&#160;&#160;&#160;\n'
+                                f'<a href="{page}#module-{n}.sub{j}"><code class="xref">{n}.sub{j}</code></a></td><td>\n'
+                                f'<em>{self.words(3, 8)}</em></td></tr>')
+            else:
+                dep = ' <strong>Deprecated:</strong>' if i % 11 == 5 else ''
+                targets.setdefault(page, []).append(f'module-{n}')
+                rows.append(f'<tr>\n<td></td>\n<td>\n<a href="{page}#module-{n}"><code class="xref">{n}</code></a>{dep}'
+                            f'</td><td>\n<em>{self.words(3, 8)}</em></td></tr>')
+        caps = sorted({n[0] for n in names})
+        jump = ' | \n'.join(f'<a href="#cap-{c}"><strong>{c}</strong></a>' for c in caps)
+        body = f'''
+   <h1>Python Module Index</h1>
+
+   <div class="modindex-jumpbox">
+   {jump}
+   </div>
+
+   <table class="indextable modindextable">
+{chr(10).join(rows)}
+   </table>
+'''
+        self.page('py-modindex.html', 'Python Module Index', body)
+        for page, ids in targets.items():
+            self.add_targets(page, ids)
+
+    def add_targets(self, rel, ids):
+        """在已生成的内容页的第一个 section 中加入书签 <span class="target" id="..."></span>"""
+        src = self.files[rel].decode('utf-8')
+        pos = src.index('>', src.index('<section id=')) + 1
+        spans = ''.join(f'<span class="target" id="{i}"></span>' for i in ids)
+        self.files[rel] = (src[:pos] + '\n' + spans + src[pos:]).encode('utf-8')
+
+    def genindex(self):
+        groups = ['Symbols', '_'] + [chr(c) for c in range(65, 91)]
+        per = max(1, self.index_kws // len(groups))
+        tabs = []
+        for g in groups:
+            tds = []
+            for col in range(2):
+                lis = []
+                for k in range(per // 2):
+                    lis.append(self.index_li(g, col, k))
+                tds.append(f'  <td style="width: 33%; vertical-align: top;"><ul>\n{"".join(lis)}</ul></td>\n')
+            tabs.append(f'<h2 id="{g}">{g}</h2>\n<table style="width: 100%" class="indextable genindextable">'
+                        f'<tr>\n{"".join(tds)}</tr></table>\n')
+        body = f'''
+<h1 id="index">Index</h1>
+<div class="genindex-jumpbox">
+{' | '.join(f'<a href="#{g}"><strong>{g}</strong></a>' for g in groups)}
+</div>
+{''.join(tabs)}'''
+        self.page('genindex-all.html', 'Index', body)
+        self.page('genindex.html', 'Index', '<h1 id="index">Index</h1>\n<p>Index pages by letter:</p>')
+        for g in groups[2:]:
+            self.page(f'genindex-{g}.html', 'Index', f'<h1 id="index">Index &ndash; {g}</h1>\n<p>{self.words(5, 10)}</p>')
+
+    def ref(self):
+        rel, _, sids = self.rnd.choice(self.all_pages)
+        return f'{rel}#{self.rnd.choice(sids)}'
+
+    def index_li(self, g, col, k):
+        kw = (g if len(g) == 1 else '!') + self.words(1, 2, False) + f' {col}{k}'
+        kw = kw.replace('<', '&lt;')
+        case = k % 4
+        if case == 0:  # 只有一个 a
+            return f'      <li><a href="{self.ref()}">{kw}</a>\n</li>\n'
+        if case == 1:  # 多个 a
+            more = ', '.join(f'<a href="{self.ref()}">[{i + 1}]</a>' for i in range(self.rnd.randint(1, 3)))
+            return f'      <li><a href="{self.ref()}">{kw}</a>, {more}\n</li>\n'
+        sub = []
+        for i in range(self.rnd.randint(1, 4)):
+            if i % 2:
+                sub.append(f'        <li><a href="{self.ref()}">{self.words(1, 3, False)}</a>, '
+                           f'<a href="{self.ref()}">[1]</a>\n</li>\n')
+            else:
+                sub.append(f'        <li><a href="{self.ref()}">{self.words(1, 3, False)}</a>\n</li>\n')
+        if case == 2:  # 普通文本 + ul
+            return f'      <li>\n    {kw}\n\n      <ul>\n{"".join(sub)}      </ul></li>\n'
+        return f'      <li><a href="{self.ref()}">{kw}</a>\n\n      <ul>\n{"".join(sub)}      </ul></li>\n'
+
+    def misc(self):
+        for fn, tit in [('about.html', 'About these documents'), ('license.html', 'History and License'),
+                        ('copyright.html', 'Copyright'), ('bugs.html', 'Dealing with Bugs'),
+                        ('download.html', 'Download'), ('contents.html', 'Python Documentation contents')]:
+            self.content_page(fn, tit, with_bm=fn != 'copyright.html')
+        # search.html 是 Sphinx 的检索页, 会被当作残余文件删除, 不放入 all_pages, 索引中不会链接到它
+        self.page('search.html', 'Search', '<h1 id="search-documentation">Search</h1>\n'
+                                           '<div id="search-results"></div>')
+        links = ''.join(f'<p class="biglink"><a class="biglink" href="{d}/index.html">{t}</a></p>\n'
+                        for d, t, _ in self.chapters)
+        self.page('index.html', f'Python {self.version} documentation',
+                  f'<h1>Python {self.version} documentation</h1>\n{links}')
+
+    def assets(self):
+        for fn in ['pygments.css', 'pydoctheme.css', 'pygments_dark.css', 'basic.css', 'classic.css']:
+            rules = '\n'.join(f'.c{i} {{ color: #{self.rnd.randrange(0x1000000):06x}; margin: 0 {i}px; }}'
+                              for i in range(200))
+            self.files[f'_static/{fn}'] = rules.encode()
+        for fn in ['documentation_options.js', 'doctools.js', 'sphinx_highlight.js', 'menu.js', 'search-focus.js',
+                   'themetoggle.js', 'searchtools.js', 'language_data.js']:
+            self.files[f'_static/{fn}'] = b'/* js */\n' + b'var x = 1;\n' * 100
+        for fn in ['py.svg', 'py.png', 'minus.png', 'plus.png', 'file.png']:
+            self.files[f'_static/{fn}'] = self.rnd.randbytes(2048)
+        self.files['_static/glossary.json'] = b'{}'
+        self.files['_static/opensearch.xml'] = b'<?xml version="1.0"?>'
+        for i in range(10):
+            self.files[f'_images/fig{i}.png'] = self.rnd.randbytes(8192)
+        self.files['searchindex.js'] = b'Search.setIndex({})'
+        self.files['objects.inv'] = self.rnd.randbytes(4096)
+        self.files['.buildinfo'] = b'# Sphinx build info version 1\n'
+        for rel in list(self.files):
+            if rel.endswith('.html'):
+                self.files[f'_sources/{rel[:-5]}.rst.txt'] = b'source\n'
+
+    def generate(self):
+        weights = sum(w for _, _, w in self.chapters)
+        for d, t, w in self.chapters:
+            if w == 0:
+                self.toc_page(f'{d}/index.html', t, [])  # 没有下级的章节
+                continue
+            self.chapter(d, t, max(2, self.pages * w // weights))
+        self.misc()
+        self.glossary()
+        self.modindex()
+        self.genindex()
+        self.assets()
+
+    def write_zip(self, dest_dir) -> Path:
+        stem = f'python-{self.version}-docs-html'
+        zip_fn = Path(dest_dir, stem + '.zip')
+        zip_fn.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(zip_fn, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            zf.writestr(stem + '/', b'')
+            for rel in sorted(self.files):
+                if self.files[rel] is not None:
+                    zf.writestr(f'{stem}/{rel}', self.files[rel])
+        return zip_fn
+
+
+def gen_docs_zip(dest_dir, version='3.11.9', **kwargs) -> Path:
+    """生成一个合成的文档zip, 返回zip文件名"""
+    gen = DocGen(version, **kwargs)
+    gen.generate()
+    return gen.write_zip(dest_dir)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='生成合成的 python-X.Y.Z-docs-html.zip')
+    ap.add_argument('dest_dir')
+    ap.add_argument('--version', default='3.11.9')
+    ap.add_argument('--pages', type=int, default=200)
+    ap.add_argument('--index-kws', type=int, default=3000)
+    ap.add_argument('--seed', type=int, default=20261018)
+    args = ap.parse_args()
+    print(gen_docs_zip(args.dest_dir, args.version, pages=args.pages, index_kws=args.index_kws, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
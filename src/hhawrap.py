@@ -5,15 +5,17 @@
 
 history:
 2024-09-20: create, 从 pychm 中 的 chm.py 进行移植, 同时参考 delphi 代码 ukEBookGen.pas
+2026-10-18: WINFUNCTYPE, windll 等只在 Windows 下存在, 改为按平台定义, 其他平台下也可以 import, 使用 HhaWrap 时报错
 
 
 """
 
+import sys
 from ctypes import *
 from nipow import *
 
 # tow call back function
-HhaCallBack = WINFUNCTYPE(c_bool, c_char_p)
+HhaCallBack = WINFUNCTYPE(c_bool, c_char_p) if sys.platform == 'win32' else None
 
 
 def hhacb_log(log_msg):
@@ -45,6 +47,10 @@ class HhaWrap:
     def __init__(self, hha_dll_fn):
         super().__init__()
 
+        self.ole32_handle = None
+        if HhaCallBack is None:
+            raise OSError('hha.dll 只能在 Windows 下使用')
+
         import struct
         size = struct.calcsize('P')  # 通过指针的字节数来知道是 32位还是64位系统
         assert size == 4, 'hha.dll只有32bit版本,因此本类只能在32位下使用'
@@ -60,7 +66,8 @@ class HhaWrap:
 
     def __del__(self):
         # windll.UnloadLibrary(self.hha_dll)  # 不需要显示释放, python自动处理
-        self.ole32_handle.CoUninitialize()
+        if self.ole32_handle is not None:
+            self.ole32_handle.CoUninitialize()
         # oledll.UnloadLibrary(self.ole32_handle) # 不需要显示释放, python自动处理
         # super().__del__()
 
@@ -13,26 +13,73 @@
 History
 2024-09-27: created
 2024-10-04: 从html直接转换来的版本基本OK, 看看一些地方要不要再加目录
+2026-10-18: 增加 zip_src 模式, html页面直接从zip中读取, 不再先解压到磁盘
+            增加进程池模式与增量构建缓存(npcache.py)
+            增加 lxml 引擎: 页面的解析, 目录提取, 公共调整直接用 lxml 完成, ref: engine
+            页面转义与编码一步完成, 直接写出 bytes, ref: finish_page_src
+            增加纯 Python 的 chm 生成(npitsf.py), 不再依赖 32位 Windows 下的 hha.dll, ref: compile_chm
+            hhk 改为流式生成, 边解析 genindex-all.html 边写出, ref: gen_hhk_file
+            增加构建统计(npprof.py): 各阶段的耗时与内存, 各页面耗时, 输出 json 报告, ref: profiler
+            增加批量构建, 多个版本同时构建, 共用进程池及 chm_utils 等资源, ref: Html2ChmBatch
+            增加页面登记表, 每个页面只解析一次, 各种数据的提取共用这一次解析, ref: process_pages, PAGE_EXTRACTORS
+            目录树改为用工作队列提取, 显式栈构建, 不再递归, 可检测环, ref: run_toc_jobs
+            hhc/hhk 由 SitemapWriter 直接写出, 可选不缩进, ref: sitemap_indent
+            术语及模块表的提取改为 DocIndexRecord 记录, 按首字母预先建好分组, ref: ChmDocIndex
+            _static, _images 改用内容寻址存储 AssetStore, hhp 的 [FILES] 由资源清单 assets 生成
+            增加 prune_files, 按引用关系删除引用不到的页面及资源文件, ref: prune_unreferenced
+            可选压缩输出的页面及 css, 并统计压缩前后的大小, ref: minify, size_report
+            可选页面的读取, 转换, 写出流水线执行, ref: io_pipeline
+            Sphinx 的类名, 一级目录及零散文件改由按文档版本选取的 DocProfile 给出, 规则预先编译, ref: npsphinx, profile
+            可选编译后检查 chm: [FILES] 及 hhc/hhk 的 Local 在 chm 中都能找到, ref: verify_chm, npchmread
+            npitsf 编译时 LZX 按复位区间交给进程池并行压缩, 可选压缩级别, ref: compile_chm, lzx_level
+            各模块 import 时不再有副作用(日志文件, ini, 猴子方法), hhawrap 各平台都可以 import, ref: bench_import.py
+            页面处理的热路径上不再逐页写 info 日志, 改为延迟格式化的 debug, 各阶段的页面数由 profiler 统计后一行输出
+            可选检查链接: 目录, 索引及各页面中的链接的目标页面及 #书签 都存在, 书签在页面处理时提取, ref: check_link_targets
 
 """
+import argparse
+import io
+import json
 import os.path
 import re
+import sys
 import shutil
+import threading
+import time
 import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from functools import partial
+import lxml.html
 # import glob
 from npchmutil import *
-from hhawrap import *
+from npassets import AssetStore
+from npcache import BuildCache
+from npchmread import verify_chm
+from nplinks import AnchorIndex, LinkGraph, check_links, css_refs, page_anchors, page_refs, sitemap_links
+from npminify import minify_css, minify_html
+from npitsf import ChmWriter
+from nppipe import PagePipeline
+from npprof import BuildProfiler
+from npsphinx import DocProfile, get_profile, get_profile_by_name
+from hhawrap import HhaWrap  # hha.dll 只能在 Windows 下使用, 其他平台下 HhaWrap() 报 OSError
 from packaging.version import Version
 from nipow import *
 
 
 class Html2Chm:
-    CHM_UTILS = 'chm_utils'  # 这是chm相关资源
+    CHM_UTILS = CHM_UTILS  # 这是chm相关资源, ref: read_chm_util
     CHM_DIR: str = 'PydocCHM'  # 这是chm的源及默认目的目录, 按版本存放, 形如: PydocCHM\3.11.1,  PydocCHM\3.9.12
     PAGE_CS: str = 'cp1252'  # chm中的正文页面的字符集 page charset
+    # lxml 引擎用的预编译 XPath, 与版本无关的部分; Sphinx 的类名等随版本变化的在 DocProfile 中, ref: npsphinx
+    LX_XPATH = {
+        'stylesheet': etree.XPath('descendant::link[contains(concat(" ", normalize-space(@rel), " "), " stylesheet ")]'),
+        'search': etree.XPath('descendant::link[contains(concat(" ", normalize-space(@rel), " "), " search ")]'),
+    }
 
     def __init__(self, html_zip: str, chm_fn: str = ''):
-        applog.info(f'src_zip = {html_zip}')
+        applog.info('src_zip = %s', html_zip)
         super().__init__()
         self.src_zip = html_zip  # source, 如: R:\python-3.11.9-docs-html.zip
         self._get_doc_ver()     # 当前处理的文档对应的python版本
@@ -41,6 +88,30 @@ class Html2Chm:
             ph = Path(self.CHM_DIR, f'python-{self.doc_ver}-docs.chm').resolve()
             self.dest_chm = str(ph)  # 默认chm都输出到 PydocCHM 下
         self.handled_html = {}  # 已经处理了的html文件
+        self.zip_src = False  # True: html页面不解压到磁盘, 处理时直接从zip中读取, 只写出最终结果
+        self.pages = {}  # 页面登记表: href -> 页面处理时提取的数据 {kind: 结果}, 尚未处理的为 None, ref: process_pages
+        self.zip_pages = {}  # zip_src 模式下的html页面, href -> zip中的名字, 如: whatsnew/3.11.html -> python-3.11.9-docs-html/whatsnew/3.11.html
+        self.io_pipeline = False  # True: 页面的读取, 转换, 写出分成三个阶段流水线执行, I/O 与转换同时进行, ref: get_pipeline
+        self._pipeline = None  # nppipe.PagePipeline
+        self.workers = 0  # >0: 页面的解析与转换交给有这么多个进程的进程池并行处理; 0: 在本进程中串行处理
+        self._pool = None  # ProcessPoolExecutor, ref: get_pool
+        self._toc_roots = []  # add_desc_fr_list 登记的待处理父目录, ref: run_toc_jobs
+        self.cache_dir = ''  # 非空: 使用增量构建缓存, 缓存存放在这个目录, 各版本共用, 如: PydocCHM\_build_cache
+        self._cache = None  # BuildCache, ref: get_cache
+        self.engine = 'bs4'  # 页面解析与公共调整用的引擎: 'bs4': BeautifulSoup; 'lxml': 直接用 lxml, 更快, ref: _page_job
+        self.chm_mode = 'hha'  # chm 的编译方式: 'hha': hha.dll, 只能在32位 Windows 下; 'lzx', 'stored': npitsf.ChmWriter
+        self.lzx_level = 'default'  # chm_mode 为 'lzx' 时的压缩级别: 'fast', 'default', 'best', ref: nplzx.LEVELS
+        self.sitemap_indent = True  # hhc/hhk 是否缩进, False: 文件更小, 编译也更快, ref: SitemapWriter
+        self.profiler = None  # npprof.BuildProfiler: 统计各阶段及各页面的耗时, ref: page_done
+        self.shared_pool = None  # 外部(批量构建)提供的进程池, 各版本共用, 不由本对象关闭, ref: get_pool, Html2ChmBatch
+        self.asset_store = None  # npassets.AssetStore: _static, _images 的内容寻址存储, 各版本共用, ref: upack_html_zip
+        self.prune_unreferenced = False  # True: 目录, 索引等引用不到的页面及资源文件不放入chm, ref: prune_files
+        self.minify = False  # True: 输出的页面及 css 压缩(去掉注释, 多余的空白等, <pre> 不变), ref: npminify, size_report
+        self._css_sizes = {}  # 压缩的 css: href -> [压缩前, 压缩后的大小], ref: minify_assets
+        self.verify_chm = False  # True: 编译后读取 chm 检查 [FILES] 及 hhc/hhk 的 Local 都能找到, ref: verify_chm_file
+        self.check_links = False  # True: 编译前检查目录, 索引及页面中的链接(含 #书签)的目标都存在, ref: check_link_targets
+        self.link_report = None  # check_links 时 build 留下的链接检查报告
+        self.assets = {}  # 资源清单: _static, _images 下的文件, href -> sha1(不用 asset_store 时为空串), [FILES] 由它生成
 
     def _get_doc_ver(self):
         """从源html文件名(如 python-3.11.9-docs-html.zip)中提取文档版本号"""
@@ -49,6 +120,7 @@ class Html2Chm:
         assert m is not None, "只接受原始的html文件, 如 'python-3.11.9-docs-html.zip' "
         self.doc_ver = Version(m.group(1))  # 当前处理的文档对应的python版本, e.g.: 3.11.9
         self.doc_root = os.path.join(self.CHM_DIR, str(self.doc_ver))  # 当前版本文档的根目录, 如: PydocCHM\3.11.9
+        self.profile: DocProfile = get_profile(self.doc_ver)  # 本版本文档的页面规则, 一级目录等, ref: npsphinx
 
 
     def cvt_fn_href(self, src: str, to_href=True):
@@ -73,10 +145,17 @@ class Html2Chm:
           python-3.11.9-docs-html.zip\python-3.11.9-docs-html\*.*
           因此不能使用 extractall
 
+        zip_src 模式下, html页面不解压, 只记录在 zip_pages 中, 处理时按需从zip中读取(ref: read_page_src),
+        处理后只写一次; Sphinx残余文件(见 adjust_files)也不再解压
+        所有html页面同时登记到页面登记表 pages 中, 后面不用再遍历目录, ref: process_pages
+        _static, _images 下的文件登记到资源清单 assets 中; 设置了 asset_store 时, 它们是存储中对象的硬链接,
+        相同内容的文件各版本只存一份, 重新构建时已在存储中的不再解压, ref: AssetStore.extract
         """
         # 先删除目录及其所有内容, 重新创建目录, 相当于清空工作目录
         shutil.rmtree(self.doc_root, ignore_errors=True)
         os.makedirs(self.doc_root, exist_ok=True)
+        self.pages.clear()
+        self.assets.clear()
 
         # with zipfile.ZipFile(self.src_html, 'r') as zip_ref:
         #     zip_ref.extract(r'python-3.11.9-docs-html/*.*', self.WORK_DIR)
@@ -90,7 +169,114 @@ class Html2Chm:
                 if len(old_path) > sub_dir_len and old_path.startswith(sub_dir):  # 检查文件或目录是否在指定的子目录中
                     # 去掉前面多嵌套的部分, 例如: 由 python-3.11.9-docs-html/genindex.html  变成 genindex.html
                     zip_info.filename = old_path[sub_dir_len:]
+                    if zip_info.filename.endswith('.html') and not self._is_sphinx_junk(zip_info.filename):
+                        self.pages[zip_info.filename] = None  # 登记页面, 尚未处理
+                    if self.zip_src:
+                        if self._is_sphinx_junk(zip_info.filename):
+                            continue  # 反正要被 adjust_files 删除
+                        if zip_info.filename.endswith('.html'):
+                            self.zip_pages[zip_info.filename] = old_path  # 页面暂不解压
+                            continue
+                    if zip_info.filename.startswith(('_static/', '_images/')) and not zip_info.is_dir():
+                        if self.asset_store is not None:
+                            digest = self.asset_store.extract(zip_ref, zip_info,
+                                                              os.path.join(self.doc_root, zip_info.filename))
+                        else:
+                            digest = ''
+                            zip_ref.extract(zip_info, self.doc_root)
+                        if not self._is_sphinx_junk(zip_info.filename):
+                            self.assets[zip_info.filename] = digest
+                        continue
                     zip_ref.extract(zip_info, self.doc_root)  # 提取文件或目录到指定位置
+        if self.asset_store is not None:
+            self.asset_store.save_manifest(str(self.doc_ver), self.assets)
+            self.asset_store.save()
+            applog.info('asset store: reused=%d, stored=%d', self.asset_store.reused, self.asset_store.stored)
+
+    def page_src_args(self, fn) -> tuple:
+        """
+        页面源码的位置, 即 read_page_src 的参数: (src_zip, zip中的名字, 文件名), 不在zip中的页面前两者为空
+        :param fn: 页面的文件名, 如: PydocCHM\3.11.9\whatsnew\index.html
+        """
+        if self.zip_src and (name := self.zip_pages.get(self.cvt_fn_href(fn, True))):
+            return self.src_zip, name, str(fn)
+        return '', '', str(fn)
+
+    def page_job_args(self, fn, kinds: tuple) -> tuple:
+        """ 生成 _page_job 的参数, kinds: 要运行的提取器, ref: PAGE_EXTRACTORS; profile 只传名字, 编译结果不能 pickle """
+        return *self.page_src_args(fn), kinds, self.get_cache(), self.engine, self.minify, self.profile.name
+
+    def process_pages(self, fns, kinds: tuple = ()) -> list:
+        """
+        页面登记表: 每个页面只读取, 解析一次, 在同一棵树上运行所需的各个提取器(目录, 术语, 模块表, 索引等),
+        再进行公共调整并写出(ref: _page_job); 结果登记在 pages 中, 已处理过且已有所需数据的页面不再重复处理
+        workers > 0 时交给进程池
+        :param fns: 页面文件名列表, 如: [PydocCHM\3.11.9\whatsnew\index.html, ...]
+        :param kinds: 要运行的提取器, ref: PAGE_EXTRACTORS
+        :return: 各页面提取的数据 {kind: 结果}, 与 fns 一一对应
+        """
+        hrefs = [self.cvt_fn_href(os.fspath(fn), True) for fn in fns]
+        todo = {}  # href -> 文件名, 已去重
+        for href, fn in zip(hrefs, fns):
+            if (data := self.pages.get(href)) is None or not data.keys() >= set(kinds):
+                todo.setdefault(href, fn)
+
+        if self.io_pipeline and len(todo) > 1:  # 读取, 转换, 写出流水线执行, 页面由流水线读取, 不需要任务参数
+            transform = partial(_pipe_transform, kinds=kinds, cache=self.get_cache(), engine=self.engine,
+                                minify=self.minify, prof_name=self.profile.name)
+            results = self.get_pipeline().run(list(todo.values()), transform,
+                                              self.get_pool() if self.workers > 0 else None)
+        elif self.workers > 0 and len(todo) > 1:  # 各页面互不相关, 交给进程池
+            jobs = [self.page_job_args(fn, kinds) for fn in todo.values()]
+            results = self.get_pool().map(_page_job, jobs, chunksize=max(1, len(jobs) // (self.workers * 4)))
+        else:
+            results = map(_page_job, (self.page_job_args(fn, kinds) for fn in todo.values()))
+        for href, result in zip(todo, results):
+            self.record_page(href, result)
+        return [self.pages[href] for href in hrefs]
+
+    def get_pipeline(self) -> PagePipeline:
+        """ 页面的读取, 转换, 写出流水线, 按需创建; 各次 process_pages 共用, 统计累计 """
+        if self._pipeline is None:
+            self._pipeline = PagePipeline(self._pipe_read, self._pipe_write, queue_size=max(8, self.workers * 4))
+        return self._pipeline
+
+    def _pipe_read(self, fn) -> bytes:
+        """ 流水线的读取阶段 """
+        applog.debug('read %s', fn)
+        return read_page_src(*self.page_src_args(fn))
+
+    def _pipe_write(self, fn, out_src: bytes):
+        """ 流水线的写出阶段 """
+        self.write_page(out_src, Path(fn), bool(self.page_src_args(fn)[0]))
+
+    def record_page(self, href, result) -> dict:
+        """ 登记 _page_job 的结果, 返回提取的数据 """
+        data, hit, secs = result
+        self.pages[href] = data
+        self.page_done(href, hit, secs)
+        return data
+
+    def close_zip(self):
+        if (zip_ref := _job_zip.pop(self.src_zip, None)) is not None:
+            zip_ref.close()
+
+    def get_cache(self) -> BuildCache | None:
+        """ 增量构建缓存, cache_dir 为空时不使用 """
+        if self.cache_dir and self._cache is None:
+            # 参与页面转换的代码及设置, 有变化时缓存自动失效
+            code_files = [__file__] + [sys.modules[obj.__module__].__file__
+                                       for obj in (ChmHhk, html_esc_ex, page_refs, minify_html, DocProfile)]
+            code_files.append(Path(self.CHM_UTILS, 'pythondoc.hhk'))  # hhk 模板, 生成的 hhk 也缓存, ref: gen_hhk_file
+            salt = BuildCache.code_salt(code_files, (self.PAGE_CS, self.engine, self.minify, self.profile.name))
+            self._cache = BuildCache(self.cache_dir, salt, str(self.doc_ver))
+        return self._cache
+
+    def _is_sphinx_junk(self, href: str) -> bool:
+        """ href(相对于doc_root) 是否是 adjust_files 要删除的文件 """
+        if href.startswith('_sources/') or href in self.profile.junk:
+            return True
+        return href.startswith('_static/') and href.endswith('.js') and href.count('/') == 1
 
     def adjust_files(self):
         """
@@ -100,12 +286,7 @@ class Html2Chm:
         最后更新日期 2024-09-27, base on python-3.11.09.docs-html.zip
             _sources  这是个目录
             _static\*.js
-            _static\glossary.json 为 search.html 所使用,
-            _static\opensearch.xml
-            .buildinfo
-            objects.inv
-            search.html
-            searchindex.js
+            其它零散文件(随版本变化) ref: DocProfile.junk
 
         """
         shutil.rmtree(Path(self.doc_root, '_sources'), ignore_errors=True)  # 删除
@@ -113,66 +294,196 @@ class Html2Chm:
         for js_file in Path(self.doc_root, r'_static').glob('*.js'):  # 删除所有 js 文件
             js_file.unlink()
 
-        for fn in [r'_static\glossary.json', r'_static\opensearch.xml', '.buildinfo', 'objects.inv', 'search.html',
-                   'searchindex.js']:  # 其它零散文件
+        for fn in self.profile.junk:  # 其它零散文件
             Path(self.doc_root, fn).unlink(True)
 
-        shutil.copy(Path(self.CHM_UTILS, 'Fts_stop_list.stp'), self.doc_root)  # 复制 Fts_stop_list.stp
+        Path(self.doc_root, 'Fts_stop_list.stp').write_bytes(read_chm_util('Fts_stop_list.stp'))  # 复制 Fts_stop_list.stp
 
-        about_chm = Path(self.CHM_UTILS, 'about this CHM.htm').read_text('utf-8')
+        about_chm = read_chm_util('about this CHM.htm', 'utf-8')
         about_chm = about_chm.format(get_utc_ts(), os.path.basename(self.src_zip))
         Path(self.doc_root, 'about this CHM.htm').write_text(about_chm, 'utf-8')
 
 
+    @staticmethod
+    def get_page_toc(soup: BeautifulSoup, prof: DocProfile) -> tuple:
+        """
+        提取页面中可作为chm下级目录的列表, 不依赖 Html2Chm 实例, 可在进程池中执行, ref: add_desc_fr_list
+        :param prof: 文档版本的规则, 选择器 toctree, toctree-l1 等
+        :return: (kind, items)
+            ('toc', [(标题, href), ...]): 来自 toctree-wrapper compound 中的 toctree-l1, href 相对于页面所在目录
+            ('bm', [(标题, href, [下级...]), ...]): 来自 sphinxsidebarwrapper 中的页内书签, href 形如 #summary
+            ('', None): 两者都没有
+        """
+        def get_bm_list(start_ul: bs4.Tag) -> list:
+            """ 将 sphinxsidebarwrapper 中代表页内书签的 ul 转换成嵌套的列表 """
+            bm_list = []
+            for li in start_ul.find_all('li', recursive=False):
+                tag_a = prof.find(li, 'ref-internal')
+                bm_list.append((get_tag_text(tag_a), tag_a.get('href'), get_bm_list(li.ul) if li.ul else []))
+            return bm_list
+
+        if soup.body is None:
+            return '', None
+        if toctree := prof.find(soup.body, 'toctree'):  # 有指向其它文件的纲要列表
+            # href, e.g.: 一般指向同目录下的文件, 如: 3.11.html
+            return 'toc', [(get_tag_text(tag_li.a), tag_li.find('a').get('href'))
+                           for tag_li in prof.find_all(toctree, 'toctree-l1')]
+        elif ssb_wrapper := prof.find(soup.body, 'ssb-wrapper'):  # 构建文内书签构成的子章节
+            items = []
+            # 找到页内书签列表总标题, 有些页面没有
+            if a := prof.find(ssb_wrapper, 'bm-title'):  # 这是 总标题, 如 "What’s New In Python 3.11"
+                if (start_ul := a.find_next_sibling()) and start_ul.name == 'ul':
+                    items = get_bm_list(start_ul)  # 以总标题的直接下级ul作为下级
+                elif (start_ul := a.parent.parent) and start_ul.name == 'ul':  # 如果没有下级ul, c-api\sys.html 是这种情况
+                    items = get_bm_list(start_ul)  # 如果总标题下没有ul则以它所在的ul为起点
+            return 'bm', items
+        return '', None
+
+    @staticmethod
+    def get_page_toc_lx(root: lxml.html.HtmlElement, prof: DocProfile) -> tuple:
+        """ lxml 引擎版的 get_page_toc, 结果与之相同 """
+        xp = prof.xp
+
+        def get_bm_list(start_ul: lxml.html.HtmlElement) -> list:
+            bm_list = []
+            for li in start_ul.iterchildren('li'):
+                tag_a = xp('ref-internal')(li)[0]
+                sub_ul = li.find('.//ul')
+                bm_list.append((get_lx_text(tag_a), tag_a.get('href'), get_bm_list(sub_ul) if sub_ul is not None else []))
+            return bm_list
+
+        if (body := root.find('body')) is None:
+            return '', None
+        if toctree := xp('toctree')(body):
+            return 'toc', [(get_lx_text(tag_li.find('.//a')), tag_li.find('.//a').get('href'))
+                           for tag_li in xp('toctree-l1')(toctree[0])]
+        elif ssb_wrapper := xp('ssb-wrapper')(body):
+            items = []
+            if a := xp('bm-title')(ssb_wrapper[0]):
+                a = a[0]
+                if (start_ul := a.getnext()) is not None and not isinstance(start_ul.tag, str):
+                    start_ul = next(start_ul.itersiblings(etree.Element), None)  # 跳过注释, 与 find_next_sibling 一致
+                if start_ul is not None and start_ul.tag == 'ul':
+                    items = get_bm_list(start_ul)
+                elif (start_ul := a.getparent().getparent()) is not None and start_ul.tag == 'ul':
+                    items = get_bm_list(start_ul)
+            return 'bm', items
+        return '', None
+
+    def add_toc_items(self, prt_chap: ChmHhcItem, prt_fn: str, toc: tuple, ignore_no_list=True):
+        """
+        将 get_page_toc 的结果加为父目录的下级目录
+        :return: 生成器, 逐个给出还需要继续增加下级的 (子目录条目, 对应的html文件)
+        """
+        def add_bm_chap(start_hhc: ChmHhcItem, bm_list: list):
+            """ 将页内书签转换成 chm中的章节目录的下级目录 """
+            for tit, href_, sub_list in bm_list:
+                # bm_host_href 如: whatsnew/3.11.html, 注意, 这个值在add_bm_chap的递归过程中是不变的
+                sub_hhc = start_hhc.add_child(tit, bm_host_href + href_)  # 如: whatsnew/3.11.html#summary-release-highlights
+                if sub_list:  # 还有下级
+                    add_bm_chap(sub_hhc, sub_list)
+
+        kind, items = toc
+        if kind == 'toc':
+            peer_dir = os.path.dirname(prt_fn)  # 当前 父条目 对应的文件所在目录, e.g.: PydocCHM\3.11.9\whatsnew
+            for tit, href in items:
+                ch_fn = os.path.join(peer_dir, href)   # e.g.: PydocCHM\3.11.9\whatsnew\3.11.html, 指向文件
+                href = self.cvt_fn_href(ch_fn, True)  # 位于父条目所在目录 e.g.: whatsnew/3.11.html
+                ch_chap = prt_chap.add_child(tit, href)
+                if '#' not in href:  # 只有指向文件的 toctree-l1 条目才有可能有下级
+                    yield ch_chap, ch_fn
+        elif kind == 'bm':
+            bm_host_href = prt_chap.Local  # 书签所在文件的引用, 如: whatsnew/3.11.html
+            add_bm_chap(prt_chap, items)
+        elif not ignore_no_list:
+            raise LookupError(f'no toctree-wrapper or sphinxsidebarwrapper found in {prt_fn}')
+
     def add_desc_fr_list(self, prt_chap: ChmHhcItem, prt_fn: str, ignore_no_list=True):
         """
         给父目录增加子目录, 子条目来自各父条目对应html文件内的 toctree-l1 或者 sphinxsidebarwrapper
+        只是先登记, 由 run_toc_jobs 统一处理
         :param prt_chap: 父条目(chm中的目录条目)
         :param prt_fn: 父条目对应的 html 文件, 如: PydocCHM\3.11.9\whatsnew\index.html
 
         :param ignore_no_list
         :return:
         """
-        bm_host_href = ''  # 书签所在文件的引用, 如: whatsnew/3.11.html
-
-        def add_bm_chap(start_hhc: ChmHhcItem, start_ul: bs4.Tag):
-            """
-            将 sphinxsidebarwrapper 中代表页内书签的 ul 转换成 chm中的章节目录的下级目录
-            :param start_hhc: chm 的目录条目
-            :param start_ul: bs4.Tag, html中对应的 ul
-            :return:
-            """
-            for li in start_ul.find_all('li', recursive=False):
-                tag_a = li.find('a', class_='reference internal')
-                href_ = bm_host_href + tag_a.get('href')  # 如: whatsnew/3.11.html#summary-release-highlights
-                tit = get_tag_text(tag_a)
-                sub_hhc = start_hhc.add_child(tit, href_)
-                if li.ul:  # 还有下级
-                    add_bm_chap(sub_hhc, li.ul)
-
-        prt_ph = Path(prt_fn)
-        soup = load_soup(prt_ph, 'utf-8', True)
-        peer_dir = os.path.dirname(prt_fn)  # 当前 父条目 对应的文件所在目录, e.g.: PydocCHM\3.11.9\whatsnew
-        if toctree := soup.body.find('div', class_='toctree-wrapper compound'):  # 有指向其它文件的纲要列表
-            for tag_li in toctree.find_all('li', class_="toctree-l1"):
-                href = tag_li.find('a').get('href')  # e.g.: 一般指向同目录下的文件, 如: 3.11.html
-                ch_fn = os.path.join(peer_dir, href)   # e.g.: PydocCHM\3.11.9\whatsnew\3.11.html, 指向文件
-                href = self.cvt_fn_href(ch_fn, True)  # 位于父条目所在目录 e.g.: whatsnew/3.11.html
-                ch_chap = prt_chap.add_child(get_tag_text(tag_li.a), href)
-                if '#' not in href:  # 只有指向文件的 toctree-l1 条目才有可能有下级
-                    self.add_desc_fr_list(ch_chap, ch_fn, ignore_no_list)
-        elif ssb_wrapper := soup.body.find('div', class_='sphinxsidebarwrapper'):  # 构建文内书签构成的子章节
-            # 找到页内书签列表总标题, 有些页面没有
-            if a := ssb_wrapper.find('a', class_='reference internal', href="#"):  # 这是 总标题, 如 "What’s New In Python 3.11"
-                bm_host_href = prt_chap.Local  # 如: whatsnew/3.11.html, 注意, 这个值在add_sub_chap的递归过程中是不变的
-                if (start_ul := a.find_next_sibling()) and start_ul.name == 'ul':
-                    add_bm_chap(prt_chap, start_ul)  # 以总标题的直接下级ul作为 prt_chap 目录的下级
-                elif (start_ul := a.parent.parent) and start_ul.name == 'ul':  # 如果没有下级ul, c-api\sys.html 是这种情况
-                    add_bm_chap(prt_chap, start_ul)  # 如果总标题下没有ul则以它所在的ul为起点
-        elif not ignore_no_list:
-            raise LookupError(f'no toctree-wrapper or sphinxsidebarwrapper found in {prt_fn}')
+        self._toc_roots.append((prt_chap, prt_fn, ignore_no_list))
 
-        self.html_comm_adjust(soup, prt_ph, True)
+    def extract_tocs(self, root_fns):
+        """
+        目录提取的工作队列: 从各父目录页面开始, 沿 toctree-l1 提取各下级页面的目录信息(ref: get_page_toc),
+        每个页面只处理一次, 结果登记在 pages 中(ref: process_pages), 同一页面被多个父页面引用, 或成环, 都不会重复处理;
+        workers > 0 时, 一个页面处理完, 马上把它的下级页面交给进程池, 各分支互不等待
+        """
+        seen = set()  # 已进入队列的页面(href)
+        todo = deque()  # 待处理的页面文件名
+
+        def enqueue(fn):
+            if (href := self.cvt_fn_href(fn, True)) not in seen:
+                seen.add(href)
+                todo.append(fn)
+
+        def add_children(fn, toc):
+            kind, items = toc
+            if kind == 'toc':  # 只有指向文件的 toctree-l1 条目才有可能有下级
+                for _, href in items:
+                    if '#' not in href:
+                        enqueue(os.path.normpath(os.path.join(os.path.dirname(fn), href)))
+
+        for fn in root_fns:
+            enqueue(os.path.normpath(fn))
+        if self.workers <= 0:
+            while todo:
+                fn = todo.popleft()
+                add_children(fn, self.process_pages([fn], ('toc',))[0]['toc'])
+            return
+
+        futures = {}  # future -> 页面文件名
+        while todo or futures:
+            while todo:
+                fn = todo.popleft()
+                if (data := self.pages.get(self.cvt_fn_href(fn, True))) and 'toc' in data:  # 已经处理过了
+                    add_children(fn, data['toc'])
+                else:
+                    futures[self.get_pool().submit(_page_job, self.page_job_args(fn, ('toc',)))] = fn
+            if futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    fn = futures.pop(future)
+                    add_children(fn, self.record_page(self.cvt_fn_href(fn, True), future.result())['toc'])
+
+    def run_toc_jobs(self):
+        """
+        处理由 add_desc_fr_list 登记的父目录:
+        先由 extract_tocs 提取所有涉及的页面的目录信息, 再在本进程中按原来递归的顺序构建目录树及 handled_html,
+        构建用显式的栈而不是递归, 不受递归深度的限制; 页面成环时(下级指向了自己的上级), 不再展开, 并记录警告
+        """
+        roots, self._toc_roots = self._toc_roots, []
+        if not roots:
+            return
+        self.extract_tocs([prt_fn for _, prt_fn, _ in roots])
+
+        def chap_items(prt_chap, prt_fn, ignore_no_list):
+            toc = self.pages[self.cvt_fn_href(prt_fn, True)]['toc']
+            return self.add_toc_items(prt_chap, prt_fn, toc, ignore_no_list)
+
+        for prt_chap, prt_fn, ignore_no_list in roots:
+            stack = [(prt_fn, chap_items(prt_chap, prt_fn, ignore_no_list))]  # (页面, 它的下级条目生成器)
+            path = {self.cvt_fn_href(prt_fn, True)}  # 当前路径上的各页面, 用于检测环
+            while stack:
+                fn, ch_items = stack[-1]
+                if (nxt := next(ch_items, None)) is None:  # 下级都处理完了
+                    stack.pop()
+                    path.discard(href := self.cvt_fn_href(fn, True))
+                    self.handled_html[href] = None
+                    continue
+                ch_chap, ch_fn = nxt
+                if (ch_href := self.cvt_fn_href(ch_fn, True)) in path:
+                    applog.warning('toctree cycle: %s in %s', ch_href, self.cvt_fn_href(fn, True))
+                    continue
+                path.add(ch_href)
+                stack.append((ch_fn, chap_items(ch_chap, ch_fn, ignore_no_list)))
 
     def add_l1_gloss_sub(self, l1_gl: ChmHhcItem, gl_ph: Path):
         """
@@ -181,29 +492,36 @@ class Html2Chm:
         :param gl_ph: 就是 PydocCHM\3.11.9\glossary.html
         :return:
         """
-        for char in range(64, 91):  # 增加术语分组节点: @,A ~~ Z, 作为 level 2 目录
-            l1_gl.add_child(chr(char), '')
+        # 术语分组节点: @,A ~~ Z, 作为 level 2 目录, 按首字母
+        buckets = {char: l1_gl.add_child(char, '') for char in ChmDocIndex.GLOSS_GROUPS}
+        for _, tit, href, group, _ in self.special_page(gl_ph, 'gloss'):
+            buckets[group].add_child(tit, l1_gl.Local + href)
 
-        soup = load_soup(gl_ph, 'utf-8', True)
+        # 分组节点的href设为与第一个子节点相同
+        for group_item in l1_gl.Children:
+            if group_item.Children:
+                group_item.Local = group_item.Children[0].Local
+
+    @staticmethod
+    def get_gloss_terms(soup: BeautifulSoup) -> list:
+        """
+        提取 glossary.html 中的术语, ref: add_l1_gloss_sub
+        :return: [DocIndexRecord, ...], 都是术语('term'), href 形如 #term-0
+        """
+        terms = []
         for dt in soup.find_all('dt'):  # 每个dt是一个术语
             # tit =  dt.code.span.string
             href = dt.a['href']
             dt.a.decompose()  # 不再需要这个a标签
             tit = ''.join(dt.stripped_strings)
             # tit = tit[:len(tit)-1]  # 最后一个字符是 ¶, 不要
+            terms.append(DocIndexRecord('term', tit, href, ChmDocIndex.gloss_group(tit), ''))
+        return terms
 
-            # 根据首字母查找所属的group, 找不到的都放第一组, '@'组
-            first_let = tit.strip(' _').upper()[0]
-            if not (group_item := l1_gl.find_child(first_let)):
-                group_item = l1_gl.Children[0]
-            group_item.add_child(tit, l1_gl.Local + href)
-
-        # 分组节点的href设为与第一个子节点相同
-        for group_item in l1_gl.Children:
-            if group_item.Children:
-                group_item.Local = group_item.Children[0].Local
-
-        self.html_comm_adjust(soup, gl_ph, True)
+    @staticmethod
+    def get_gloss_terms_lx(root: lxml.html.HtmlElement) -> list:
+        """ lxml 引擎版的 get_gloss_terms, 结果与之相同 """
+        return [ChmDocIndex.gloss_record(dt) for dt in root.iter('dt')]  # 每个dt是一个术语
 
     def add_l1_pymod_sub(self, l1_pymod: ChmHhcItem, pymod_ph: Path):
         """
@@ -212,38 +530,86 @@ class Html2Chm:
         :param pymod_ph: PydocCHM\3.11.9\py-modindex.html
         :return:
         """
-        soup = load_soup(pymod_ph, 'utf-8', True)
-        soup.delete('div', class_='modindex-jumpbox')  # 有了目录条目,这个不要了
+        groups = {}  # 首字母 -> 一级分组
+        modules = {}  # 模块名 -> 一级分组成员, 同时也可以作为二级分组
+        pymod_href = self.cvt_fn_href(str(pymod_ph), True)
+        for kind, name, href, group, parent in self.special_page(pymod_ph, 'pymod'):
+            if kind == 'group':  # 开始一个新的一级分组, 按首字母
+                groups[group] = l1_pymod.add_child(name, pymod_href + href)
+            elif not parent:  # 一级分组成员
+                modules[name] = groups[group].add_child(name, href)
+            else:  # 二级分组成员, 子模块
+                modules[parent].add_child(name, href)
+
+    @staticmethod
+    def get_pymod_rows(soup: BeautifulSoup, prof: DocProfile) -> list:
+        """
+        提取 py-modindex.html 中的模块表, ref: add_l1_pymod_sub
+        :return: [DocIndexRecord, ...], 按表中的顺序:
+            'group': 首字母分组, href 形如 #cap-a
+            'module': 模块, 子模块的 parent_module 为它上面的一级模块, 没有链接的模块 href 为空
+        """
+        if jumpbox := prof.find(soup, 'modindex-jumpbox'):  # 有了目录条目,这个不要了
+            jumpbox.decompose()
 
+        rows = []
+        group = parent = ''
         tab_it = soup.find('table', class_='indextable modindextable')
-        l1_grp = l2_grp = None  # ChmHhcItem
-        pymod_href = self.cvt_fn_href(str(pymod_ph), True)
         for tr in tab_it.find_all('tr', recursive=False):  # 逐行处理
             if tr.has_attr('class') and tr['class'][0] == 'cap':  # 开始一个新的一级分组, 按首字母
-                l1_grp = l1_pymod.add_child(get_tag_text(tr).upper(), pymod_href+'#'+tr['id'])  # 一级分组
+                group = get_tag_text(tr).upper()
+                rows.append(DocIndexRecord('group', group, '#' + tr['id'], group, ''))
             elif tag_code := tr.find('code', class_="xref"):  # 一个模块
                 if tag_a := tag_code.find_parent('a'): href = tag_a.get('href')
                 else: href = ''
                 # assert tag_a is not None, get_tag_text(tag_code)
+                name = get_tag_text(tag_code)
                 if tr.has_attr('class') and (tr['class'][0]).startswith('cg-'):  # 二级分组成员, 子模块
-                    l2_grp.add_child(get_tag_text(tag_code), href)
+                    rows.append(DocIndexRecord('module', name, href, group, parent))
                 else:
-                    l2_grp = l1_grp.add_child(get_tag_text(tag_code), href)  # 一级分组成员, 同时也可以作为二级分组
-
-        self.html_comm_adjust(soup, pymod_ph, True)
-
-    def html_comm_adjust(self, soup: BeautifulSoup, dest_ph, rec_path: bool):
+                    parent = name
+                    rows.append(DocIndexRecord('module', name, href, group, ''))
+        return rows
+
+    @staticmethod
+    def get_pymod_rows_lx(root: lxml.html.HtmlElement, prof: DocProfile) -> list:
+        """ lxml 引擎版的 get_pymod_rows, 结果与之相同 """
+        if jumpbox := prof.xp('modindex-jumpbox')(root):
+            jumpbox[0].drop_tree()  # 有了目录条目,这个不要了
+        return list(ChmDocIndex.pymod_records(ChmDocIndex.MODINDEX_TAB(root)[0].iterfind('tr')))
+
+    def special_page(self, ph: Path, kind: str):
         """
-        对html页面进行公共的处理
-        :param soup:
-        :param dest_ph:
-        :param rec_path: 要不要记录当前文件为已经处理
-        :return:
+        处理需要专门提取数据的页面, 如 glossary.html, py-modindex.html: 提取数据后再进行公共调整, ref: process_pages
+        :param ph: 页面文件名
+        :param kind: 提取器, ref: PAGE_EXTRACTORS
+        :return: 提取器的结果
+        """
+        data = self.process_pages([ph], (kind,))[0]
+        self.handled_html[self.cvt_fn_href(ph, True)] = None
+        return data[kind]
+
+    def count_cache(self, hit):
+        """ 统计缓存命中情况, hit 为None表示没有使用缓存 """
+        if hit is not None:
+            if hit:
+                self._cache.hits += 1
+            else:
+                self._cache.misses += 1
+
+    def page_done(self, href, hit, secs):
+        """ 一个页面处理完了: 统计缓存命中情况, 登记页面耗时 """
+        self.count_cache(hit)
+        if self.profiler:
+            self.profiler.add_page(href, secs, hit)
+
+    @staticmethod
+    def adjust_page_src(soup: BeautifulSoup, prof: DocProfile) -> bytes:
+        """
+        html页面公共处理的核心部分, 返回处理后的页面(已按 PAGE_CS 编码), 不依赖 Html2Chm 实例, 可在进程池中执行
+        body 中要删除的导航条, 侧栏, 页脚, 标题后的 ¶ 等由 prof.removals 给出, ref: DocProfile.apply_bs4
+        ref: _page_job
         """
-        # if self.seg_debug:
-        #     return
-        applog.info(f'{dest_ph=}')
-
         head = soup.head
         new_tag = soup.new_tag('meta', attrs={'http-equiv': "X-UA-Compatible", 'content': "IE=edge"})
         head.insert(0, new_tag)
@@ -253,45 +619,194 @@ class Html2Chm:
             if (ipos := href.find('?')) != -1:
                 link_ss['href'] = href[:ipos]
 
-        head.delete_all('script')  # 8 个
-        head.delete_all('link', rel='search')  # 2个
+        delete_all(head, 'script')  # 8 个
+        delete_all(head, 'link', rel='search')  # 2个
 
         # 将title中的多余的 '— Python 3.11.9 documentation' 去掉
         tit = head.title.string.rsplit('—', 1)[0].strip()
         head.title.string = tit
 
-        body = soup.body
-        body.delete('div', class_='mobile-nav')  # 1个
-        body.delete_all('div', class_='related', role="navigation")  # 2个
-        if wrap_ := body.find('div', class_='bodywrapper'):  # 脱掉 <div class="bodywrapper">
-            wrap_.unwrap()
-        body.delete('div', class_='sphinxsidebar')  # 1个
-        body.delete('div', class_='footer')  # 1个
-        body.delete_all('a', class_="headerlink")  # 各级标题后面的锚点,个数不定,显示为 ¶
+        prof.apply_bs4(soup.body)  # mobile-nav, related, bodywrapper, sphinxsidebar, footer, headerlink 等
 
         html_src = str(soup)
         html_src = re.sub(r'<meta *charset *= *"utf-8" */>', f'<meta charset="{Html2Chm.PAGE_CS}" />',
                           html_src, count=1, flags=re.I)
+        return Html2Chm.finish_page_src(html_src, tit)
+
+    @staticmethod
+    def load_page_lx(src: bytes) -> lxml.html.HtmlElement:
+        """
+        lxml 引擎: 解析页面, 与 load_soup_src 对应
+        解析后马上与 bs4 一样处理空白, 这样提取器或公共调整删除元素后, 相邻的空白才会与 bs4 的结果一致
+        """
+        root = load_lx_src(src, 'utf-8')
+        lx_collapse_space(root)
+        return root
 
-        # 转义非ascii字符, 但 <title> 不转义, ref: npchmutil.py
-        html_src = html_esc_ex(html_src, False, True)
+    @staticmethod
+    def adjust_page_src_lx(root: lxml.html.HtmlElement, prof: DocProfile) -> bytes:
+        """
+        lxml 引擎版的 adjust_page_src, 调整内容与之相同, 用预编译的 XPath 查找, 最后只序列化一次
+        输出与 bs4 引擎的 DOM 一致, 但序列化细节(属性顺序, 空元素的写法等)不同, ref: bench\cmp_engine.py
+        :param root: 由 load_page_lx 解析而来
+        """
+        xp = Html2Chm.LX_XPATH
+
+        head = root.find('head')
+        new_tag = head.makeelement('meta', {'http-equiv': "X-UA-Compatible", 'content': "IE=edge"})
+        new_tag.tail, head.text = head.text, None  # 插在 head 最前面, 原来开头的空白跟在它后面
+        head.insert(0, new_tag)
+
+        for link_ss in xp['stylesheet'](head):
+            href = link_ss.get('href', '')
+            if (ipos := href.find('?')) != -1:
+                link_ss.set('href', href[:ipos])
+
+        for tag_ in head.findall('.//script') + xp['search'](head):
+            tag_.drop_tree()
+
+        title = head.find('.//title')
+        tit = title.text.rsplit('—', 1)[0].strip()
+        title.text = tit
+
+        for meta in head.iter('meta'):  # 对应 adjust_page_src 中的 re.sub
+            if meta.attrib.keys() == ['charset'] and meta.get('charset').lower() == 'utf-8':
+                meta.set('charset', Html2Chm.PAGE_CS)
+                break
+
+        prof.apply_lx(root.find('body'))  # 按顺序逐个查找删除, ref: adjust_page_src
+
+        html_src = etree.tostring(root.getroottree(), method='html', encoding='unicode')
+        return Html2Chm.finish_page_src(html_src, tit)
+
+    @staticmethod
+    def finish_page_src(html_src: str, tit: str) -> bytes:
+        """ 两种引擎共用的最后一步: 转义非ascii字符, 但 <title> 不转义, 编码成要写出的 bytes """
+        # ref: npchmutil.py
+        # title 前后两段转义并编码, title 只转义html符号, 按页面字符集编码, 直接拼成要写出的 bytes
         pos_1 = html_src.find('<title>')
         pos_2 = html_src.find('</title>')
         tit = html_esc_ex(tit, True, False)
-        src_ = html_src[:pos_1] + '<title>' + tit + html_src[pos_2:]
-        dest_ph.write_text(src_, Html2Chm.PAGE_CS)
-
-        if rec_path:
-            self.handled_html[self.cvt_fn_href(dest_ph, True)] = None  # 只需要保存 文件名
+        return b''.join((html_esc_enc(html_src[:pos_1]), b'<title>', tit.encode(Html2Chm.PAGE_CS),
+                         html_esc_enc(html_src[pos_2:])))
+
+    @staticmethod
+    def write_page(src_: bytes, dest_ph: Path, make_dir: bool):
+        """ 写出处理后的页面(已编码), make_dir: 目录可能还不存在(zip_src 模式下页面未解压过) """
+        if make_dir:
+            dest_ph.parent.mkdir(parents=True, exist_ok=True)
+        if os.linesep != '\n':  # 与原来的 write_text 一样, 换行按系统习惯写出
+            src_ = src_.replace(b'\n', os.linesep.encode('ascii'))
+        dest_ph.write_bytes(src_)
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        """ 页面转换用的进程池, 按需创建; 有外部提供的 shared_pool 时就用它 """
+        if self.shared_pool is not None:
+            return self.shared_pool
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_page_worker,
+                                             initargs=(applog.level, get_worker_log_queue()))
+        return self._pool
+
+    def close_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
     def adjust_remains_html(self):
-        """ 对剩下的html页面执行公共调整 """
-        p = Path(self.doc_root).resolve()
-        for ph in p.rglob('*.html'):
-            rel_fn = str(ph.relative_to(p)).replace(os.sep, '/')
-            if rel_fn not in self.handled_html:
-                soup = load_soup(ph, 'utf-8', True)
-                self.html_comm_adjust(soup, ph, False)
+        """ 对剩下的(页面登记表中尚未处理的)html页面执行公共调整 """
+        self.process_pages([self.cvt_fn_href(href, False) for href, data in self.pages.items() if data is None])
+        self.close_pool()
+        self.close_zip()
+        if self.profiler and self._pipeline:
+            self.profiler.add_counters('io_pipeline', self._pipeline.stats())
+
+        if cache := self.get_cache():
+            applog.info('build cache: hits=%d, misses=%d', cache.hits, cache.misses)
+
+    def gen_hhk_file(self):
+        """
+        由 genindex-all.html 流式生成 hhk 文件, 条目边解析边写出, 不建整个文档树, 也不保留, ref: ChmHhk.iter_hhk_entries
+        zip_src 模式下直接读 zip 中的页面; 写出 hhk 后再对这个页面做公共调整
+        使用增量构建缓存时, 生成的 hhk 以 genindex-all.html 的源码为 key 缓存, 命中时直接写出, 不再解析
+        """
+        fn = Path(self.doc_root, 'genindex-all.html')
+        src_zip, name, _ = self.page_src_args(fn)
+        if (cache := self.get_cache()) is not None:
+            src = read_page_src(src_zip, name, str(fn))
+            key = cache.key(src, 'hhk' if self.sitemap_indent else 'hhk-flat')
+            hhk_ph = Path(self.doc_root, 'pythondoc.hhk')
+            if (val := cache.get(key)) is not None:
+                hhk_ph.write_bytes(val.encode(self.PAGE_CS))
+            else:
+                ChmHhk.gen_hhk_file(self.doc_root, self.PAGE_CS, io.BytesIO(src), self.sitemap_indent)
+                cache.put(key, hhk_ph.read_bytes().decode(self.PAGE_CS))  # 缓存是json, 存 str
+            self.count_cache(val is not None)
+        elif src_zip:
+            with zipfile.ZipFile(src_zip) as zip_ref, zip_ref.open(name) as src:
+                ChmHhk.gen_hhk_file(self.doc_root, self.PAGE_CS, src, self.sitemap_indent)
+        else:
+            ChmHhk.gen_hhk_file(self.doc_root, self.PAGE_CS, str(fn), self.sitemap_indent)
+        self.process_pages([fn])
+
+    def prune_files(self) -> tuple:
+        """
+        删除从目录(handled_html), 索引(hhk)及默认主题出发, 沿页面的 href/src 及 css 的 url() 引用不到的页面及资源文件,
+        它们不会放入chm, 全文检索的索引也随之变小; 只涉及页面登记表 pages 中的页面及资源清单 assets 中的文件, ref: nplinks
+        各页面的引用在页面处理时已提取(ref: _page_job), 这里只需读取 css 文件
+        :return: (删除的页面数, 删除的资源文件数)
+        """
+        graph = LinkGraph()
+        for href, data in self.pages.items():
+            if data is not None:
+                graph.add(href, data.get('refs', ()))
+        for href in self.assets:
+            if href.endswith('.css'):
+                graph.add(href, css_refs(Path(self.doc_root, href).read_bytes()))
+
+        roots = ['index.html', *self.handled_html]  # index.html 是默认主题, ref: chm_utils\pythondoc.hhp
+        if (hhk_ph := Path(self.doc_root, 'pythondoc.hhk')).is_file():  # 索引的条目不保留, 从写出的 hhk 中读取
+            roots += [local for _, local in sitemap_links(hhk_ph.read_bytes(), self.PAGE_CS)]
+        graph.add('', roots)
+        keep = graph.reachable([''])
+
+        pruned = [href for href in self.pages if href not in keep], [href for href in self.assets if href not in keep]
+        for href in pruned[0]:
+            del self.pages[href]
+        for href in pruned[1]:
+            del self.assets[href]
+        for href in pruned[0] + pruned[1]:
+            Path(self.doc_root, href).unlink(True)  # 资源文件可能是 AssetStore 中对象的硬链接, 只删除链接
+        applog.info('pruned %d pages, %d assets', len(pruned[0]), len(pruned[1]))
+        return len(pruned[0]), len(pruned[1])
+
+    def minify_assets(self):
+        """
+        压缩资源清单中的 css; 资源文件可能是 AssetStore 中对象的硬链接, 不能就地修改:
+        有 asset_store 时压缩后的内容也存入存储再链接过来(各版本共用), 否则写出新文件再替换
+        """
+        for href in [href for href in self.assets if href.endswith('.css')]:
+            ph = Path(self.doc_root, href)
+            src = ph.read_bytes()
+            css = minify_css(src)
+            self._css_sizes[href] = [len(src), len(css)]
+            if self.asset_store is not None:
+                self.assets[href] = self.asset_store.put(css)
+                self.asset_store.link(self.assets[href], str(ph))
+            else:
+                tmp_ph = ph.with_name(ph.name + '.tmp')
+                tmp_ph.write_bytes(css)
+                os.replace(tmp_ph, ph)
+
+    def size_report(self) -> dict:
+        """ 压缩(minify)前后的大小: 各页面, 各 css 及合计 """
+        pages = {href: data['size'] for href, data in self.pages.items() if data and 'size' in data}
+        sizes = [*pages.values(), *self._css_sizes.values()]
+        before, after = sum(sz[0] for sz in sizes), sum(sz[1] for sz in sizes)
+        return {'total': {'before': before, 'after': after,
+                          'saved': round(1 - after / before, 4) if before else 0},
+                'pages': pages,
+                'css': self._css_sizes}
 
     def gen_hhp_file(self) -> str:
         """
@@ -302,12 +817,14 @@ class Html2Chm:
 
         # print(root_chap_dict)
         # 生成hpp文件
-        hpp_src = Path(Html2Chm.CHM_UTILS, 'pythondoc.hhp').read_text(Html2Chm.PAGE_CS)  # hhp模板
+        if self.prune_unreferenced:
+            self.prune_files()
+        if self.minify:
+            self.minify_assets()
+        hpp_src = read_chm_util('pythondoc.hhp', Html2Chm.PAGE_CS)  # hhp模板
         hhp_files = []
 
-        len_ = len(self.doc_root) + 1  # 去掉开头的 'PydocCHM\3.11.9'
-        hhp_files += [str(f)[len_:] for f in Path(self.doc_root, '_images').rglob('*.*')]
-        hhp_files += [str(f)[len_:] for f in Path(self.doc_root, '_static').rglob('*.*')]
+        hhp_files += sorted(self.assets)  # _images, _static 下的文件, 由资源清单给出, 不再遍历目录
 
         hhp_files += self.handled_html.keys()
 
@@ -317,11 +834,104 @@ class Html2Chm:
 
         return hpp_fn
 
+    def compile_chm(self, hhp_fn) -> bool:
+        """
+        编译 chm, 方式由 chm_mode 决定; npitsf 编译时 LZX 各复位区间交给进程池(workers > 0 或批量构建共用的)并行压缩
+        """
+        if self.chm_mode == 'hha':
+            with _hha_lock:  # hha.dll 不能同时编译多个
+                return HhaWrap.compile_hhp_ex(os.path.join(self.CHM_UTILS, 'hha.dll'), hhp_fn)
+        pool = self.get_pool() if self.workers > 0 or self.shared_pool is not None else None
+        try:
+            ChmWriter(hhp_fn, self.chm_mode, self.PAGE_CS, self.lzx_level).compile(self.dest_chm, pool)
+        finally:
+            self.close_pool()
+        return True
+
+    def verify_chm_file(self, hhp_fn) -> dict:
+        """ 检查编译生成的 chm(ref: npchmread.verify_chm), 有问题时记录错误, 检查结果的个数附加在构建统计中 """
+        report = verify_chm(self.dest_chm, hhp_fn, charset=self.PAGE_CS)
+        for key in ('missing_files', 'missing_locals'):
+            for item in report[key][:20]:
+                applog.error('verify chm, %s: %s', key, item)
+        if self.profiler:
+            self.profiler.add_counters('verify', {key: len(val) if isinstance(val, list) else val
+                                                  for key, val in report.items()})
+        return report
+
+    def check_link_targets(self) -> dict:
+        """
+        检查目录(hhc), 索引(hhk)及各页面中的链接: 目标页面(或资源文件)存在, 有 #书签 的, 页面中有这个 id/name;
+        各页面的书签与引用在页面处理时已提取(进程池中并行, ref: transform_page), 这里只建书签索引, 逐个链接查集合,
+        不再读取或解析页面; 有问题的链接记录错误, 个数附加在构建统计中
+        :return: 检查报告, broken: [(来源, 链接, 原因), ...], ok 为 True 表示全部通过
+        """
+        t0 = time.perf_counter()
+        index = AnchorIndex([*self.assets, *self.handled_html, 'about this CHM.htm'])  # 后者由 adjust_files 写出
+        for href, data in self.pages.items():
+            if data is not None:
+                index.add(href, data.get('anchors', ()))
+        sources = []
+        for fn in ('pythondoc.hhc', 'pythondoc.hhk'):
+            sources += [(f'{fn}: {label}', '', [local])
+                        for label, local in sitemap_links(Path(self.doc_root, fn).read_bytes(), self.PAGE_CS)]
+        sources += [(href, href, data.get('refs', ())) for href, data in self.pages.items() if data is not None]
+        links, broken = check_links(index, sources)
+        for item in broken[:20]:
+            applog.error('broken link, %s: %s, %s', *item)
+        report = {'pages': len(index.anchors), 'anchors': sum(map(len, index.anchors.values())), 'links': links,
+                  'broken': broken, 'ok': not broken, 'secs': round(time.perf_counter() - t0, 3)}
+        if self.profiler:
+            self.profiler.add_counters('check_links', {key: len(val) if isinstance(val, list) else val
+                                                       for key, val in report.items()})
+        return report
+
+    def build(self):
+        """ 依次执行各个阶段, 构建本版本的chm; 设置了 profiler 时统计各阶段的耗时 """
+        stage = self.profiler.stage if self.profiler else lambda name: nullcontext()
+        with stage('upack_html_zip'):
+            self.upack_html_zip()
+        with stage('adjust_files'):
+            self.adjust_files()
+        with stage('gen_hhc_file'):
+            self.gen_hhc_file()
+        with stage('gen_hhk_file'):
+            self.gen_hhk_file()
+        with stage('adjust_remains_html'):
+            self.adjust_remains_html()
+        with stage('gen_hhp_file'):
+            hhp_fn = self.gen_hhp_file()
+        if self.check_links:
+            with stage('check_links'):
+                self.link_report = self.check_link_targets()
+        with stage('compile'):
+            self.compile_chm(hhp_fn)
+        if self.verify_chm:
+            with stage('verify'):
+                self.verify_chm_file(hhp_fn)
+
+    def write_reports(self):
+        """
+        build 之后把本版本的报告写到 CHM_DIR 下: 链接检查(check_links): link_report_<版本>.json,
+        压缩(minify): minify_report_<版本>.json, 构建统计(设置了 profiler 时): build_report_<版本>.json
+        """
+        if self.link_report is not None:
+            with open(Path(self.CHM_DIR, f'link_report_{self.doc_ver}.json'), 'w', encoding='utf-8') as f:
+                json.dump(self.link_report, f, ensure_ascii=False, indent=1)
+        if self.minify:
+            with open(Path(self.CHM_DIR, f'minify_report_{self.doc_ver}.json'), 'w', encoding='utf-8') as f:
+                json.dump(self.size_report(), f, indent=1)
+        if self.profiler:
+            self.profiler.write_report(Path(self.CHM_DIR, f'build_report_{self.doc_ver}.json'),
+                                       doc_ver=str(self.doc_ver), engine=self.engine, workers=self.workers,
+                                       chm_mode=self.chm_mode)
+
     def gen_hhc_file(self):
         """
-        本chm文档的根目录,共15条,即 15个根章节(level 1 chap),根据 index.html 整理,参考了之前的chm版本及Delphi CHM文档的结构,
+        本chm文档的根目录,即根章节(level 1 chap),根据 index.html 整理,参考了之前的chm版本及Delphi CHM文档的结构,
         第1章是文档总图, 它下面没有子章节; 对应 index.html
-        第2~11章 各自对应一个子目录, 目录下有一个index.html, 这个index.html作为本章节的总纲,
+        其后各章由 profile.chapters 给出(随版本变化, 如 3.12 起有 Deprecations), 页面不存在的跳过;
+            各自对应一个子目录, 目录下有一个index.html, 这个index.html作为本章节的总纲,
             以这个文件开始,构建下级子菜单:
                 如果它内含一个 <div class="toctree-wrapper compound">,则本文件主要用作提纲, 其下<li class="toctree-l1"> 作为下级目录,
                     这些<li class="toctree-l1">一般也是指向另外一个文件的
@@ -330,9 +940,9 @@ class Html2Chm:
 
         distributing/index.html 已无具体内容, 不设目录
 
-        第12章  术语表, 目录其实是按首字母分组而已
-        第13章  模块表, 目录也是按首字母分组而已
-        第14章, 'Project information'本身没有对应的文件, 归集了一些 补充性质的文件
+        然后是 术语表, 目录其实是按首字母分组而已
+        模块表, 目录也是按首字母分组而已
+        'Project information'本身没有对应的文件, 归集了一些 补充性质的文件
 
         基于 python-3.11.9-docs-html
         :return:
@@ -342,7 +952,7 @@ class Html2Chm:
 
         def add_l1_chap(chap_info_str, def_add_sub) -> ChmHhcItem:  # 增加顶层(level 1)目录
             name_, local_ = chap_info_str.split('=', 1)
-            applog.debug(f'{local_}')
+            applog.debug('%s', local_)
             l1_chap_ = ultra_root.add_child(name_, local_)
             if def_add_sub:  # 执行默认的增加下级操作
                 fn = self.cvt_fn_href(l1_chap_.Local, False)
@@ -350,25 +960,21 @@ class Html2Chm:
             return l1_chap_
 
         add_l1_chap(r'Python documentation total map=index.html', False)  # 1,第一章
-        add_l1_chap(r"What’s new=whatsnew/index.html", True)  # 2
-        add_l1_chap(r'Setup and usage=using/index.html', True)  # 3
-        add_l1_chap(r'Tutorial=tutorial/index.html', True)  # 4
-        add_l1_chap(r'Language reference=reference/index.html', True)  # 5
-        add_l1_chap(r'Library reference=library/index.html', True)  # 6
-        add_l1_chap(r'Installing modules=installing/index.html', True)  # 7
-        add_l1_chap(r'Extending and embedding=extending/index.html', True)  # 8
-        add_l1_chap(r'Python/C API=c-api/index.html', True)  # 9
-        add_l1_chap(r'HOWTOs=howto/index.html', True)  # 10
-        add_l1_chap(r'FAQs=faq/index.html', True)  # 11
-
-        l1_chap = add_l1_chap(r'Glossary=glossary.html', False)  # 12
+        for name, href in self.profile.chapters:  # 2 ~
+            if href not in self.pages:
+                applog.warning('chapter skipped, no page: %s, profile=%s', href, self.profile.name)
+                continue
+            add_l1_chap(f'{name}={href}', True)
+        self.run_toc_jobs()  # 处理前面登记的各章, 进程池模式下并行
+
+        l1_chap = add_l1_chap(r'Glossary=glossary.html', False)
         self.add_l1_gloss_sub(l1_chap, Path(self.doc_root, l1_chap.Local))
 
-        l1_chap = add_l1_chap(r'Global module index=py-modindex.html', False)  # 13
+        l1_chap = add_l1_chap(r'Global module index=py-modindex.html', False)
         self.add_l1_pymod_sub(l1_chap, Path(self.doc_root, l1_chap.Local))
 
         # 下面这几个文件性质相近, 且使用频率不高, 归在一起, 原 python31010.chm 是分开的
-        l1_chap = add_l1_chap(r'Project information=', False)  # 14,  使用 index.html 中的分组名字
+        l1_chap = add_l1_chap(r'Project information=', False)  # 使用 index.html 中的分组名字
         l1_chap.add_child('About the documentation', 'about.html')  # 较为简单,无需再增加下级目录
 
         l2_chap = l1_chap.add_child('History and license', 'license.html')  # 有 sphinxsidebarwrapper
@@ -378,54 +984,277 @@ class Html2Chm:
 
         l2_chap = l1_chap.add_child('Reporting issues', 'bugs.html')  # 有 sphinxsidebarwrapper
         self.add_desc_fr_list(l2_chap, self.cvt_fn_href('bugs.html', False))
+        self.run_toc_jobs()
 
         add_l1_chap('about this CHM=about this CHM.htm', False)  # 加上CHM说明
 
         # 目录列表写入 *.hhc 文件
-        src_list = []
-        ultra_root.output_src(src_list, 0)
-        hhc_src = Path(self.CHM_UTILS, 'pythondoc.hhc').read_text(self.PAGE_CS)  # hhc模板
-        hhc_src = hhc_src.format('\n'.join(src_list))
-        Path(self.doc_root, 'pythondoc.hhc').write_text(hhc_src, self.PAGE_CS)
-
-    def convert(self):
-        # self.upack_html_zip()
-        # 删除无用文件
-        self.adjust_files()
-
-        # hpp_fn = self.gen_hhp_file()
-        # ChmHhc.gen_hhc_file(self)
-        # ChmHhk.gen_hhk_file(self)
-        #
-        # self.trans_xhtml()
-        # HhaWrap.compile_hhp_ex('hha.dll', hpp_fn)
+        hhc_fn = Path(self.doc_root, 'pythondoc.hhc')
+        with SitemapWriter(hhc_fn, self.PAGE_CS, 'pythondoc.hhc', self.sitemap_indent) as writer:  # 按hhc模板写出
+            ultra_root.output_src(writer, 0)
+
+
+class Html2ChmBatch:
+    """
+    批量构建: 一次构建多个版本的chm, 如各个 3.x 分支的最新版本
+    各版本在各自的线程中依次执行 Html2Chm 的各个阶段(ref: Html2Chm.build), 页面转换及 npitsf 的编译都交给同一个进程池;
+    chm_utils 下的模板, Fts_stop_list.stp 只读一次(ref: read_chm_util),
+    设置了 asset_store 时 _static, _images 下相同的文件只存一份(ref: AssetStore), 设置了 cache_dir 时页面转换共用增量构建缓存
+    最后汇总各版本各阶段的耗时, 写到 PydocCHM\batch_report.json
+    """
+    def __init__(self, srcs, workers=os.cpu_count(), parallel=2):
+        """
+        :param srcs: 文档zip包(如 python-3.11.9-docs-html.zip)或其所在目录的列表
+        :param workers: 共用进程池的进程数
+        :param parallel: 同时构建几个版本
+        """
+        self.zip_list = self.find_zips(srcs)
+        self.workers = workers
+        self.parallel = parallel
+        # 以下设置各版本相同, 默认值与 Html2Chm 的相同, ref: Html2Chm.__init__, main
+        self.zip_src = False
+        self.io_pipeline = False
+        self.cache_dir = ''
+        self.engine = 'bs4'
+        self.chm_mode = 'hha'
+        self.lzx_level = 'default'
+        self.prune_unreferenced = False
+        self.minify = False
+        self.verify_chm = False
+        self.check_links = False
+        self.asset_store = None  # ref: Html2Chm.upack_html_zip
+        self.reports = {}  # 版本 -> 构建统计报告(ref: BuildProfiler.report), 失败时为 {'error': ...}
+
+    @staticmethod
+    def find_zips(srcs) -> list:
+        """ 列出所有文档zip包, 同一版本只取一个, 按版本排序 """
+        zips = {}
+        for src in srcs:
+            for ph in (Path(src).glob('python-*-docs-html.zip') if Path(src).is_dir() else [Path(src)]):
+                if m := re.match(r'python-(\d+\.\d+\.\d+)-docs', ph.name, re.I):
+                    zips.setdefault(Version(m.group(1)), str(ph))
+        return [zips[ver] for ver in sorted(zips)]
+
+    def build_one(self, src_zip, pool) -> dict:
+        h2c = Html2Chm(src_zip)
+        h2c.zip_src = self.zip_src
+        h2c.io_pipeline = self.io_pipeline
+        h2c.workers = self.workers
+        h2c.cache_dir = self.cache_dir
+        h2c.engine = self.engine
+        h2c.chm_mode = self.chm_mode
+        h2c.lzx_level = self.lzx_level
+        h2c.prune_unreferenced = self.prune_unreferenced
+        h2c.minify = self.minify
+        h2c.verify_chm = self.verify_chm
+        h2c.check_links = self.check_links
+        h2c.shared_pool = pool
+        h2c.asset_store = self.asset_store
+        h2c.profiler = BuildProfiler(top_n=10)
+        h2c.build()
+        h2c.write_reports()  # 各版本的报告同单个版本构建, 汇总的另写到 batch_report.json
+        info = {'minify': h2c.size_report()['total']} if h2c.minify else {}
+        return h2c.profiler.report(doc_ver=str(h2c.doc_ver), chm=h2c.dest_chm, **info)
+
+    def run(self) -> dict:
+        """ 构建所有版本, 一个版本失败不影响其它版本; 返回汇总报告 """
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(self.workers, initializer=_init_page_worker,
+                                 initargs=(applog.level, get_worker_log_queue())) as pool, \
+                ThreadPoolExecutor(self.parallel) as builders:
+            futures = {Path(src_zip).name: builders.submit(self.build_one, src_zip, pool) for src_zip in self.zip_list}
+            for name, future in futures.items():
+                try:
+                    self.reports[name] = future.result()
+                except Exception as e:
+                    applog.exception('%s: %r', name, e)
+                    self.reports[name] = {'error': repr(e)}
+
+        summary = {'total_wall': round(time.perf_counter() - t0, 4), 'workers': self.workers,
+                   'parallel': self.parallel, 'engine': self.engine, 'chm_mode': self.chm_mode,
+                   'lzx_level': self.lzx_level,
+                   'versions': self.reports}
+        with open(Path(Html2Chm.CHM_DIR, 'batch_report.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return summary
+
+    @staticmethod
+    def print_summary(summary: dict):
+        """ 各版本各阶段的耗时(墙钟时间, 秒); 各版本同时构建, 因此总时间小于各版本之和 """
+        stages = ('upack_html_zip', 'adjust_files', 'gen_hhc_file', 'gen_hhk_file', 'adjust_remains_html',
+                  'gen_hhp_file', 'check_links', 'compile', 'verify')
+        print(f'{"zip":<32s}' + ''.join(f'{st[:12]:>13s}' for st in stages) + f'{"total":>9s}{"pages":>7s}')
+        for name, rpt in summary['versions'].items():
+            if 'error' in rpt:
+                print(f'{name:<32s} error: {rpt["error"]}')
+                continue
+            walls = {st['name']: st['wall'] for st in rpt['stages']}
+            print(f'{name:<32s}' + ''.join(f'{walls.get(st, 0):13.2f}' for st in stages)
+                  + f'{rpt["total_wall"]:9.2f}{rpt["pages"]["count"]:7d}')
+        print(f'total: {summary["total_wall"]:.2f}s, {summary["workers"]} workers, {summary["parallel"]} parallel')
+
+
+# 页面数据提取器: 名字 -> (bs4 引擎用的函数, lxml 引擎用的函数), ref: Html2Chm.process_pages, run_extractors
+# 提取器在公共调整之前运行, 可以修改树(如删除不再需要的元素); 结果要能 json 化(缓存)及 pickle(进程池)
+# 提取器的参数: (树, DocProfile), 不需要版本规则的忽略后者
+PAGE_EXTRACTORS = {
+    'toc': (Html2Chm.get_page_toc, Html2Chm.get_page_toc_lx),  # 目录页的 toctree-l1, 或内容页的页内书签
+    'gloss': (lambda soup, prof: Html2Chm.get_gloss_terms(soup),
+              lambda root, prof: Html2Chm.get_gloss_terms_lx(root)),  # glossary.html 的术语
+    'pymod': (Html2Chm.get_pymod_rows, Html2Chm.get_pymod_rows_lx),  # py-modindex.html 的模块表
+}
+
+_job_zip = {}  # 已打开的zip, 每个进程(包括进程池中的工作进程)只打开一次, ref: read_page_src
+_hha_lock = threading.Lock()  # ref: Html2Chm.compile_chm
+
+
+def _init_page_worker(log_level, log_queue):
+    """ 进程池工作进程的初始化: 日志经 log_queue 交给主进程写出, ref: nipow.init_worker_applog """
+    init_worker_applog(log_queue, log_level)
+
+
+def read_page_src(src_zip, name, fn) -> bytes:
+    """
+    读取页面源码, 参数 ref: Html2Chm.page_src_args
+    :param src_zip: 为空时从文件 fn 中读取, 否则从 src_zip 中的 name 读取
+    """
+    if src_zip:
+        if (zip_ref := _job_zip.get(src_zip)) is None:
+            zip_ref = _job_zip[src_zip] = zipfile.ZipFile(src_zip, 'r')
+        return zip_ref.read(name)
+    return Path(fn).read_bytes()
+
+
+def run_extractors(kinds, engine, tree, prof: DocProfile) -> dict:
+    """
+    在页面的同一棵树上运行各个提取器, ref: PAGE_EXTRACTORS
+    :param tree: 当前引擎解析出的树, BeautifulSoup 或 lxml 的根元素
+    :param prof: 文档版本的规则, 传给各提取器
+    :return: {kind: 提取器的结果}
+    """
+    data = {}
+    for kind in kinds:
+        bs4_func, lx_func = PAGE_EXTRACTORS[kind]
+        data[kind] = lx_func(tree, prof) if engine == 'lxml' else bs4_func(tree, prof)
+    return data
+
+
+def transform_page(src: bytes, kinds: tuple, cache, engine, minify, prof_name) -> tuple:
+    """
+    页面的转换: 解析, 运行各提取器, 公共调整(及压缩); 不读写页面文件(缓存除外), 可在进程池中执行
+    参数 ref: Html2Chm.page_job_args
+    :return: (out_src, data, hit), out_src: 要写出的页面(已编码), data, hit ref: _page_job
+    """
+    if cache and not kinds:
+        kinds = ('toc',)  # 使用缓存时总是提取目录信息, 缓存中的页面作为哪种角色都可以用
+    if cache:
+        key = cache.key(src, 'page' if kinds == ('toc',) else '+'.join(sorted(kinds)))
+        if val := cache.get(key):  # 命中
+            out_src, data = val
+            return out_src.encode(Html2Chm.PAGE_CS), data, True
+
+    # 先提取数据, 提取器可能会修改树, 公共调整在最后
+    prof = get_profile_by_name(prof_name)
+    if engine == 'lxml':
+        tree = Html2Chm.load_page_lx(src)
+        data = run_extractors(kinds, engine, tree, prof)
+        out_src = Html2Chm.adjust_page_src_lx(tree, prof)
+    else:
+        tree = load_soup_src(src, 'utf-8', True)
+        data = run_extractors(kinds, engine, tree, prof)
+        out_src = Html2Chm.adjust_page_src(tree, prof)
+    data['refs'] = page_refs(out_src, Html2Chm.PAGE_CS)  # 页面中的引用, ref: Html2Chm.prune_files
+    data['anchors'] = page_anchors(out_src, Html2Chm.PAGE_CS)  # 页面中的书签, ref: Html2Chm.check_link_targets
+    if minify:
+        size = len(out_src)
+        out_src = minify_html(out_src)
+        data['size'] = [size, len(out_src)]
+    if cache:
+        cache.put(key, [out_src.decode(Html2Chm.PAGE_CS), data])  # 缓存是json, 存 str
+    return out_src, data, (False if cache else None)
+
+
+def _page_job(args) -> tuple:
+    """
+    处理一个页面: 读取, 转换(ref: transform_page), 写出; 可在进程池中执行, ref: Html2Chm.process_pages
+    :param args: ref: Html2Chm.page_job_args,
+        (src_zip, zip中的名字, 文件名, 提取器, BuildCache 或 None, 引擎, 是否压缩, DocProfile 的名字)
+    :return: (data, hit, secs)
+        data: 各提取器的结果 {kind: 结果}, 另外 'refs' 是页面中的引用, ref: nplinks.page_refs;
+            'anchors' 是页面中的书签(id/name), ref: nplinks.page_anchors;
+            压缩时 'size' 是压缩前后的大小, ref: Html2Chm.size_report
+        hit: 增量构建缓存是否命中, 没有使用缓存时为 None
+        secs: 处理这个页面用的时间(秒)
+    """
+    t0 = time.perf_counter()
+    src_zip, name, fn, kinds, cache, engine, minify, prof_name = args
+    src = read_page_src(src_zip, name, fn)
+    applog.debug('page %s', fn)
+    out_src, data, hit = transform_page(src, kinds, cache, engine, minify, prof_name)
+    Html2Chm.write_page(out_src, Path(fn), bool(src_zip))
+    return data, hit, time.perf_counter() - t0
+
+
+def _pipe_transform(src: bytes, kinds: tuple, cache, engine, minify, prof_name) -> tuple:
+    """ 流水线的转换阶段(ref: Html2Chm.get_pipeline), 返回 (out_src, (data, hit, secs)), 后者同 _page_job 的结果 """
+    t0 = time.perf_counter()
+    out_src, data, hit = transform_page(src, kinds, cache, engine, minify, prof_name)
+    return out_src, (data, hit, time.perf_counter() - t0)
+
 
 def main():
+    """
+    python html2chm.py 文档zip包 [选项]: 构建一个版本的chm
+    python html2chm.py 文档zip包或目录 ... [选项]: 批量构建, ref: Html2ChmBatch
+    可选的功能默认都不打开, 由选项给出, 见 python html2chm.py -h
+    """
     applog.setLevel(logging.WARNING)  #
-    h2c = Html2Chm(
-        # r'F:\DevKit\Python\Core Package\V3.11.X\V3.11.09\python-3.11.9-docs-html.zip'
-        # r'F:\DevKit\Python\Core Package\V3.11.X\V3.11.10\python-3.11.10-docs-html.zip'
-    )
-    h2c.seg_debug = False  # 分段调试
-
-    h2c.upack_html_zip()
-
-    h2c.adjust_files()
-
-    h2c.gen_hhc_file()
-    # with Path(r'user\adjusted.txt').open('tw') as f:
-    #     for line in h2c.handled_html:
-    #         f.write(line+'\n')
-
-    ChmHhk.gen_hhk_file(h2c.doc_root, h2c.PAGE_CS)
-    # shutil.copy(r'chm_utils\pythondoc_empty.hhk', r'PydocCHM\3.11.9\pythondoc.hhk')
-
-    # with Path(r'user\adjusted.txt').open('tr') as f:
-    #     h2c.handled_html[f.readline()] = None
-    h2c.adjust_remains_html()
-
-    hpp_fn = h2c.gen_hhp_file()
-    HhaWrap.compile_hhp_ex(r'chm_utils\hha.dll', hpp_fn)
+    ap = argparse.ArgumentParser(description='Python 的 html 文档包转换为 chm')
+    ap.add_argument('srcs', nargs='+', help='文档zip包, 如 python-3.11.9-docs-html.zip; 多个或给出目录时批量构建')
+    ap.add_argument('--workers', type=int, help='页面转换的进程池大小, 默认: 单个版本 0(串行), 批量构建为 cpu 数')
+    ap.add_argument('--parallel', type=int, default=2, help='批量构建时同时构建几个版本')
+    ap.add_argument('--zip-src', action='store_true', help='html页面直接从zip中读取, 不解压到磁盘')
+    ap.add_argument('--io-pipeline', action='store_true', help='页面的读取, 转换, 写出流水线执行')
+    ap.add_argument('--cache', action='store_true', help=r'增量构建, 缓存放在 PydocCHM\_build_cache')
+    ap.add_argument('--asset-store', action='store_true', help=r'_static, _images 按内容只存一份, 放在 PydocCHM\_asset_store')
+    ap.add_argument('--engine', choices=('bs4', 'lxml'), default='bs4', help="'lxml': 更快, ref: bench\\cmp_engine.py")
+    ap.add_argument('--chm-mode', choices=('hha', 'lzx', 'stored'), default='hha',
+                    help="'hha': hha.dll, 只能在32位 Windows 下; 'lzx', 'stored': npitsf, 任何平台")
+    ap.add_argument('--lzx-level', choices=('fast', 'default', 'best'), default='default')
+    ap.add_argument('--prune', action='store_true', help='引用不到的页面及资源文件不放入chm')
+    ap.add_argument('--minify', action='store_true', help='压缩输出的页面及 css, 大小写到 minify_report_<版本>.json')
+    ap.add_argument('--check-links', action='store_true', help='编译前检查链接, 有问题的写到 link_report_<版本>.json')
+    ap.add_argument('--verify', action='store_true', help='编译后检查 chm, ref: npchmread.py')
+    ap.add_argument('--profile', action='store_true',
+                    help='构建统计, 写到 build_report_<版本>.json; 批量构建总是统计, 不用这个选项')
+    args = ap.parse_args()
+
+    single = len(args.srcs) == 1 and Path(args.srcs[0]).is_file()
+    if single:
+        h2c = Html2Chm(args.srcs[0])
+        h2c.seg_debug = False  # 分段调试
+        h2c.workers = args.workers or 0
+    else:
+        h2c = Html2ChmBatch(args.srcs, args.workers or os.cpu_count(), args.parallel)
+    h2c.zip_src = args.zip_src
+    h2c.io_pipeline = args.io_pipeline
+    h2c.cache_dir = os.path.join(Html2Chm.CHM_DIR, '_build_cache') if args.cache else ''
+    h2c.asset_store = AssetStore(os.path.join(Html2Chm.CHM_DIR, '_asset_store')) if args.asset_store else None
+    h2c.engine = args.engine
+    h2c.chm_mode = args.chm_mode
+    h2c.lzx_level = args.lzx_level
+    h2c.prune_unreferenced = args.prune
+    h2c.minify = args.minify
+    h2c.check_links = args.check_links
+    h2c.verify_chm = args.verify
+    if not single:
+        Html2ChmBatch.print_summary(h2c.run())
+        return
+
+    if args.profile:
+        h2c.profiler = BuildProfiler(top_n=20)
+    h2c.build()
+    h2c.write_reports()
 
 
 if __name__ == '__main__':
@@ -15,10 +15,19 @@
 History
 2024-09-04: create
 2024-09-18: 定义 Nipow 类, 用于收纳全局变量
+2026-10-18: import 时不再有副作用: 日志文件在第一次写日志时才打开, ini 在第一次用到时才读取(get_appini)
+            路径改用 os.path.join, 非 Windows 下不再生成名为 .\\user\\PyDocInCHM.log 的文件
+            applog 改为经队列由后台线程格式化并写出(QueueHandler/QueueListener), 调用处不再等待写文件, ref: stop_applog
+            进程池工作进程的日志经 multiprocessing 队列交给主进程写出, 不再各自写日志文件, ref: init_worker_applog
 
 """
-import logging
+import atexit
 import configparser
+import logging
+import logging.handlers
+import os
+import queue
+import threading
 
 class Nipow:
     # 项目名字
@@ -26,21 +35,115 @@ class Nipow:
 
     # 全局日志实例
     nplogger_name = 'nipow_logger'
-    nplogger_filename = fr'.\user\{base_proj_name}.log'
+    nplogger_filename = os.path.join('user', f'{base_proj_name}.log')
 
     # 全局ini文件对象
-    npinicfg_filename = fr'.\user\{base_proj_name}.ini'
-
-
-# 设置日志的基本配置
-logging.basicConfig(filename=Nipow.nplogger_filename, style='{', level=logging.INFO, datefmt='%H:%M:%S',
-                    format='{asctime} {funcName}: {message}')
+    npinicfg_filename = os.path.join('user', f'{base_proj_name}.ini')
+
+
+class _LazyLogHandler(logging.Handler):
+    """ 第一次写日志时才打开日志文件(目录不存在时创建), import nipow 不再有写文件等副作用 """
+    def __init__(self):
+        super().__init__()
+        self._target = None
+
+    def _open(self) -> logging.Handler:
+        log_dir = os.path.dirname(Nipow.nplogger_filename)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        target = logging.FileHandler(Nipow.nplogger_filename, encoding='utf-8')
+        target.setFormatter(logging.Formatter('{asctime} {funcName}: {message}', '%H:%M:%S', style='{'))
+        for msg in ('\r\n', 'First log'):
+            target.handle(logging.makeLogRecord({'msg': msg, 'levelno': logging.INFO, 'levelname': 'INFO',
+                                                 'funcName': '<module>'}))
+        return target
+
+    def emit(self, record):
+        if self._target is None:
+            self._target = self._open()
+        self._target.handle(record)
+
+    def close(self):
+        if self._target is not None:
+            self._target.close()
+        super().close()
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    applog 的 handler: 记录放入队列即返回, 由主进程的后台线程(QueueListener)格式化并写到日志文件
+    同一进程内的队列不需要 pickle, 所以不在调用处格式化, msg % args 推迟到后台线程, 调用处写成 applog.debug('%s', fn), 不要用 f-string
+    后台线程第一次写日志时才启动, ref: start_applog
+    """
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if 'local' not in _listeners:
+            start_applog()
+        super().enqueue(record)
+
+
+_log_target = _LazyLogHandler()  # 日志文件, 只由主进程的 QueueListener 写
+_log_queue = queue.SimpleQueue()  # 主进程中的记录
+_worker_queue = None  # 进程池工作进程的记录, multiprocessing.Queue, ref: get_worker_log_queue
+_listeners = {}  # 'local', 'worker' -> 已启动的 QueueListener
+_listeners_lock = threading.Lock()
+_atexit_registered = False
+
+
+def _start_listener(key, log_queue):
+    global _atexit_registered
+    with _listeners_lock:
+        if key not in _listeners:
+            _listeners[key] = logging.handlers.QueueListener(log_queue, _log_target)
+            _listeners[key].start()
+        if not _atexit_registered:
+            atexit.register(stop_applog)
+            _atexit_registered = True
+
+
+def start_applog():
+    """ 启动写日志的后台线程; 进程退出时停止(atexit 只登记一次) """
+    _start_listener('local', _log_queue)
+
+
+def stop_applog():
+    """ 停止写日志的后台线程, 队列中剩下的记录写完才返回; 之后再写日志时重新启动 """
+    with _listeners_lock:
+        listeners = [_listeners.pop(key) for key in ('worker', 'local') if key in _listeners]
+    for listener in listeners:
+        listener.stop()
+
+
+def get_worker_log_queue():
+    """
+    进程池工作进程的日志队列(multiprocessing.Queue), 第一次用到时创建, 由主进程的后台线程写到同一个日志文件;
+    工作进程不自己写日志文件(fork 继承来的 FileHandler 会与主进程交错写), ref: init_worker_applog
+    """
+    global _worker_queue
+    if _worker_queue is None:
+        import multiprocessing
+        _worker_queue = multiprocessing.Queue()
+    _start_listener('worker', _worker_queue)
+    return _worker_queue
+
+
+def init_worker_applog(log_queue, level):
+    """ 进程池工作进程的初始化: applog 的记录经 log_queue(ref: get_worker_log_queue)交给主进程写出 """
+    _listeners.clear()  # fork 继承来的, 后台线程在本进程中并不存在
+    for hdlr in applog.handlers[:]:
+        applog.removeHandler(hdlr)
+    applog.addHandler(logging.handlers.QueueHandler(log_queue))
+    applog.setLevel(level)
+
+
+# 全局日志, 只挂一个经队列延迟写文件的 handler, 不再在 import 时 basicConfig
 applog = logging.getLogger(Nipow.nplogger_name)
+applog.setLevel(logging.INFO)
+applog.addHandler(_DeferredQueueHandler(_log_queue))
 # applog.addFilter( logging.Filter(name=nplogger_name) )
 
-applog.info('\r\n')
-applog.info('First log')
-
 
 class NpConfigParser(configparser.ConfigParser):
     def update_file(self):
@@ -49,9 +152,16 @@ class NpConfigParser(configparser.ConfigParser):
             self.write(configfile)
 
 
-# 创建一个ConfigParser对象
-appini = NpConfigParser()
-appini.read(Nipow.npinicfg_filename)
+_appini = None
+
+
+def get_appini() -> NpConfigParser:
+    """ 全局ini文件对象, 第一次用到时才读取 """
+    global _appini
+    if _appini is None:
+        _appini = NpConfigParser()
+        _appini.read(Nipow.npinicfg_filename)
+    return _appini
 
 
 def main():
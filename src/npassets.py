@@ -0,0 +1,126 @@
+"""npassets.py
+    nipow asset store, _static, _images 等资源文件的内容寻址存储
+
+    各版本文档的 css, 字体, 图片等大多完全相同, 每个版本各存一份, 解压和目录遍历都是白费.
+    AssetStore 按内容的 sha1 存放, 相同内容的文件只存一份, 各版本的文件硬链接到存储中的对象(不支持硬链接时复制):
+      objects/ab/abcd....   对象, 按 sha1 的前两个字符分子目录
+      index.json            zip 中的条目(名字, CRC, 大小) -> sha1, 重新构建时已知的条目不用再读取和计算 hash
+      manifests/<版本>.json  各版本的资源清单: href -> sha1, hhp 的 [FILES] 由它生成, ref: Html2Chm.gen_hhp_file
+
+    注意: 构建目录中的资源文件是存储中对象的硬链接, 不能就地修改, 要修改只能写出新文件再替换
+    批量构建时各版本在各自的线程中同时使用同一个 AssetStore
+
+    用法:
+        store = AssetStore('PydocCHM/_asset_store')
+        digest = store.extract(zip_ref, zip_info, dest_fn)
+        store.save_manifest('3.11.9', {'_static/pydoctheme.css': digest})
+        store.save()
+
+2026-10-18: created
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import zipfile
+from pathlib import Path
+
+
+class AssetStore:
+    def __init__(self, store_dir):
+        """
+        :param store_dir: 存储目录, 各版本共用, 如: PydocCHM/_asset_store
+        """
+        self.store_dir = str(store_dir)
+        self._lock = threading.Lock()
+        self._index = {}  # 'CRC:大小:名字' -> sha1, ref: extract
+        self._dirty = False  # _index 是否有变化, 需要保存
+        self.reused = 0  # 已在存储中, 直接链接的文件数
+        self.stored = 0  # 新存入的对象数
+        try:
+            self._index = json.loads(Path(self.store_dir, 'index.json').read_text('utf-8'))
+        except FileNotFoundError:
+            pass
+
+    def _obj_path(self, digest) -> str:
+        return os.path.join(self.store_dir, 'objects', digest[:2], digest)
+
+    @staticmethod
+    def _tmp_name(fn) -> str:
+        """ 临时文件名, 先写临时文件再改名, 其它进程(线程)不会读到写了一半的文件 """
+        return f'{fn}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+    def put(self, data: bytes) -> str:
+        """ 存入一个对象(已有的不再写出), 返回它的 sha1 """
+        digest = hashlib.sha1(data).hexdigest()
+        obj_fn = self._obj_path(digest)
+        if not os.path.exists(obj_fn):
+            os.makedirs(os.path.dirname(obj_fn), exist_ok=True)
+            tmp_fn = self._tmp_name(obj_fn)
+            Path(tmp_fn).write_bytes(data)
+            os.replace(tmp_fn, obj_fn)
+            with self._lock:
+                self.stored += 1
+        return digest
+
+    def link(self, digest, dest):
+        """ 把对象链接到 dest(已存在的会被替换), 不支持硬链接时复制 """
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        obj_fn = self._obj_path(digest)
+        try:
+            os.link(obj_fn, dest)
+        except FileExistsError:
+            os.unlink(dest)
+            os.link(obj_fn, dest)
+        except OSError:
+            shutil.copyfile(obj_fn, dest)
+
+    def extract(self, zip_ref: zipfile.ZipFile, zip_info: zipfile.ZipInfo, dest) -> str:
+        """
+        相当于 zip_ref.extract, 但内容存入存储, dest 是对象的硬链接;
+        条目(名字, CRC, 大小都相同)已在存储中的, 不再读取
+        :param dest: 目的文件名
+        :return: 内容的 sha1
+        """
+        key = f'{zip_info.CRC:08x}:{zip_info.file_size}:{zip_info.filename}'
+        if not (digest := self._index.get(key)) or not os.path.exists(self._obj_path(digest)):
+            digest = self.put(zip_ref.read(zip_info))
+            with self._lock:
+                self._index[key] = digest
+                self._dirty = True
+        else:
+            with self._lock:
+                self.reused += 1
+        self.link(digest, dest)
+        return digest
+
+    def save_manifest(self, name, assets: dict):
+        """
+        保存一个版本的资源清单
+        :param name: 清单的名字, 一般是文档版本, 如: 3.11.9
+        :param assets: href -> sha1
+        """
+        fn = Path(self.store_dir, 'manifests', f'{name}.json')
+        fn.parent.mkdir(parents=True, exist_ok=True)
+        fn.write_text(json.dumps(assets, indent=1, sort_keys=True), 'utf-8')
+
+    def load_manifest(self, name) -> dict:
+        """ 读取 save_manifest 保存的资源清单, 没有时返回空 dict """
+        try:
+            return json.loads(Path(self.store_dir, 'manifests', f'{name}.json').read_text('utf-8'))
+        except FileNotFoundError:
+            return {}
+
+    def save(self):
+        """ 保存索引, 没有变化时不写 """
+        with self._lock:
+            if not self._dirty:
+                return
+            src = json.dumps(self._index)
+            self._dirty = False
+        fn = os.path.join(self.store_dir, 'index.json')
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp_fn = self._tmp_name(fn)
+        Path(tmp_fn).write_text(src, 'utf-8')
+        os.replace(tmp_fn, fn)
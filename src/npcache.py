@@ -0,0 +1,76 @@
+"""npcache.py
+    nipow build cache, 增量构建用的持久化缓存
+
+    同一分支的各个小版本(如 3.11.9 与 3.11.10)的文档, 绝大部分页面除了版本号之外是一样的,
+    因此缓存的 key 由两部分组成:
+      1. 页面源码的 hash, 计算前先把源码中的版本号(如 3.11.10)替换成占位符 DOC_VER_PH
+      2. salt: 转换代码及设置的 hash, 代码或设置变了, 旧的缓存自然就不会再命中
+    缓存的值是页面转换的结果(转换后的页面, 及从中提取的目录, 索引等数据), 以json保存,
+    保存时把版本号换成占位符, 读取时再换成当前版本号
+
+    缓存文件存放在 cache_dir 下, 按 key 的前两个字符分子目录, 如: PydocCHM\_build_cache\3f\3fa1....json
+    进程池中的各个工作进程可以同时读写
+
+2026-10-18: created
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+class BuildCache:
+    DOC_VER_PH = '@@PyDocInCHM.doc_ver@@'  # 版本号的占位符
+
+    def __init__(self, cache_dir, salt: str, doc_ver: str):
+        """
+        :param cache_dir: 缓存目录, 各版本共用
+        :param salt: 转换代码及设置的 hash, ref: code_salt
+        :param doc_ver: 当前处理的文档版本, 如: 3.11.10
+        """
+        self.cache_dir = str(cache_dir)
+        self.salt = salt
+        self.doc_ver = doc_ver
+        self.hits = 0  # 命中与未命中的次数, 由使用者统计, ref: Html2Chm.count_cache
+        self.misses = 0
+
+    @staticmethod
+    def code_salt(code_files, settings) -> str:
+        """
+        由转换代码及设置计算 salt
+        :param code_files: 参与转换的源代码文件
+        :param settings: 影响转换结果的设置, 需要能 repr
+        """
+        sha = hashlib.sha1()
+        for fn in code_files:
+            sha.update(Path(fn).read_bytes())
+        sha.update(repr(settings).encode('utf-8'))
+        return sha.hexdigest()
+
+    def key(self, src: bytes, kind: str) -> str:
+        """
+        :param src: 页面源码
+        :param kind: 页面的处理方式, 同一页面不同的处理方式结果不一样, 如: page, gloss, pymod, hhk
+        """
+        sha = hashlib.sha1(f'{self.salt}:{kind}:'.encode('utf-8'))
+        sha.update(src.replace(self.doc_ver.encode('ascii'), self.DOC_VER_PH.encode('ascii')))
+        return sha.hexdigest()
+
+    def _path(self, key) -> Path:
+        return Path(self.cache_dir, key[:2], key + '.json')
+
+    def get(self, key):
+        """ 未命中返回None, 注意: 值中的 tuple 都变成了 list """
+        try:
+            src = self._path(key).read_text('utf-8')
+        except FileNotFoundError:
+            return None
+        return json.loads(src.replace(self.DOC_VER_PH, self.doc_ver))
+
+    def put(self, key, value):
+        ph = self._path(key)
+        ph.parent.mkdir(parents=True, exist_ok=True)
+        src = json.dumps(value, ensure_ascii=False).replace(self.doc_ver, self.DOC_VER_PH)
+        tmp_ph = ph.with_name(f'{ph.name}.{os.getpid()}.tmp')  # 先写临时文件再改名, 其它进程不会读到写了一半的文件
+        tmp_ph.write_text(src, 'utf-8')
+        os.replace(tmp_ph, ph)
@@ -0,0 +1,269 @@
+"""npchmread.py
+    nipow CHM reader, 读取 chm 文件(ITSF 格式), 检查编译结果, ref: npitsf.py
+
+    文件用 mmap 映射, 不整个读入:
+      目录: 只解析查找路径上的 PMGI/PMGL 块(从 ITSP 头中的根块往下), 解析过的块缓存, ref: ChmReader.find
+      内容: 第1段(MSCompressed)只解压所需文件所在的复位区间, 由 ResetTable 找到区间的起点, 最近解压的区间缓存,
+            ref: ChmReader.read, nplzx.LzxDecoder
+    用 npitsf 及 hha.dll 生成的 chm 都可以读
+
+    检查(verify_chm): hhp 中 [FILES] 的各文件, 以及 hhc, hhk 中各个 Local 指向的文件, 在 chm 中都能找到;
+    compare=True 时再把 [FILES] 中各文件的内容解压出来, 与项目目录中的文件比较(要解压整个第1段, 慢)
+
+    用法: python npchmread.py python-3.11.9-docs.chm PydocCHM/3.11.9/pythondoc.hhp [--compare]
+
+2026-10-18: created
+            hhc, hhk 的 Local 改由 nplinks.sitemap_links 解析, 外部链接的判断与链接检查一致(nplinks.is_external)
+"""
+import mmap
+import struct
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+from urllib.parse import unquote
+import nplzx
+from nplinks import is_external, sitemap_links
+from npitsf import LZXC_GUID, MS_COMPRESSED, dir_key, read_hhp
+
+ChmEntry = namedtuple('ChmEntry', 'name section offset length')  # 目录项, section: 0 不压缩, 1 MSCompressed
+
+
+
+def _rd_encint(buf, pos: int) -> tuple:
+    """ 读取 ITSF 的变长整数, ref: npitsf.encint :return: (值, 下一个位置) """
+    val = 0
+    while True:
+        c = buf[pos]
+        pos += 1
+        val = (val << 7) | (c & 0x7F)
+        if not c & 0x80:
+            return val, pos
+
+
+class ChmReader:
+    """
+    读取 chm 中的文件, 用法:
+        with ChmReader('python-3.11.9-docs.chm') as chm:
+            chm.find('/index.html'), chm.read('/index.html')
+    名字以 / 开头, 查找时不区分大小写(同 hh.exe)
+    """
+    CACHED_INTERVALS = 8  # 缓存最近解压的复位区间个数
+
+    def __init__(self, chm_fn):
+        self.chm_fn = str(chm_fn)
+        self._f = open(self.chm_fn, 'rb')
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._f.close()
+            raise
+        mm = self._mm
+        if mm[:4] != b'ITSF':
+            self.close()
+            raise ValueError(f'不是 chm 文件: {self.chm_fn}')
+        version, = struct.unpack_from('<I', mm, 4)
+        _, _, dir_off, dir_len = struct.unpack_from('<QQQQ', mm, 0x38)
+        # 版本2的文件头中没有第0段内容的位置, 紧跟在目录后面
+        self.content_off = struct.unpack_from('<Q', mm, 0x58)[0] if version >= 3 else dir_off + dir_len
+        if mm[dir_off:dir_off + 4] != b'ITSP':
+            self.close()
+            raise ValueError(f'目录头错误: {self.chm_fn}')
+        hdr_len, = struct.unpack_from('<I', mm, dir_off + 8)
+        self.chunk_size, _, _, self.root_chunk, self.first_chunk, _, _, self.num_chunks = \
+            struct.unpack_from('<IIiiiiiI', mm, dir_off + 0x10)
+        self.chunks_off = dir_off + hdr_len
+        self.chunks_parsed = 0  # 解析过的目录块数
+        self.intervals_decoded = 0  # 解压过的复位区间数
+        self._chunks = {}  # 块号 -> (类型, 小写的名字列表, 目录项或下级块号列表[, 下一块])
+        self._lzx = None  # 第1段的解压参数, ref: _lzx_info
+        self._intervals = OrderedDict()  # 复位区间号 -> 解压结果, 最近使用的在后
+
+    def close(self):
+        self._intervals.clear()
+        self._mm.close()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _chunk(self, num: int) -> tuple:
+        """ 解析一个目录块, 已解析的直接返回 """
+        if (chunk := self._chunks.get(num)) is not None:
+            return chunk
+        if not 0 <= num < self.num_chunks:
+            raise ValueError(f'目录块号错误: {num}')
+        base = self.chunks_off + num * self.chunk_size
+        buf = self._mm[base:base + self.chunk_size]
+        sig = buf[:4]
+        free_len, = struct.unpack_from('<I', buf, 4)
+        end = self.chunk_size - free_len
+        keys, vals = [], []
+        if sig == b'PMGL':
+            next_chunk, = struct.unpack_from('<i', buf, 0x10)
+            pos = 0x14
+            while pos < end:
+                n, pos = _rd_encint(buf, pos)
+                name = buf[pos:pos + n]
+                sec, pos = _rd_encint(buf, pos + n)
+                off, pos = _rd_encint(buf, pos)
+                length, pos = _rd_encint(buf, pos)
+                keys.append(name.lower())
+                vals.append(ChmEntry(name.decode('utf-8'), sec, off, length))
+            chunk = ('L', keys, vals, next_chunk)
+        elif sig == b'PMGI':
+            pos = 0x08
+            while pos < end:
+                n, pos = _rd_encint(buf, pos)
+                keys.append(buf[pos:pos + n].lower())
+                child, pos = _rd_encint(buf, pos + n)
+                vals.append(child)
+            chunk = ('I', keys, vals)
+        else:
+            raise ValueError(f'目录块类型错误: {num}, {sig!r}')
+        self._chunks[num] = chunk
+        self.chunks_parsed += 1
+        return chunk
+
+    def find(self, name: str) -> ChmEntry | None:
+        """ 查找文件, 从根块沿 PMGI 往下, 只解析路径上的块; 没有时返回 None """
+        key = dir_key(name)
+        num = self.root_chunk if self.root_chunk != -1 else self.first_chunk
+        while True:
+            kind, keys, vals, *_ = self._chunk(num)
+            if kind == 'I':
+                if (idx := bisect_right(keys, key) - 1) < 0:
+                    return None
+                num = vals[idx]
+                continue
+            idx = bisect_left(keys, key)
+            return vals[idx] if idx < len(keys) and keys[idx] == key else None
+
+    def entries(self):
+        """ 按顺序列出所有目录项, 沿 PMGL 块的链表 """
+        num = self.first_chunk
+        while num != -1:
+            _, _, vals, num = self._chunk(num)
+            yield from vals
+
+    def read(self, name: str) -> bytes | None:
+        """ 读取文件的内容, 没有时返回 None """
+        if (entry := self.find(name)) is None:
+            return None
+        return self.read_entry(entry)
+
+    def read_entry(self, entry: ChmEntry) -> bytes:
+        if entry.section == 0:
+            start = self.content_off + entry.offset
+            return self._mm[start:start + entry.length]
+        if entry.length == 0:
+            return b''
+        reset_size = self._lzx_info()[1]
+        first, last = entry.offset // reset_size, (entry.offset + entry.length - 1) // reset_size
+        data = b''.join(self._interval(k) for k in range(first, last + 1))
+        start = entry.offset - first * reset_size
+        return data[start:start + entry.length]
+
+    def _lzx_info(self) -> tuple:
+        """ 第1段的解压参数: (LzxDecoder, 复位区间的长度, 各复位区间在压缩数据中的起点, 未压缩长度, Content 目录项) """
+        if self._lzx is None:
+            control = self.read(MS_COMPRESSED + 'ControlData')
+            reset_tab = self.read(MS_COMPRESSED + f'Transform/{LZXC_GUID}/InstanceData/ResetTable')
+            content = self.find(MS_COMPRESSED + 'Content')
+            if control is None or reset_tab is None or content is None or control[4:8] != b'LZXC':
+                raise ValueError(f'没有 MSCompressed 段或格式错误: {self.chm_fn}')
+            version, reset_interval, window_size = struct.unpack_from('<III', control, 8)
+            if version == 2:  # 版本2以 0x8000 为单位
+                reset_interval *= 0x8000
+                window_size *= 0x8000
+            _, num, entry_size, hdr_len, ulen, _, block_len = struct.unpack_from('<IIIIQQQ', reset_tab)
+            offs = [struct.unpack_from('<Q', reset_tab, hdr_len + i * entry_size)[0] for i in range(num)]
+            step = reset_interval // block_len  # ResetTable 每 block_len(一般是一帧)一项
+            starts = offs[::step] + [content.length]
+            self._lzx = (nplzx.LzxDecoder(window_size.bit_length() - 1), reset_interval, starts, ulen, content)
+        return self._lzx
+
+    def _interval(self, k: int) -> bytes:
+        """ 第 k 个复位区间解压后的内容 """
+        if (data := self._intervals.get(k)) is not None:
+            self._intervals.move_to_end(k)
+            return data
+        decoder, reset_size, starts, ulen, content = self._lzx_info()
+        if not 0 <= k < len(starts) - 1:
+            raise ValueError(f'复位区间号错误: {k}')
+        base = self.content_off + content.offset
+        comp = self._mm[base + starts[k]:base + starts[k + 1]]
+        data = decoder.decompress_interval(comp, min(reset_size, ulen - k * reset_size), k * reset_size)
+        self.intervals_decoded += 1
+        self._intervals[k] = data
+        if len(self._intervals) > self.CACHED_INTERVALS:
+            self._intervals.popitem(last=False)
+        return data
+
+
+def sitemap_locals(src: bytes, charset='cp1252') -> list:
+    """ hhc, hhk 中的各个 Local(已去重, 不含 #书签, 空的及外部链接不算), 解析由 nplinks.sitemap_links 完成 """
+    locals_ = {}
+    for _, local in sitemap_links(src, charset):
+        local = local.split('#', 1)[0]
+        if local and not is_external(local):
+            locals_[local] = None
+    return list(locals_)
+
+
+def verify_chm(chm_fn, hhp_fn, compare=False, charset='cp1252') -> dict:
+    """
+    检查编译生成的 chm, ref: 模块说明
+    :param compare: 是否比较 [FILES] 中各文件的内容
+    :return: 检查报告, ok 为 True 表示全部通过
+    """
+    t0 = time.perf_counter()
+    hhp = read_hhp(hhp_fn)
+    options = dict(line.split('=', 1) for line in hhp.get('OPTIONS', []) if '=' in line)
+    files = [fn.replace('\\', '/') for fn in hhp.get('FILES', [])]
+    missing_files, missing_locals, content_diff = [], [], []
+    locals_n = 0
+    with ChmReader(chm_fn) as chm:
+        for fn in files:
+            if (entry := chm.find('/' + fn)) is None:
+                missing_files.append(fn)
+            elif compare and chm.read_entry(entry) != Path(hhp_fn).parent.joinpath(fn).read_bytes():
+                content_diff.append(fn)
+        for opt in ('Contents file', 'Index file'):
+            if not (fn := options.get(opt, '').replace('\\', '/')):
+                continue
+            if (src := chm.read('/' + fn)) is None:
+                missing_files.append(fn)
+                continue
+            for local in sitemap_locals(src, charset):
+                locals_n += 1
+                if chm.find('/' + local) is None and chm.find('/' + unquote(local)) is None:
+                    missing_locals.append((fn, local))
+        report = {'chm': str(chm_fn), 'files': len(files), 'locals': locals_n,
+                  'missing_files': missing_files, 'missing_locals': missing_locals, 'content_diff': content_diff,
+                  'chunks_parsed': chm.chunks_parsed, 'chunks': chm.num_chunks,
+                  'intervals_decoded': chm.intervals_decoded}
+    report['ok'] = not (missing_files or missing_locals or content_diff)
+    report['secs'] = round(time.perf_counter() - t0, 3)
+    return report
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if len(args) != 2:
+        print(__doc__)
+        sys.exit(2)
+    report = verify_chm(*args, compare='--compare' in sys.argv)
+    for key in ('missing_files', 'missing_locals', 'content_diff'):
+        for item in report[key][:20]:
+            print(f'{key}: {item}')
+    print({key: val for key, val in report.items() if not isinstance(val, list)})
+    sys.exit(0 if report['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,20 +12,42 @@
 
 2024-09-28: created
             将 ChmHhcItem, ChmHhk 由原来 epub2chm.py 移入
+2026-10-18: ChmHhk 改用 lxml.etree.iterparse 流式生成 hhk, 内存占用不随索引大小增长
+            增加 read_chm_util, chm_utils 下的模板等只读一次
+            ChmHhcItem 改用 __slots__; 增加扁平的目录树 ChmHhcFlat, hhc 由它输出
+            增加 SitemapWriter, hhc/hhk 的条目直接写入文件, 可选不缩进
+            增加 ChmDocIndex, 由 glossary.html, py-modindex.html 提取术语及模块记录
 
 
 """
+import itertools
 import os
+from array import array
+from collections import namedtuple
 from typing import Self
 from nphtml import *
 
+CHM_UTILS = 'chm_utils'  # chm相关资源(模板, Fts_stop_list.stp 等)所在的目录
+_chm_utils = {}  # chm_utils 下已读取的文件, 只读一次, 批量构建时各版本共用, ref: read_chm_util
+
+
+def read_chm_util(name, encoding=None) -> str | bytes:
+    """ 读取 chm_utils 下的文件(内容会缓存), encoding 为 None 时返回 bytes """
+    if (val := _chm_utils.get((name, encoding))) is None:
+        ph = Path(CHM_UTILS, name)
+        val = _chm_utils[name, encoding] = ph.read_bytes() if encoding is None else ph.read_text(encoding)
+    return val
+
 
 class ChmHhcItem:
     """
     本类代表一个 CHM 的目录文件 *.hhc 中的一个目录条目,
     ref: Html2Chm.gen_hhc_file
+    一个chm的目录有约2万个条目, 因此用 __slots__, 不要每个条目一个 __dict__
 
     """
+    __slots__ = ('level', 'Name', 'Local', 'Children')
+
     def __init__(self, level, name, local):
         super().__init__()
         self.level = level  # 层级, 为其父条目层级加1
@@ -50,121 +72,320 @@ class ChmHhcItem:
                 return ch_item
         return None
 
-    def output_src(self, lines, ident) -> None:
+    def flatten(self) -> 'ChmHhcFlat':
+        """ 以本条目为根, 导出扁平的目录树, ref: ChmHhcFlat """
+        return ChmHhcFlat(self)
+
+    def output_src(self, writer: 'SitemapWriter', ident) -> None:
+        """
+        输出本目录条目(及其所有下级)在 hhc 文件中的表现形式, ref: ChmHhcFlat.output_src
+        """
+        self.flatten().output_src(writer, ident)
+
+
+class ChmHhcFlat:
+    """
+    扁平的目录树: 各条目按先序(即在 hhc 文件中的顺序)排列, 各属性分别存放在数组中, 条目用其序号表示,
+    第0个是根条目; 每个条目的下级条目都紧跟在它后面, 共 sizes[i] 个(所有层的下级), 因此不用递归就能遍历子树
+    可用于输出 hhc 文件, 或其它需要整个目录树的地方
+    """
+    __slots__ = ('names', 'locals', 'levels', 'parents', 'sizes')
+
+    def __init__(self, root: ChmHhcItem):
+        self.names = []  # 各条目的 Name
+        self.locals = []  # 各条目的 Local
+        self.levels = array('H')  # 各条目的层级
+        self.parents = array('i')  # 父条目的序号, 根条目为 -1
+        stack = [(root, -1)]
+        while stack:
+            item, parent = stack.pop()
+            self.parents.append(parent)
+            self.names.append(item.Name)
+            self.locals.append(item.Local)
+            self.levels.append(item.level)
+            idx = len(self.parents) - 1
+            stack.extend((ch_item, idx) for ch_item in reversed(item.Children))
+
+        self.sizes = array('I', bytes(4 * len(self.parents)))  # 各条目所有层的下级条目的总数
+        for idx in range(len(self.parents) - 1, 0, -1):
+            self.sizes[self.parents[idx]] += self.sizes[idx] + 1
+
+    def __len__(self):
+        return len(self.parents)
+
+    def output_src(self, writer: 'SitemapWriter', ident) -> None:
         """
-        输出本目录条目在 hhc 文件中的表现形式
-        lines: a list
+        输出整个目录树在 hhc 文件中的表现形式, 根条目使用缩进 ident
         """
-        # ident = '  ' * self.level
-        if self.Name:
-            # 目录上没有非cp1252字符,因此可以不转义, chm viewer对 &#1234; 形式表示的字符支持不好
-            itm_name = html_esc_ex(self.Name, True, False)
-            this_item = f'''<LI> <OBJECT type="text/sitemap"> 
-                    <param name="Name" value="{itm_name}"> 
-                    <param name="Local" value="{self.Local}"> 
-                </OBJECT>'''
-            output_nested_src(lines, this_item, ident)
-        if self.Children:
-            output_nested_src(lines, '<UL>', ident)
-            for ch_itm in self.Children:
-                ch_itm.output_src(lines, ident+1)
-            output_nested_src(lines, '</UL>', ident)
+        open_uls = []  # 已输出了 <UL> 的条目: (其子树结束处的序号, 缩进)
+        base = self.levels[0] if self.levels else 0
+        for idx in range(len(self)):
+            while open_uls and idx >= open_uls[-1][0]:
+                writer.end_ul(open_uls.pop()[1])
+            itm_ident = ident + self.levels[idx] - base
+            if name := self.names[idx]:
+                # 目录上没有非cp1252字符,因此可以不转义, chm viewer对 &#1234; 形式表示的字符支持不好
+                writer.hhc_item(itm_ident, html_esc_ex(name, True, False), self.locals[idx])
+            if self.sizes[idx]:
+                writer.ul(itm_ident)
+                open_uls.append((idx + 1 + self.sizes[idx], itm_ident))
+        while open_uls:
+            writer.end_ul(open_uls.pop()[1])
+
+
+class SitemapWriter:
+    """
+    hhc/hhk(sitemap 格式)的流式输出: 各种条目按预先格式化好的样式直接写入带缓冲的文件(按 charset 编码),
+    不再先生成行列表再整个代入模板; 模板(chm_utils 下)中 {0:s} 之前的部分在开始时写出, 之后的部分在结束时写出
+    indent 为 False 时不缩进, 文件更小, 编译也更快
+
+        with SitemapWriter('pythondoc.hhc', 'cp1252', 'pythondoc.hhc') as writer:
+            writer.ul(0)
+            writer.hhc_item(1, 'Tutorial', 'tutorial/index.html')
+            writer.end_ul(0)
+    """
+    def __init__(self, fn, charset, template, indent=True):
+        """
+        :param fn: 输出的文件名
+        :param template: chm_utils 下的模板文件名, 如 pythondoc.hhc
+        """
+        self.fn = fn
+        self.charset = charset
+        self.indent = indent
+        self.head, self.tail = read_chm_util(template, charset).split('{0:s}', 1)
+        self._file = None
+        self._nl = ''  # 条目之间的换行, 第一个条目前面没有
+        self._pads = {}  # 缩进 -> (本层的缩进, 下一层的缩进)
+
+    def __enter__(self) -> Self:
+        self._file = open(self.fn, 'w', encoding=self.charset, buffering=1 << 16)
+        self._file.write(self.head)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self._file.write(self.tail)
+        finally:
+            self._file.close()
+
+    def _pad(self, ident) -> tuple:
+        if (pads := self._pads.get(ident)) is None:
+            pads = self._pads[ident] = ('  ' * ident, '  ' * (ident + 1)) if self.indent else ('', '')
+        return pads
+
+    def _write(self, src):
+        self._file.write(self._nl + src)
+        self._nl = '\n'
+
+    def ul(self, ident):
+        self._write(self._pad(ident)[0] + '<UL>')
+
+    def end_ul(self, ident):
+        self._write(self._pad(ident)[0] + '</UL>')
+
+    def hhc_item(self, ident, name, local):
+        """ hhc 的一个目录条目, name 已转义 """
+        p0, p1 = self._pad(ident)
+        self._write(f'{p0}<LI> <OBJECT type="text/sitemap">\n'
+                    f'{p1}<param name="Name" value="{name}">\n'
+                    f'{p1}<param name="Local" value="{local}">\n'
+                    f'{p0}</OBJECT>')
+
+    def hhk_item(self, ident, keyword, hrefs):
+        """ hhk 的一个关键字条目, keyword 已转义; 有多个出处时, 每个出处一对 Name, Local """
+        p0, p1 = self._pad(ident)
+        if len(hrefs) == 1:
+            self._write(f'{p0}<LI> <OBJECT type="text/sitemap">\n'
+                        f'{p1}<param name="Keyword" value="{keyword}">\n'
+                        f'{p1}<param name="Local" value="{hrefs[0]}">\n'
+                        f'{p0}</OBJECT>')
+            return
+        self._write(''.join([f'{p0}<LI> <OBJECT type="text/sitemap">\n{p1}<param name="Keyword" value="{keyword}">\n']
+                            + [f'{p1}<param name="Name" value="[{idx}] {href}">\n{p1}<param name="Local" value="{href}">\n'
+                               for idx, href in enumerate(hrefs)]
+                            + [f'{p0}</OBJECT>']))
+
+    def hhk_see_also(self, ident, keyword):
+        """ hhk 中本身没有链接的关键字, keyword 已转义 """
+        p0, p1 = self._pad(ident)
+        self._write(f'{p0}<LI> <OBJECT type="text/sitemap">\n'
+                    f'{p1}<param name="Keyword" value="{keyword}">\n'
+                    f'{p1}<param name="See Also" value="{keyword}">\n'
+                    f'{p0}</OBJECT>')
+
+    def hhk_entries(self, entries):
+        """ 写出 ChmHhk 提取的索引条目, ref: ChmHhk._output_hhk_index """
+        for ent in entries:
+            match ent[1]:
+                case 'kw':
+                    self.hhk_item(ent[0], ent[2], ent[3])
+                case 'see':
+                    self.hhk_see_also(ent[0], ent[2])
+                case 'ul':
+                    self.ul(ent[0])
+                case '/ul':
+                    self.end_ul(ent[0])
 
 
 class ChmHhk:
     """
-    代表CHM中的索引文件, *.hhk, 由EPub中的 genindex-all.xhtml 解析而来
+    代表CHM中的索引文件, *.hhk, 由 genindex-all.html 解析而来
+    用 lxml.etree.iterparse 流式处理: 每处理完一个关键字 li 即写出并释放, 不需要整个文档树, ref: gen_hhk_file
     """
+
     @staticmethod
-    def _output_base_li(file, base_li, ident):
+    def _output_base_li(entries, base_li: etree._Element, ident):
         """
         一个基本关键字条目, 下有一个或多个出处:
             <li> <a href="library/cmd.html#index-0">in a command interpreter</a></li>
             <li><a href="library/fnmatch.html#index-2">in glob-style wildcards</a>,<a href="library/glob.html#index-1">[1]</a></li>
 
-        :param file:
+        :param entries: 提取的条目加在这里, ref: _output_hhk_index
         :param base_li: 基本list item, 即它下面没有<ul>...</ul>
         :param ident:
         :return:
         """
-        taga_list = base_li.find_all('a', recursive=False)  # 下面的anchor标签
-        match len(taga_list):
-            case 0:
-                pass  # do noting, 一般不会出这种情况
-            case 1:  # 只有一个a标签
-                taga = taga_list[0]
-                kw = get_tag_text(taga)
-                assert len(kw) > 0, 'kw 不能为空, base_li:' + str(base_li)  # 为空会导致 hha.dll 出错
-                kw = html_esc_ex(kw, True, False)
-                src = f'''<LI> <OBJECT type="text/sitemap">
-                        <param name="Keyword" value="{kw}">
-                        <param name="Local" value="{taga['href']}">
-                    </OBJECT>'''
-                output_nested_src(file, src, ident)
-            case _:  # 下有多个a标签
-                kw = get_tag_text(base_li.a)  # 第一个a标签的文本作为关键字
-                assert len(kw) > 0, 'kw 不能为空, base_li:' + str(base_li)  # 为空导致 hha.dll 出错
-                kw = html_esc_ex(kw, True, False)
-                part_kw = f'''<LI> <OBJECT type="text/sitemap">
-                                <param name="Keyword" value="{kw}">'''
-                output_nested_src(file, part_kw, ident, ident, ident + 1)
-                for idx, taga in enumerate(taga_list):
-                    a_src = f'''<param name="Name" value="[{idx}] {taga['href']}">
-                                <param name="Local" value="{taga['href']}">'''
-                    output_nested_src(file, a_src, ident + 1, ident + 1, ident + 1)
-                output_nested_src(file, '</OBJECT>', ident)
+        taga_list = base_li.findall('a')  # 下面的anchor标签
+        if not taga_list:
+            return  # do noting, 一般不会出这种情况
+        # 有多个a标签时, 第一个a标签的文本作为关键字
+        kw = get_lx_text(taga_list[0] if len(taga_list) == 1 else base_li.find('.//a'))
+        assert len(kw) > 0, 'kw 不能为空, base_li:' + etree.tostring(base_li, encoding='unicode')  # 为空会导致 hha.dll 出错
+        entries.append((ident, 'kw', html_esc_ex(kw, True, False), [taga.attrib['href'] for taga in taga_list]))
 
     @staticmethod
-    def _output_hhk_index(kw_li: bs4.Tag, file, ident):
+    def _output_hhk_index(kw_li: etree._Element, entries, ident):
         """
         hhk文件中一个关键字根据它出处的多少有多种情况, 详见笔记
-        kw_li: genindex-all.xhtml 中table单元格内的顶层 li, 对应一个关键字
+        kw_li: genindex-all.html 中table单元格内的顶层 li, 对应一个关键字
+        entries: 提取的条目加在这里, 每个条目是一个元组, 由 SitemapWriter.hhk_entries 写出:
+            (缩进, 'kw', 关键字, [出处, ...]), (缩进, 'see', 关键字), (缩进, 'ul'), (缩进, '/ul')
         """
-        if kw_li.ul is not None:  # 有多个引用点,即有下级 <ul>...</ul>
-            if kw_li.a is not None:  # 关键字本身带有一个链接, 即它下面有一个 a 标签, 如关键字 ", (comma)" 的情况, 大部分是不带的.
-                ChmHhk._output_base_li(file, kw_li, ident)
+        if (kw_ul := kw_li.find('.//ul')) is not None:  # 有多个引用点,即有下级 <ul>...</ul>
+            if kw_li.find('.//a') is not None:  # 关键字本身带有一个链接, 即它下面有一个 a 标签, 如关键字 ", (comma)" 的情况, 大部分是不带的.
+                ChmHhk._output_base_li(entries, kw_li, ident)
             else:  # 下面没有 a 标签, 直接用的普通文本,即关键字本身点击不会跳转
-                kw = get_direct_text(kw_li)  # 关键字文本
+                kw = get_lx_direct_text(kw_li)  # 关键字文本
                 assert len(kw) > 0  # 不能为空, 否则 hha.dll 出错
-                kw = html_esc_ex(kw, True, False)
-                part_kw = f'''<LI> <OBJECT type="text/sitemap">  
-                            <param name="Keyword" value="{kw}">
-                            <param name="See Also" value="{kw}">
-                        </OBJECT>'''
-                output_nested_src(file, part_kw, ident)
+                entries.append((ident, 'see', html_esc_ex(kw, True, False)))
             # 下面的ul及其li, 一个li就是一个出处, 但有时一个li下有多个链接
-            output_nested_src(file, '<UL>', ident)
-            li_list = kw_li.ul.find_all('li', recursive=False)  # 这个关键字下的引用条目
+            entries.append((ident, 'ul'))
+            li_list = kw_ul.findall('li')  # 这个关键字下的引用条目
             for base_li in li_list:
-                ChmHhk._output_base_li(file, base_li, ident + 1)
-            output_nested_src(file, '</UL>', ident)
+                ChmHhk._output_base_li(entries, base_li, ident + 1)
+            entries.append((ident, '/ul'))
         else:  # 有些关键字只有一个引用点, 因此 下面没有ul标签了
-            ChmHhk._output_base_li(file, kw_li, ident)
+            ChmHhk._output_base_li(entries, kw_li, ident)
+
+    @staticmethod
+    def iter_hhk_entries(src):
+        """
+        流式解析 genindex-all.html, 逐个关键字给出 hhk 文件中的条目
+        关键字索引按首字母分成28组，每组一个表格: Symbols、_、A ~ Z, 表格每行有两栏（列），
+        每栏内是一个<ul>...</ul>, 内有多个li, 每个li是一个关键字及其出处(引用点，一般有多个，放在一个ul内)
+        :param src: genindex-all.html 的文件名或(二进制)文件对象
+        :return: 生成器, 每个关键字一个条目列表, ref: _output_hhk_index
+        """
+        idx_tab = None  # 当前所在的关键字表格
+        for event, el in etree.iterparse(src, events=('start', 'end'), html=True, encoding='utf-8'):
+            if el.tag == 'table' and ' '.join(el.get('class', '').split()) == 'indextable genindextable':
+                if event == 'start':
+                    idx_tab = el
+                else:
+                    idx_tab = None
+                    el.clear()  # 整个表格处理完了
+            elif event == 'end' and idx_tab is not None and el.tag == 'li' \
+                    and (ul := el.getparent()).tag == 'ul' and ul.getparent().tag == 'td':
+                entries = []
+                ChmHhk._output_hhk_index(el, entries, 1)
+                yield entries
+                el.clear()  # 释放处理过的关键字
+                while el.getprevious() is not None:
+                    del ul[0]
 
     @staticmethod
-    def gen_hhk_file(chm_src_dir, page_charset):
-        """
-        根据指定的 genindex-all.html 文件生成对应的 chm 的 hhk
-        """
-        # 取得 关键字 条目
-        src_list = []
-        output_nested_src(src_list, '<UL>', 0)
-        soup = load_soup(Path(chm_src_dir, 'genindex-all.html'), 'utf-8', True)
-
-        # 关键字索引按首字母分成28组，每组一个表格: Symbols、_、A ~ Z
-        idx_tab = soup.body.find_all('table', {'class': 'indextable genindextable'})
-        # print(len(idx_tab))
-        for tab in idx_tab:
-            for tr in tab.find_all('tr'):  # 每个表格内只有一行
-                for td in tr.find_all('td'):  # 每行有两栏（列），
-                    # 每栏内是一个<ul>...</ul>, 内有多个li, 每个li是一个关键字及其出处(引用点，一般有多个，放在一个ul内)
-                    for li in td.ul.find_all('li', recursive=False):
-                        # print(get_direct_text(li))
-                        ChmHhk._output_hhk_index(li, src_list, 1)
-        output_nested_src(src_list, '</UL>', 0)
-
-        # 生成 pythondoc.hhk 文件
-        hhk_src = Path(r'chm_utils\pythondoc.hhk').read_text(page_charset)
-        hhk_src = hhk_src.format('\n'.join(src_list))
+    def write_hhk_file(chm_src_dir, page_charset, entries, indent=True):
+        """
+        根据模板写出 hhk 文件, ref: SitemapWriter
+        :param entries: hhk 文件中的条目, 可以是生成器, 边生成边写出
+        """
         hhk_fn = os.path.join(chm_src_dir, r'pythondoc.hhk')
-        Path(hhk_fn).write_text(hhk_src, page_charset)
+        with SitemapWriter(hhk_fn, page_charset, 'pythondoc.hhk', indent) as writer:
+            writer.ul(0)
+            writer.hhk_entries(entries)
+            writer.end_ul(0)
+
+    @staticmethod
+    def gen_hhk_file(chm_src_dir, page_charset, src=None, indent=True):
+        """
+        根据指定的 genindex-all.html 文件流式生成对应的 chm 的 hhk, 条目边解析边写出
+        :param src: genindex-all.html 的文件名或(二进制)文件对象, 为None时从 chm_src_dir 下读取
+        """
+        if src is None:
+            src = os.path.join(chm_src_dir, 'genindex-all.html')
+        ChmHhk.write_hhk_file(chm_src_dir, page_charset, itertools.chain.from_iterable(ChmHhk.iter_hhk_entries(src)),
+                              indent)
+
+
+# 术语或模块的记录, ref: ChmDocIndex
+#   kind: 'group': 分组(首字母), 'term': 术语, 'module': 模块
+#   href: 在所在页面中的链接, 形如 #term-0, library/os.html#module-os; 没有链接的为空
+#   group: 所属的分组, 即首字母
+#   parent_module: 子模块(如 os.path)所属的模块, 其它的为空
+DocIndexRecord = namedtuple('DocIndexRecord', 'kind name href group parent_module')
+
+
+class ChmDocIndex:
+    """
+    由 glossary.html, py-modindex.html 提取结构化的术语及模块记录(DocIndexRecord),
+    可用于目录(hhc), 也可用于搜索索引等其它工具, 不必再解析页面
+    由已解析的树(lxml)提取: gloss_record, pymod_records, ref: Html2Chm.get_gloss_terms_lx, get_pymod_rows_lx
+    这两个页面还要做公共调整, 需要整个树, 因此不流式解析
+    """
+    GLOSS_GROUPS = '@' + ''.join(chr(c) for c in range(ord('A'), ord('Z') + 1))  # 术语的分组, 首字母不是 A~Z 的都放在 '@'组
+    MODINDEX_TAB = lx_class_xpath('table', 'indextable modindextable', '[1]')
+    CODE_XREF = lx_class_xpath('code', 'xref', '[1]')
+
+    @staticmethod
+    def gloss_group(term: str) -> str:
+        """ 术语所属的分组: 首字母(忽略开头的空格及下划线) """
+        first_let = (term.strip(' _').upper() or '@')[0]
+        return first_let if first_let in ChmDocIndex.GLOSS_GROUPS else '@'
+
+    @staticmethod
+    def gloss_record(dt: etree._Element) -> DocIndexRecord:
+        """
+        由术语的 <dt> 得出术语的记录
+            <dt id="term-0"><strong>&gt;&gt;&gt;</strong><a class="headerlink" href="#term-0">¶</a></dt>
+        其中的 a 标签不再需要, 会被删除(后面的文本保留)
+        """
+        taga = dt.find('.//a')
+        href = taga.get('href')
+        lx_drop_tree(taga)
+        term = get_lx_text(dt)
+        return DocIndexRecord('term', term, href, ChmDocIndex.gloss_group(term), '')
+
+    @staticmethod
+    def pymod_records(trs):
+        """
+        由 py-modindex.html 模块表中的各行(<tr>)逐个得出记录, 每行是一个分组(首字母)或一个模块
+        :param trs: 模块表的各行, 可以是生成器
+        :return: 生成器
+        """
+        group = parent = ''  # 当前的分组, 当前的一级模块
+        for tr in trs:
+            tr_class = tr.get('class', '').split()
+            if tr_class and tr_class[0] == 'cap':  # 开始一个新的分组, 按首字母
+                group = get_lx_text(tr).upper()
+                yield DocIndexRecord('group', group, '#' + tr.get('id'), group, '')
+            elif tag_code := ChmDocIndex.CODE_XREF(tr):  # 一个模块
+                tag_code = tag_code[0]
+                tag_a = next(tag_code.iterancestors('a'), None)
+                href = tag_a.get('href') if tag_a is not None else ''
+                name = get_lx_text(tag_code)
+                if tr_class and tr_class[0].startswith('cg-'):  # 子模块
+                    yield DocIndexRecord('module', name, href, group, parent)
+                else:
+                    parent = name
+                    yield DocIndexRecord('module', name, href, group, '')
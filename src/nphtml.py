@@ -4,6 +4,10 @@
 
 2024-09-28: created
             将 html_esc_ex 由原来 epub2chm.py 移入
+2026-10-18: 增加 lxml 引擎用的辅助例程: load_lx_src, get_lx_text, get_lx_direct_text, lx_class_xpath, lx_collapse_space
+            html_esc_ex 不再逐字符处理, 增加 html_esc_enc
+            增加 lx_drop_tree
+            delete, delete_all 不再在 import 时附加到 bs4.Tag 上(猴子方法), 改为普通函数调用: delete_all(head, 'script')
 
 
 """
@@ -11,6 +15,8 @@ from pathlib import Path
 import html
 import bs4
 from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from datetime import datetime, timedelta, timezone
 
 
@@ -29,8 +35,9 @@ def html_esc_ex(orig_str, esc_html_sym, esc_non_ascii) -> str:
     天下霸唱,朱镕基 --> &#22825;&#19979;&#38712;&#21809;,&#26417;&#38229;&#22522;
     要进行这个转换的原因是 EPub是utf-8格式的, 其中有一些特殊字符, cp1512 中不支持, 要转义
 
-    这个算法是不高效的,因为在python内部, 通过 PyUnicode_KIND 已经知道有没有非ascii字符,
-    也就是讲,大部分情况下没有必要一个个字符进行验证
+    在python内部, 通过 PyUnicode_KIND 已经知道有没有非ascii字符(str.isascii 不用逐个字符验证),
+    大部分情况下没有必要一个个字符进行验证; 需要转义时交给编码器的 xmlcharrefreplace 一次完成
+    要写出为 bytes 的, 用 html_esc_enc, 转义与编码一步完成
 
     """
     rst = orig_str
@@ -42,28 +49,22 @@ def html_esc_ex(orig_str, esc_html_sym, esc_non_ascii) -> str:
         rst = rst.replace('"', '&quot;')  # 双引号
         rst = rst.replace("'", '&apos;')  # 单引号, &#x27
 
-    if esc_non_ascii:  # 大于127的字符转义
-        str_list = []
-        begin = -1
-        for i in range(0, len(orig_str)):
-            char = rst[i]
-            if ord(char) > 127:  # 非ascii字符且不能转换成 cp1252
-                if begin > -1:  # 前面有纯ascii的子串
-                    str_list.append(rst[begin:i])
-                    begin = -1
-                str_list.append(f'&#{ord(char)};')  # 十进制
-                # rst.append(f'&#x{ord(rst[i]):x};')  # 十六进制
-            elif begin == -1:
-                begin = i  # 纯ascii的子串开始
-        if begin == 0:
-            return rst  # 未出现过非ascii字符
-        elif begin > 0:  # 剩余未处理的纯ascii的子串
-            str_list.append(rst[begin::])
-        rst = ''.join(str_list)
+    if esc_non_ascii and not rst.isascii():  # 大于127的字符转义, 十进制, 如: &#22825;
+        rst = rst.encode('ascii', 'xmlcharrefreplace').decode('ascii')
 
     return rst
 
 
+def html_esc_enc(orig_str: str) -> bytes:
+    """
+    相当于 html_esc_ex(orig_str, False, True).encode('ascii'), 但转义与编码一步完成, 不生成中间的 str
+    纯ascii的(大部分页面片段都是)直接编码
+    """
+    if orig_str.isascii():
+        return orig_str.encode('ascii')
+    return orig_str.encode('ascii', 'xmlcharrefreplace')
+
+
 def output_nested_src(str_list, src, first_ident=1, mid_ident=-1, last_ident=-1):
     """
     输出嵌套结构的html源代码: 使用指定缩进
@@ -99,6 +100,59 @@ def get_direct_text(tag: bs4.Tag) -> str:
 def get_tag_text(tag_: bs4.Tag, sep='') -> str:
     return sep.join(tag_.stripped_strings)
 
+
+def get_lx_text(el: etree._Element, sep='') -> str:
+    """ lxml 版的 get_tag_text: 元素下的各段文本(不含注释)去掉首尾空白后连接 """
+    return sep.join(s for t in el.itertext() if (s := t.strip()))
+
+
+def get_lx_direct_text(el: etree._Element) -> str:
+    """ lxml 版的 get_direct_text: 元素下的直接文本(el.text 及各子元素的 tail), 不包括子元素内的文本 """
+    return ''.join(s for t in [el.text] + [ch.tail for ch in el] if t and (s := t.strip()))
+
+
+def lx_class_xpath(tag: str, class_: str, extra: str = '') -> etree.XPath:
+    """
+    生成与 bs4 的 find_all(tag, class_=class_) 匹配规则一致的预编译 XPath
+    class_ 为单个类名时匹配 class 中的任一个类名; 含空格时(如 'reference internal')匹配整个 class 串
+    :param extra: 附加的谓词, 如: [@role="navigation"]
+    """
+    if ' ' in class_:
+        pred = f'normalize-space(@class)="{class_}"'
+    else:
+        pred = f'contains(concat(" ", normalize-space(@class), " "), " {class_} ")'
+    return etree.XPath(f'descendant::{tag}[{pred}]{extra}')
+
+
+def lx_drop_tree(el: etree._Element):
+    """ 删除元素及其下的所有内容, 但保留它后面的文本(tail), 同 lxml.html 的 drop_tree, 也可用于 etree 的元素 """
+    parent = el.getparent()
+    if el.tail:
+        if (prev := el.getprevious()) is not None:
+            prev.tail = (prev.tail or '') + el.tail
+        else:
+            parent.text = (parent.text or '') + el.tail
+    parent.remove(el)
+
+
+HTML_SPACES = '\x20\x0a\x09\x0c\x0d'  # bs4 认定的空白字符, ref: BeautifulSoup.ASCII_SPACES
+
+
+def lx_collapse_space(root: etree._Element):
+    """
+    与 BeautifulSoup 解析时的处理一致: 只含空白的文本, 有换行的变成一个换行, 否则变成一个空格
+    <pre>, <textarea> 中的除外
+    """
+    keep = set()  # 在 <pre>, <textarea> 中的元素, 它们的文本保持原样
+    for pre in root.iter('pre', 'textarea'):
+        keep.update(pre.iter())
+    for el in root.iter():
+        if isinstance(el.tag, str) and (t := el.text) and not t.strip(HTML_SPACES) and el not in keep:
+            el.text = '\n' if '\n' in t else ' '
+        if (t := el.tail) and not t.strip(HTML_SPACES) and el.getparent() not in keep:
+            el.tail = '\n' if '\n' in t else ' '
+
+
 def prettify_html(src_fn, dest_fn=None):
     if dest_fn is None:
         dest_fn = src_fn
@@ -114,23 +168,21 @@ def prettify_html(src_fn, dest_fn=None):
 
 
 
-def delete(self: bs4.Tag, name=None, attrs={}, recursive=True, string=None, **kwargs) -> int:
+def delete(tag: bs4.Tag, name=None, attrs={}, recursive=True, string=None, **kwargs) -> int:
     """
-    查找并删除下级tag
-    动态附加到 bs4.Tag 上
+    查找并删除下级tag(第一个)
     """
-    if tag_ := self.find(name, attrs, recursive, string, **kwargs):
+    if tag_ := tag.find(name, attrs, recursive, string, **kwargs):
         tag_.decompose()
         return 1
     else:
         return 0
 
-def delete_all(self: bs4.Tag, name=None, attrs={}, recursive=True, string=None, limit=None, **kwargs) -> int:
+def delete_all(tag: bs4.Tag, name=None, attrs={}, recursive=True, string=None, limit=None, **kwargs) -> int:
     """
-    查找并删除下级tag
-    动态附加到 bs4.Tag 上
+    查找并删除下级tag(全部)
     """
-    rs = self.find_all(name, attrs, recursive, string, limit, **kwargs)
+    rs = tag.find_all(name, attrs, recursive, string, limit, **kwargs)
     cnt = len(rs)
     for tag_ in reversed(rs):  # 倒过来删除可靠点
         tag_.decompose()
@@ -139,14 +191,25 @@ def delete_all(self: bs4.Tag, name=None, attrs={}, recursive=True, string=None,
 
 def load_soup(src_path: Path, encoding=None, is_html: bool = True) -> BeautifulSoup:
     src_ = src_path.read_text(encoding)
+    return load_soup_src(src_, None, is_html)
+
+
+def load_soup_src(src_, encoding=None, is_html: bool = True) -> BeautifulSoup:
+    """ 由源码(str, 或者 bytes 加 encoding)生成 BeautifulSoup """
+    if encoding is not None:
+        src_ = src_.decode(encoding)
     fmt_ = 'lxml' if is_html else 'lxml-xml'
     return BeautifulSoup(src_, fmt_)
 
 
-# 动态增加两个方法,猴子方法, 慎用, IDE不能提供代码提示功能
-# 应只对第三方代码, 不方便继承的情况下使用
-bs4.Tag.delete = delete
-bs4.Tag.delete_all = delete_all
+_lx_parsers = {}  # lxml 的html解析器, 按编码各一个, ref: load_lx_src
+
+
+def load_lx_src(src_: bytes, encoding='utf-8') -> lxml.html.HtmlElement:
+    """ 由源码(bytes)直接用 lxml 解析成html文档的根元素, 对应 load_soup_src """
+    if (parser := _lx_parsers.get(encoding)) is None:
+        parser = _lx_parsers[encoding] = lxml.html.HTMLParser(encoding=encoding)
+    return lxml.html.document_fromstring(src_, parser=parser)
 
 
 def get_utc_ts():
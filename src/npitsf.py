@@ -0,0 +1,423 @@
+"""npitsf.py
+    nipow ITSF, 纯 Python 的 CHM 文件(ITSF 格式)生成, 不依赖 hha.dll, 任何平台都可以编译 chm
+
+    输入为 Html2Chm.gen_hhp_file 生成的 *.hhp 及其所在的目录(页面, *.hhc, *.hhk 等)
+    ref: Html2Chm.compile_chm
+
+    CHM 文件的结构:
+      ITSF 文件头(0x60) + 文件头第0节(0x18, 文件大小) + 目录(ITSP 头 + 若干 0x1000 的 PMGL/PMGI 块) + 第0段内容
+    目录中每个文件一项: (名字, 内容段, 段内偏移, 长度), 名字按小写的 utf-8 排序
+    内容段:
+      0: Uncompressed, 直接存放在文件尾部, 放 ::DataSpace 下的控制信息, 及第1段压缩后的数据
+      1: MSCompressed, 所有页面及 #SYSTEM 等内部文件顺序拼接成一个流, 用 LZX 压缩, ref: nplzx.py
+    内部文件:
+      #SYSTEM: 编译选项(目录文件, 索引文件, 默认页面, 标题, 语言等)
+      #STRINGS: 以0结尾的字符串, 其它内部文件以偏移引用
+      #TOPICS, #URLTBL, #URLSTR: 每个页面一项, 页面标题及 URL
+      #WINDOWS: [WINDOWS] 中定义的窗口
+    目录与索引使用 *.hhc, *.hhk 原文件(不生成二进制目录及索引), 不生成全文检索的数据($FIftiMain)
+
+2026-10-18: created
+            LZX 压缩可交给进程池按复位区间并行, 可选压缩级别, ref: ChmWriter.compile, nplzx.LEVELS
+            只放入 [FILES] 及目录, 索引中链接到的页面, 不再打包项目目录中的所有文件, ref: ChmWriter.collect_files
+"""
+import os
+import re
+import struct
+import time
+import uuid
+from pathlib import Path
+from nipow import *
+import nplzx
+from nplinks import resolve_ref, sitemap_links
+
+CHUNK_SIZE = 0x1000  # 目录块的大小
+QUICKREF_DENSITY = 2  # 每 1 + (1 << QUICKREF_DENSITY) 项一个 quickref
+LZXC_GUID = '{7FC28940-9D31-11D0-9B27-00A0C91E9C7C}'
+MS_COMPRESSED = '::DataSpace/Storage/MSCompressed/'
+
+
+def encint(n: int) -> bytes:
+    """ ITSF 的变长整数: 每字节7位, 高位在前, 除最后一个字节外最高位为1 """
+    out = [n & 0x7F]
+    n >>= 7
+    while n:
+        out.append(0x80 | (n & 0x7F))
+        n >>= 7
+    return bytes(reversed(out))
+
+
+def dir_key(name: str) -> bytes:
+    """ 目录中名字的排序依据: 小写的 utf-8 """
+    return name.encode('utf-8').lower()
+
+
+def read_hhp(hhp_fn) -> dict:
+    """
+    读取 *.hhp 项目文件
+    :return: {节名: [行, ...]}, 节名如: OPTIONS, WINDOWS, FILES
+    """
+    sections = {}
+    lines = None
+    for line in Path(hhp_fn).read_text('cp1252').splitlines():
+        line = line.strip()
+        if not line or line.startswith(';'):
+            continue
+        if line.startswith('[') and line.endswith(']'):
+            lines = sections.setdefault(line[1:-1].upper(), [])
+        elif lines is not None:
+            lines.append(line)
+    return sections
+
+
+def split_window_def(src: str) -> list:
+    """ 分解 [WINDOWS] 中窗口定义的各字段: 以逗号分隔, 双引号及方括号中的逗号不算 """
+    fields = []
+    cur = ''
+    quoted = bracket = False
+    for ch in src:
+        if ch == '"':
+            quoted = not quoted
+        elif ch == '[' and not quoted:
+            bracket = True
+        elif ch == ']' and not quoted:
+            bracket = False
+        elif ch == ',' and not quoted and not bracket:
+            fields.append(cur.strip())
+            cur = ''
+            continue
+        cur += ch
+    fields.append(cur.strip())
+    return [f[1:-1] if f.startswith('"') and f.endswith('"') else f for f in fields]
+
+
+class ChmStrings:
+    """ #STRINGS: 以偏移 0 的空串开头, 每个串以0结尾, 相同的串只存一次 """
+
+    def __init__(self, charset):
+        self.charset = charset
+        self.data = bytearray(b'\0')
+        self.offsets = {}
+
+    def add(self, s) -> int:
+        """ 返回串的偏移, 空串返回0 """
+        if not s:
+            return 0
+        if (off := self.offsets.get(s)) is None:
+            off = self.offsets[s] = len(self.data)
+            self.data += (s if isinstance(s, bytes) else s.encode(self.charset, 'replace')) + b'\0'
+        return off
+
+
+class ChmWriter:
+    """
+    由 *.hhp 生成 chm 文件, 用法: ChmWriter(hhp_fn, 'lzx').compile(chm_fn)
+    mode: 'lzx': 压缩; 'stored': 内容段由不压缩的 LZX 块组成, 最快
+    level: 'lzx' 的压缩级别: 'fast', 'default', 'best', ref: nplzx.LEVELS
+    """
+    PAGE_SUFFIXES = ('.html', '.htm')  # 页面, 进入 #TOPICS
+
+    def __init__(self, hhp_fn, mode='lzx', charset='cp1252', level='default'):
+        self.hhp_fn = str(hhp_fn)
+        self.proj_dir = Path(hhp_fn).parent
+        self.mode = mode
+        self.level = level
+        self.charset = charset  # 页面及 #STRINGS 等的字符集
+        self.hhp = read_hhp(hhp_fn)
+        self.options = dict(line.split('=', 1) for line in self.hhp.get('OPTIONS', []) if '=' in line)
+        self.lcid = int(self.options.get('Language', '0x409').split()[0], 16)
+
+    def collect_files(self) -> list:
+        """
+        要放入chm的文件(相对于项目目录, 用/分隔)
+        [FILES] 中的文件, 目录及索引文件, 以及目录, 索引中链接到的(存在的)页面
+        """
+        files = {f.replace('\\', '/'): None for f in self.hhp.get('FILES', [])}
+        for opt in ('Contents file', 'Index file'):
+            if not (fn := self.options.get(opt)):
+                continue
+            files[fn := fn.replace('\\', '/')] = None
+            if not (ph := self.proj_dir / fn).is_file():
+                continue
+            for _, local in sitemap_links(ph.read_bytes(), self.charset):
+                if (href := resolve_ref('', local)) and href not in files and (self.proj_dir / href).is_file():
+                    files[href] = None
+        return list(files)
+
+    def compile(self, chm_fn=None, executor=None) -> str:
+        """
+        编译生成 chm 文件
+        :param chm_fn: 目标文件, 默认为 hhp 中的 Compiled file
+        :param executor: 进程池, 给出时各复位区间并行压缩, ref: nplzx.compress
+        :return: chm 文件名
+        """
+        chm_fn = str(chm_fn or self.options['Compiled file'])
+        files = self.collect_files()
+        applog.info('chm_fn=%s, files=%d, mode=%s, level=%s', chm_fn, len(files), self.mode, self.level)
+
+        # 第1段(MSCompressed)的未压缩流: 内部文件在前, 页面等在后
+        stream = bytearray()
+        entries = []  # (名字, 内容段, 偏移, 长度)
+
+        def add_file(name, data):
+            entries.append((name, 1, len(stream), len(data)))
+            stream.extend(data)
+
+        pages = {}  # 文件名 -> 内容
+        for fn in files:
+            if (ph := Path(self.proj_dir, fn)).is_file():
+                pages[fn] = ph.read_bytes()
+            else:
+                applog.warning('file not found: %s', fn)
+        for name, data in self.system_files(chm_fn, pages).items():
+            add_file(name, data)
+        for fn, data in pages.items():
+            add_file('/' + fn, data)
+
+        comp, frame_offs = nplzx.compress(bytes(stream), self.mode, self.level, executor)
+        entries += self.section0_entries(len(stream), comp, frame_offs)
+
+        dirs = {'/'}  # 各级目录也各占一项
+        for name, *_ in entries:
+            if name.startswith('/'):
+                parts = name.split('/')[1:-1]
+                dirs.update('/' + '/'.join(parts[:i]) + '/' for i in range(1, len(parts) + 1))
+        entries += [(d, 0, 0, 0) for d in dirs]
+
+        section0 = bytearray()
+        dir_entries = []
+        for name, sec, off, data in entries:
+            if sec == 0 and isinstance(data, bytes):  # 第0段的文件, 内容直接放在文件尾部
+                dir_entries.append((name, 0, len(section0), len(data)))
+                section0 += data
+            else:
+                dir_entries.append((name, sec, off, data))
+        directory = self.build_directory(dir_entries)
+
+        hdr_len = 0x60
+        hs0_len = 0x18
+        content_off = hdr_len + hs0_len + len(directory)
+        file_size = content_off + len(section0)
+        itsf = b'ITSF' + struct.pack('<IIIII', 3, hdr_len, 1, int(time.time()) & 0xFFFFFFFF, self.lcid)
+        itsf += uuid.UUID('{7C01FD10-7BAA-11D0-9E0C-00A0C922E6EC}').bytes_le
+        itsf += uuid.UUID('{7C01FD11-7BAA-11D0-9E0C-00A0C922E6EC}').bytes_le
+        itsf += struct.pack('<QQQQQ', hdr_len, hs0_len, hdr_len + hs0_len, len(directory), content_off)
+        hs0 = struct.pack('<IIQII', 0x01FE, 0, file_size, 0, 0)
+
+        tmp_fn = chm_fn + '.tmp'
+        with open(tmp_fn, 'wb') as f:
+            for part in (itsf, hs0, directory, section0):
+                f.write(part)
+        os.replace(tmp_fn, chm_fn)
+        applog.info('chm_fn=%s, stream=%d, comp=%d, file_size=%d', chm_fn, len(stream), len(comp), file_size)
+        return chm_fn
+
+    def section0_entries(self, stream_len: int, comp: bytes, frame_offs: list) -> list:
+        """ 第0段的文件: 段的名字, LZX 的控制信息, 重置表, 压缩后的内容 """
+        names = ['Uncompressed', 'MSCompressed']
+        name_list = b''.join(struct.pack('<H', len(n)) + n.encode('utf-16-le') + b'\0\0' for n in names)
+        name_list = struct.pack('<H', len(names)) + name_list
+        name_list = struct.pack('<H', (len(name_list) + 2) // 2) + name_list  # 开头是以 WORD 计的长度
+
+        # LZXC 版本2, 复位区间与窗口都以 0x8000 为单位
+        control = struct.pack('<I4sIIIII', 6, b'LZXC', 2, nplzx.RESET_FRAMES, nplzx.RESET_SIZE // 0x8000, 1, 0)
+        reset_tab = struct.pack('<IIIIQQQ', 2, len(frame_offs), 8, 0x28, stream_len, len(comp), nplzx.FRAME_SIZE)
+        reset_tab += b''.join(struct.pack('<Q', off) for off in frame_offs)
+        transform = MS_COMPRESSED + f'Transform/{LZXC_GUID}/'
+        return [
+            ('::DataSpace/NameList', 0, 0, name_list),
+            (MS_COMPRESSED + 'Content', 0, 0, comp),
+            (MS_COMPRESSED + 'ControlData', 0, 0, control),
+            (MS_COMPRESSED + 'SpanInfo', 0, 0, struct.pack('<Q', stream_len)),
+            (MS_COMPRESSED + 'Transform/List', 0, 0, LZXC_GUID.encode('utf-16-le')),
+            (transform + 'InstanceData/ResetTable', 0, 0, reset_tab),
+        ]
+
+    def system_files(self, chm_fn, pages: dict) -> dict:
+        """ 生成 #SYSTEM, #TOPICS, #URLTBL, #URLSTR, #STRINGS, #WINDOWS """
+        opts = self.options
+        strings = ChmStrings(self.charset)
+        files = {}
+
+        # 出现在目录(*.hhc)中的页面, 在 #TOPICS 中有标记
+        in_toc = set()
+        if (hhc := opts.get('Contents file')) and hhc in pages:
+            for local in re.findall(rb'<param name="Local" value="([^"#]*)', pages[hhc], re.I):
+                in_toc.add(local.decode(self.charset))
+
+        topics = bytearray()
+        urltbl = bytearray()
+        urlstr = bytearray(b'\0')
+        for fn, data in pages.items():
+            if not fn.lower().endswith(self.PAGE_SUFFIXES):
+                continue
+            m = re.search(rb'<title>(.*?)</title>', data, re.I | re.S)
+            tit_off = strings.add(m.group(1).strip()) if m else 0xFFFFFFFF
+            if len(urltbl) % 0x1000 == 0x1000 - 4:  # #URLTBL 每 0x1000 字节一块, 每块 341 项, 最后4字节不用
+                urltbl += b'\0' * 4
+            topics += struct.pack('<IIIHH', 0, tit_off, len(urltbl), 6 if fn in in_toc else 2, 0)
+            urltbl += struct.pack('<III', 0, len(topics) // 16 - 1, len(urlstr))
+            urlstr += struct.pack('<II', len(urltbl) - 12, 0) + fn.encode('utf-8') + b'\0'
+        files['/#TOPICS'] = bytes(topics)
+        files['/#URLTBL'] = bytes(urltbl)
+        files['/#URLSTR'] = bytes(urlstr)
+        files['/#WINDOWS'] = self.windows_file(strings)
+
+        # #SYSTEM: 版本3, 后面是 (WORD 代码, WORD 长度, 数据)
+        def sz(s: str) -> bytes:
+            return s.encode(self.charset, 'replace') + b'\0'
+
+        records = [
+            (0, sz(opts.get('Contents file', ''))),
+            (1, sz(opts.get('Index file', ''))),
+            (2, sz(opts.get('Default topic', ''))),
+            (3, sz(opts.get('Title', ''))),
+            # LCID, 是否 DBCS, 是否有全文检索, 是否有 KLinks, ALinks, 时间戳(FILETIME), 2个未知
+            (4, struct.pack('<IIIIIQII', self.lcid, 0, 0, 0, 0, (int(time.time()) + 11644473600) * 10**7, 0, 0)),
+            (5, sz(opts.get('Default Window', ''))),
+            (6, sz(Path(chm_fn).stem)),
+            (9, sz(f'PyDocInCHM npitsf ({self.mode})')),
+            (12, struct.pack('<I', 0)),  # 信息类型的个数
+        ]
+        files['/#SYSTEM'] = struct.pack('<I', 3) + b''.join(struct.pack('<HH', code, len(data)) + data
+                                                            for code, data in records)
+        files['/#STRINGS'] = bytes(strings.data)
+        return files
+
+    def windows_file(self, strings: ChmStrings) -> bytes:
+        """
+        #WINDOWS: DWORD 个数, DWORD 每项的大小(0xC4), 每项为一个 HH_WINTYPE 结构, 串以 #STRINGS 中的偏移表示
+        [WINDOWS] 中的字段: 标题, 目录, 索引, 默认页面, 主页, 跳转1 url, 跳转1 文字, 跳转2 url, 跳转2 文字,
+            导航窗口风格, 导航窗口宽度, 按钮, [窗口位置], 窗口风格, 扩展风格, 显示状态, 导航窗口关闭, 默认导航页,
+            导航窗口位置, 通知id
+        """
+        wins = []
+        for line in self.hhp.get('WINDOWS', []):
+            if '=' not in line:
+                continue
+            name, defn = line.split('=', 1)
+            f = split_window_def(defn) + [''] * 20
+
+            def num(s, default=0):
+                return int(s, 0) if s else default
+
+            valid = 0
+            props, nav_width, tb_flags = num(f[9]), num(f[10]), num(f[11])
+            if f[9]:
+                valid |= 0x2  # HHWIN_PARAM_PROPERTIES
+            if f[13]:
+                valid |= 0x4  # HHWIN_PARAM_STYLES
+            if f[14]:
+                valid |= 0x8  # HHWIN_PARAM_EXSTYLES
+            rect = (0, 0, 0, 0)
+            if f[12].startswith('['):
+                rect = tuple(num(v.strip()) for v in f[12][1:-1].split(','))
+                valid |= 0x10  # HHWIN_PARAM_RECT
+            if f[10]:
+                valid |= 0x20  # HHWIN_PARAM_NAV_WIDTH
+            if f[15]:
+                valid |= 0x40  # HHWIN_PARAM_SHOWSTATE
+            if f[11]:
+                valid |= 0x100  # HHWIN_PARAM_TB_FLAGS
+            if f[16]:
+                valid |= 0x200  # HHWIN_PARAM_EXPANSION
+            if f[17]:
+                valid |= 0x2000  # HHWIN_PARAM_CUR_TAB
+            if f[18]:
+                valid |= 0x400  # HHWIN_PARAM_TABPOS
+            win = struct.pack('<IIIIIIII', 0xC4, 0, strings.add(name.strip()), valid, props, strings.add(f[0]),
+                              num(f[13]), num(f[14]))
+            win += struct.pack('<4i', *rect)
+            win += struct.pack('<IIIIIII', num(f[15]), 0, 0, 0, 0, 0, 0)  # 显示状态, 各个窗口句柄
+            win += struct.pack('<I', nav_width) + b'\0' * 16  # 导航窗口宽度, rcHTML
+            win += struct.pack('<IIII', *(strings.add(s) for s in f[1:5]))  # 目录, 索引, 默认页面, 主页
+            win += struct.pack('<IIIII', tb_flags, num(f[16]), num(f[17]), num(f[18]), num(f[19]))
+            win += b'\0' * 20  # tabOrder
+            win += struct.pack('<IIIII', 0, strings.add(f[6]), strings.add(f[8]), strings.add(f[5]), strings.add(f[7]))
+            win += b'\0' * 16 + struct.pack('<II', 0, 0)  # rcMinSize, cbInfoTypes, pszCustomTabs
+            assert len(win) == 0xC4
+            wins.append(win)
+        return struct.pack('<II', len(wins), 0xC4) + b''.join(wins)
+
+    @staticmethod
+    def build_directory(entries: list) -> bytes:
+        """
+        生成目录: ITSP 头 + PMGL 块(按名字排序的目录项) + PMGI 块(各 PMGL 块的第一个名字, 多级)
+        :param entries: [(名字, 内容段, 偏移, 长度), ...]
+        """
+        entries = sorted(entries, key=lambda e: dir_key(e[0]))
+        items = [encint(len(nb := name.encode('utf-8'))) + nb + encint(sec) + encint(off) + encint(ln)
+                 for name, sec, off, ln in entries]
+        names = [name for name, *_ in entries]
+
+        chunks = []
+        # PMGL: 'PMGL', 空闲区长度, 0, 上一块, 下一块
+        listing = _fill_chunks(items, names, 0x14)
+        first_names = []
+        for i, (chunk_items, chunk_first) in enumerate(listing):
+            prev_ = i - 1 if i else -1
+            next_ = i + 1 if i + 1 < len(listing) else -1
+            chunks.append(_make_chunk(b'PMGL', chunk_items, struct.pack('<iii', 0, prev_, next_)))
+            first_names.append(chunk_first)
+
+        # PMGI: 'PMGI', 空闲区长度; 只有一个 PMGL 块时不需要, 一个 PMGI 块放不下时再加一级
+        depth = 1
+        root = -1
+        level = [(name, i) for i, name in enumerate(first_names)]  # 下一级各块的 (第一个名字, 块号)
+        while len(level) > 1:
+            depth += 1
+            idx_items = [encint(len(nb := name.encode('utf-8'))) + nb + encint(num) for name, num in level]
+            idx_names = [name for name, _ in level]
+            level = []
+            for chunk_items, chunk_first in _fill_chunks(idx_items, idx_names, 0x08):
+                level.append((chunk_first, len(chunks)))
+                chunks.append(_make_chunk(b'PMGI', chunk_items, b''))
+            root = len(chunks) - 1
+
+        itsp = b'ITSP' + struct.pack('<IIIIIiiiiiII', 1, 0x54, 0x0A, CHUNK_SIZE, QUICKREF_DENSITY, depth, root,
+                                     0, len(first_names) - 1, -1, len(chunks), 0x409)
+        itsp += uuid.UUID('{5D02926A-212E-11D0-9DF9-00A0C922E6EC}').bytes_le
+        itsp += struct.pack('<Iiii', 0x54, -1, -1, -1)
+        return itsp + b''.join(chunks)
+
+
+def _quickref_len(n: int) -> int:
+    """ n 项的块, quickref 区(含最后的项数)至少要留的长度, 阅读器检查时把第0项也算上 """
+    return 2 * ((n + (1 << QUICKREF_DENSITY)) // (1 + (1 << QUICKREF_DENSITY))) + 2
+
+
+def _fill_chunks(items: list, names: list, hdr_len: int) -> list:
+    """ 把目录项依次装入块中 :return: [(块中的项, 块中第一项的名字), ...] """
+    chunks = []
+    cur, used = [], hdr_len
+    for item, name in zip(items, names):
+        if cur and used + len(item) + _quickref_len(len(cur) + 1) > CHUNK_SIZE:
+            chunks.append((cur, cur_first))
+            cur, used = [], hdr_len
+        if not cur:
+            cur_first = name
+        cur.append(item)
+        used += len(item)
+    if cur:
+        chunks.append((cur, cur_first))
+    return chunks
+
+
+def _make_chunk(sig: bytes, items: list, hdr_rest: bytes) -> bytes:
+    """
+    组装一个目录块: 头, 目录项, 空闲区, quickref 区
+    quickref: 从块尾倒着写, 最后2字节是项数, 之前每 n 项(第 n, 2n... 项)一个, 为该项相对于第一项的偏移
+    """
+    body = b''.join(items)
+    hdr_len = 4 + 4 + len(hdr_rest)
+    free_len = CHUNK_SIZE - hdr_len - len(body)
+    qr_n = 1 + (1 << QUICKREF_DENSITY)
+    qr = []
+    pos = 0
+    for i, item in enumerate(items):
+        if i and i % qr_n == 0:
+            qr.append(pos)
+        pos += len(item)
+    quickref = b''.join(struct.pack('<H', off) for off in reversed(qr)) + struct.pack('<H', len(items))
+    chunk = sig + struct.pack('<I', free_len) + hdr_rest + body
+    return chunk + b'\0' * (CHUNK_SIZE - len(chunk) - len(quickref)) + quickref
@@ -0,0 +1,168 @@
+"""nplinks.py
+    nipow link graph, 页面及资源文件之间的引用关系
+
+    页面中的 href, src, data 属性, 以及 css 中的 url(), @import 都是引用, 引用的目标统一换算成 href(相对于doc_root, 用/分隔,
+    不含 #书签 及 ?参数), 外部链接(http:, mailto: 等)不算.
+    从目录(hhc), 索引(hhk)及默认主题等根出发, 沿引用能到达的页面和资源才需要放入chm, 其它的可以删除, ref: Html2Chm.prune_files
+
+2026-10-18: created
+            增加书签索引 AnchorIndex 及链接检查 check_links: 目录, 索引及页面中的链接, 目标页面及其中的 #书签 都要存在
+"""
+import html
+import posixpath
+import re
+from collections import deque
+from urllib.parse import unquote
+
+# 页面中的引用: href="...", src="...", data="..."(<object>), 属性名前面必须是空白
+PAGE_REF_RE = re.compile(rb'''(?<=\s)(?:href|src|data)\s*=\s*(?:"([^"]*)"|'([^']*)')''', re.I)
+# css 中的引用: url(...), @import "..."
+CSS_REF_RE = re.compile(rb'''url\(\s*["']?([^"')]*?)["']?\s*\)|@import\s+["']([^"']+)["']''', re.I)
+# 页面中的书签: 任何元素的 id="..."; name="..." 只有 <a name=...> 的才是书签(<meta name=...> 等不是)
+ANCHOR_RE = re.compile(rb'''(?<=\s)id\s*=\s*(?:"([^"]*)"|'([^']*)')''', re.I)
+A_NAME_RE = re.compile(rb'''<a\s[^>]*?(?<=\s)name\s*=\s*(?:"([^"]*)"|'([^']*)')''', re.I)
+# hhc, hhk 中的条目: Name, Keyword 是条目的名字, Local 是链接
+_SITEMAP_PARAM_RE = re.compile(rb'<param\s+name="(Name|Keyword|Local)"\s+value="([^"]*)"', re.I)
+_SCHEME_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')  # http:, mailto:, javascript: 等, 也包括 c: 之类的盘符
+
+
+def _refs(regex: re.Pattern, src: bytes, encoding) -> list:
+    """ 找出 src 中的引用(原样, 已去重, 保持出现的顺序) """
+    refs = {}
+    for m in regex.finditer(src):
+        ref = m.group(1) if m.group(1) is not None else m.group(2)
+        if ref:
+            refs[ref] = None
+    return [html.unescape(ref.decode(encoding, 'replace')) for ref in refs]
+
+
+def page_refs(src: bytes, encoding='cp1252') -> list:
+    """ 页面(已编码的html)中的引用, 原样给出, 由 resolve_ref 换算 """
+    return _refs(PAGE_REF_RE, src, encoding)
+
+
+def css_refs(src: bytes, encoding='utf-8') -> list:
+    """ css 文件中的引用, 原样给出, 由 resolve_ref 换算 """
+    return [ref for ref in _refs(CSS_REF_RE, src, encoding) if not ref.startswith('data:')]
+
+
+def page_anchors(src: bytes, encoding='cp1252') -> list:
+    """ 页面(已编码的html)中的书签, 即各元素的 id 及 <a> 的 name 属性的值 """
+    return _refs(ANCHOR_RE, src, encoding) + _refs(A_NAME_RE, src, encoding)
+
+
+def sitemap_links(src: bytes, encoding='cp1252') -> list:
+    """ hhc, hhk 中的链接: [(条目的名字, Local), ...], Local 原样(含 #书签); hhk 的条目以 Keyword 为名字 """
+    links, label, has_kw = [], '', False
+    for m in _SITEMAP_PARAM_RE.finditer(src):
+        kind, val = m.group(1).lower(), html.unescape(m.group(2).decode(encoding, 'replace'))
+        if kind == b'local':
+            links.append((label, val))
+        elif kind == b'keyword':
+            label, has_kw = val, True
+        elif not has_kw:
+            label = val
+    return links
+
+
+def is_external(ref: str) -> bool:
+    """ ref 是否是外部链接: 有 scheme(http:, mailto:, c: 等)或以 // 开头 """
+    return ref.startswith('//') or _SCHEME_RE.match(ref) is not None
+
+
+def resolve_ref(base_href: str, ref: str) -> str | None:
+    """
+    把 base_href 中的引用 ref 换算成相对于 doc_root 的 href, 外部链接及页内书签返回 None
+        resolve_ref('library/os.html', '../_static/pydoctheme.css#x') -> '_static/pydoctheme.css'
+    """
+    ref = ref.split('#', 1)[0].split('?', 1)[0].strip()
+    if not ref or is_external(ref):
+        return None
+    href = posixpath.normpath(posixpath.join(posixpath.dirname(base_href), unquote(ref)))
+    if href.startswith('../') or href == '..':
+        return None  # doc_root 之外
+    return href.lstrip('/')
+
+
+class LinkGraph:
+    """
+    引用关系图: href -> 它引用的 href
+        graph = LinkGraph()
+        graph.add('index.html', page_refs(src))
+        keep = graph.reachable(['index.html'])
+    """
+    def __init__(self):
+        self.edges = {}  # href -> {被引用的 href: None}
+
+    def add(self, href, refs):
+        """ 登记 href 中的引用(原样的, 由 resolve_ref 换算) """
+        targets = self.edges.setdefault(href, {})
+        for ref in refs:
+            if (target := resolve_ref(href, ref)) is not None and target != href:
+                targets[target] = None
+
+    def reachable(self, roots) -> set:
+        """ 从 roots 出发沿引用能到达的所有 href(包括 roots 本身) """
+        seen = set(roots)
+        todo = deque(seen)
+        while todo:
+            for target in self.edges.get(todo.popleft(), ()):
+                if target not in seen:
+                    seen.add(target)
+                    todo.append(target)
+        return seen
+
+
+def split_ref(base_href: str, ref: str) -> tuple | None:
+    """
+    同 resolve_ref, 另外给出 #书签: (href, 书签), 没有书签时为 ''; 页内书签 '#x' 的 href 就是 base_href
+        split_ref('library/os.html', '#os.getcwd') -> ('library/os.html', 'os.getcwd')
+    """
+    ref = ref.strip()
+    frag = ref.split('#', 1)[1] if '#' in ref else ''
+    if ref.startswith('#'):
+        return base_href, frag
+    if (href := resolve_ref(base_href, ref)) is None:
+        return None
+    return href, frag
+
+
+class AnchorIndex:
+    """
+    书签索引: 页面 href -> 页面中的书签集合, 另外登记不是页面的文件(资源); 建好后检查一个链接只是两次集合查找
+        index = AnchorIndex(['_static/pydoctheme.css'])
+        index.add('library/os.html', page_anchors(src))
+        index.check('index.html', 'library/os.html#os.getcwd')  # None 表示没问题, 否则是原因
+    """
+    def __init__(self, files=()):
+        self.anchors = {}  # 页面 href -> {书签}
+        self.files = set(files)  # 不是页面的文件
+
+    def add(self, href, anchors):
+        self.anchors[href] = set(anchors)
+
+    def check(self, base_href: str, ref: str) -> str | None:
+        """ base_href 中的链接 ref 的目标是否存在; 外部链接不检查 :return: None, 'missing file' 或 'missing anchor' """
+        if (target := split_ref(base_href, ref)) is None:
+            return None
+        href, frag = target
+        if (anchors := self.anchors.get(href)) is None:
+            return None if href in self.files else 'missing file'
+        if frag and frag not in anchors and unquote(frag) not in anchors:
+            return 'missing anchor'
+        return None
+
+
+def check_links(index: AnchorIndex, sources) -> tuple:
+    """
+    检查各来源中的链接
+    :param sources: [(来源, base_href, [ref, ...]), ...], 来源用于报告, 如 'library/os.html', 'pythondoc.hhc: os'
+    :return: (检查的链接数, 有问题的链接 [(来源, ref, 原因), ...])
+    """
+    count, broken = 0, []
+    for source, base_href, refs in sources:
+        for ref in refs:
+            count += 1
+            if reason := index.check(base_href, ref):
+                broken.append((source, ref, reason))
+    return count, broken
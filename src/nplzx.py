@@ -0,0 +1,577 @@
+"""nplzx.py
+    nipow LZX, CHM 中 MSCompressed 段使用的 LZX 压缩, ref: npitsf.py
+
+    CHM 中 LZX 的参数(ref: npitsf.ChmWriter 写出的 ControlData):
+      窗口 64K(WINDOW_BITS = 16, 共 32 个 position slot), 每 32K 为一帧(frame), 每 2 帧(64K)复位(reset)一次
+    复位后解压器的状态全部清除(窗口, R0~R2, 各个 Huffman 树的码长), 因此各个复位区间可以独立压缩,
+    各帧压缩结果的偏移写到 ResetTable 中, 阅读器由此可以从任一复位点开始解压
+
+    本模块每帧输出一个块(block), 帧结束时位流按16位对齐, 块有两种:
+      verbatim: LZ77 + Huffman, 匹配用 3 字节的 hash 链查找, 对应 mode='lzx', 速度与压缩率由 level 调节, ref: LEVELS
+      uncompressed: 不压缩, 对应 mode='stored', 最快, 但chm文件大
+    各复位区间互相独立, 可以交给进程池并行压缩, 再按顺序拼接并换算各帧的偏移(ResetTable), ref: compress
+    不做 E8 转换(复位区间开头的 E8 标志位总是 0), 不使用 aligned offset 块
+
+    位流: 以16位小端字为单位, 每个字内从高位到低位
+
+    解压(LzxDecoder)按 libmspack(lzxd.c)的语义实现, 三种块及 E8 转换都支持, 窗口 32K ~ 2M, 可读 hha.dll 生成的 chm,
+    一次解压一个复位区间, ref: npchmread.ChmReader
+
+2026-10-18: created
+            增加解压 LzxDecoder
+            各复位区间可并行压缩; 增加压缩级别 level
+"""
+import struct
+
+FRAME_SIZE = 0x8000  # 每帧的未压缩长度
+RESET_FRAMES = 2  # 每个复位区间的帧数
+RESET_SIZE = FRAME_SIZE * RESET_FRAMES  # 复位区间的未压缩长度, 也是窗口的大小
+WINDOW_BITS = 16
+
+NUM_CHARS = 256
+NUM_POSITION_SLOTS = 32  # 对应 WINDOW_BITS = 16
+POSITION_SLOTS = {15: 30, 16: 32, 17: 34, 18: 36, 19: 38, 20: 42, 21: 50}  # 窗口位数 -> position slot 数, 解压用
+NUM_PRIMARY_LENGTHS = 7
+MAIN_TREE_SIZE = NUM_CHARS + NUM_POSITION_SLOTS * 8
+LENGTH_TREE_SIZE = 249
+PRETREE_SIZE = 20
+MIN_MATCH = 2
+MAX_MATCH = 257
+MAX_OFFSET = RESET_SIZE - 3
+
+BLOCKTYPE_VERBATIM = 1
+BLOCKTYPE_ALIGNED = 2
+BLOCKTYPE_UNCOMPRESSED = 3
+ALIGNED_TREE_SIZE = 8
+
+# 各 position slot 的附加位数及起始值, 按最大的窗口(2M)算
+EXTRA_BITS = []
+POSITION_BASE = []
+for _i in range(max(POSITION_SLOTS.values())):
+    EXTRA_BITS.append(min(max(_i // 2 - 1, 0), 17))
+    POSITION_BASE.append(POSITION_BASE[-1] + (1 << EXTRA_BITS[-2]) if _i else 0)
+del _i
+
+MODES = ('stored', 'lzx')
+# 压缩级别: (hash 链的最大查找深度, 够长即停止查找的匹配长度, 匹配中的位置加入 hash 链的最大匹配长度)
+LEVELS = {
+    'fast': (4, 32, 16),
+    'default': (16, MAX_MATCH, MAX_MATCH),
+    'best': (128, MAX_MATCH, MAX_MATCH),
+}
+
+
+class LzxBitWriter:
+    """ LZX 位流的写出: 16位小端字, 字内从高位到低位 """
+    __slots__ = ('out', 'acc', 'nbits')
+
+    def __init__(self):
+        self.out = bytearray()
+        self.acc = 0  # 还未写出的位
+        self.nbits = 0  # acc 中的位数, 总是小于16
+
+    def put(self, value: int, nbits: int):
+        acc = (self.acc << nbits) | value
+        nbits += self.nbits
+        while nbits >= 16:
+            nbits -= 16
+            self.out += ((acc >> nbits) & 0xFFFF).to_bytes(2, 'little')
+        self.acc = acc & ((1 << nbits) - 1)
+        self.nbits = nbits
+
+    def align(self):
+        """ 补0对齐到16位, 帧结束时使用 """
+        if self.nbits:
+            self.put(0, 16 - self.nbits)
+
+    def align_uncompressed(self):
+        """ uncompressed 块头之后的对齐: 补 1~16 位的0, 本来就对齐时补16位 """
+        self.put(0, 16 - self.nbits)
+
+    def put_bytes(self, data):
+        """ 按字节原样写出, 只能在对齐之后使用 """
+        self.out += data
+
+
+def huff_lengths(freqs: list, max_len: int) -> list:
+    """
+    由各符号的频率计算 Huffman 码长, 码长不超过 max_len, 且总是完整的编码(解压器要求)
+    使用的符号少于2个时, 补上符号 0, 1
+    """
+    import heapq
+    syms = [s for s, f in enumerate(freqs) if f]
+    for s in (0, 1):
+        if len(syms) < 2 and s not in syms:
+            syms.append(s)
+    lengths = [0] * len(freqs)
+    # 标准的 Huffman, 堆中的项: (频率, 序号, 符号列表)
+    heap = [(freqs[s] or 1, s, [s]) for s in syms]
+    heapq.heapify(heap)
+    seq = len(freqs)
+    while len(heap) > 1:
+        f1, _, s1 = heapq.heappop(heap)
+        f2, _, s2 = heapq.heappop(heap)
+        for s in s1:
+            lengths[s] += 1
+        for s in s2:
+            lengths[s] += 1
+        heapq.heappush(heap, (f1 + f2, seq, s1 + s2))
+        seq += 1
+
+    if max(lengths) > max_len:  # 限长: 先截断, 再调整到 Kraft 和恰好为 1
+        for s in syms:
+            lengths[s] = min(lengths[s], max_len)
+        one = 1 << max_len
+        kraft = sum(1 << (max_len - lengths[s]) for s in syms)
+        by_freq = sorted(syms, key=lambda s: (freqs[s], -s))  # 频率低的在前
+        while kraft > one:  # 超了: 加长频率低的符号
+            for s in by_freq:
+                if lengths[s] < max_len:
+                    kraft -= 1 << (max_len - lengths[s] - 1)
+                    lengths[s] += 1
+                    break
+        while kraft < one:  # 不够: 缩短最长的码中频率最高的, 每次补上最小的单位, 不会超
+            lmax = max(lengths[s] for s in syms)
+            s = max((s for s in syms if lengths[s] == lmax), key=lambda s: freqs[s])
+            lengths[s] -= 1
+            kraft += 1 << (max_len - lengths[s] - 1)
+    return lengths
+
+
+def huff_codes(lengths: list) -> list:
+    """ 由码长生成范式 Huffman 编码: 码长短的在前, 同码长的按符号顺序 """
+    codes = [0] * len(lengths)
+    code = 0
+    for n in range(1, max(lengths) + 1):
+        for s, ln in enumerate(lengths):
+            if ln == n:
+                codes[s] = code
+                code += 1
+        code <<= 1
+    return codes
+
+
+def position_slot(formatted_offset: int) -> int:
+    """ formatted offset(实际偏移+2) 所在的 position slot """
+    lo, hi = 3, NUM_POSITION_SLOTS - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if POSITION_BASE[mid] <= formatted_offset:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class LzxEncoder:
+    """
+    压缩一个复位区间, 用法: LzxEncoder(mode, level).compress_interval(data)
+    mode: 'stored': uncompressed 块; 'lzx': verbatim 块
+    level: 'lzx' 模式下的压缩级别, ref: LEVELS; 'fast' 最快, 'best' 压缩率最高
+    """
+
+    def __init__(self, mode='lzx', level='default'):
+        assert mode in MODES, f'{mode=}'
+        assert level in LEVELS, f'{level=}'
+        self.mode = mode
+        self.level = level
+        self.max_chain, self.nice_len, self.max_insert = LEVELS[level]
+
+    def compress_interval(self, data: bytes) -> tuple:
+        """
+        压缩一个复位区间
+        :param data: 未压缩的数据, 不超过 RESET_SIZE, 不是最后一个区间时必须正好是 RESET_SIZE
+        :return: (压缩结果, [各帧在压缩结果中的偏移])
+        """
+        assert len(data) <= RESET_SIZE
+        bw = LzxBitWriter()
+        bw.put(0, 1)  # E8 标志: 不做 E8 转换
+        frame_offs = []
+        prev_lens = ([0] * MAIN_TREE_SIZE, [0] * LENGTH_TREE_SIZE)  # 复位后码长都是0, 之后的块按增量写出
+        rs = [1, 1, 1]  # R0, R1, R2
+        head, chain = {}, [-1] * len(data)  # hash 链
+        for start in range(0, len(data), FRAME_SIZE):
+            end = min(start + FRAME_SIZE, len(data))
+            frame_offs.append(len(bw.out))
+            if self.mode == 'stored':
+                self._put_uncompressed(bw, data[start:end], rs)
+            else:
+                tokens = self._lz_parse(data, start, end, head, chain)
+                self._put_verbatim(bw, tokens, end - start, prev_lens, rs)
+            bw.align()  # 帧结束, 对齐到16位
+        return bytes(bw.out), frame_offs
+
+    @staticmethod
+    def _put_uncompressed(bw: LzxBitWriter, chunk: bytes, rs: list):
+        bw.put(BLOCKTYPE_UNCOMPRESSED, 3)
+        bw.put(len(chunk) >> 8, 16)  # 块长度 24位
+        bw.put(len(chunk) & 0xFF, 8)
+        bw.align_uncompressed()
+        bw.put_bytes(b''.join(r.to_bytes(4, 'little') for r in rs))  # R0, R1, R2 保持不变
+        bw.put_bytes(chunk)
+        if len(chunk) & 1:
+            bw.put_bytes(b'\0')
+
+    def _lz_parse(self, data: bytes, start: int, end: int, head: dict, chain: list) -> list:
+        """
+        贪婪匹配, 匹配不跨帧(解压器要求), 可以引用本复位区间中此前的任何数据
+        :return: 记号列表, 字面字节: 0~255; 匹配: (长度 << 17) | 偏移
+        """
+        tokens = []
+        max_chain, nice_len, max_insert = self.max_chain, self.nice_len, self.max_insert
+        i = start
+        last = end - 3  # 至少要有3个字节才查找匹配
+        while i < end:
+            best_len = best_off = 0
+            if i <= last:
+                key = data[i:i + 3]
+                cand = head.get(key, -1)
+                chain[i] = cand
+                head[key] = i
+                max_len = min(MAX_MATCH, end - i)
+                good_len = min(nice_len, max_len)  # 够长了, 不再找更长的
+                depth = max_chain
+                while cand >= 0 and depth:
+                    off = i - cand
+                    if off > MAX_OFFSET:
+                        break
+                    # 先比较当前最佳长度处的字节, 不可能更长的候选直接跳过
+                    if best_len < max_len and data[cand + best_len] == data[i + best_len]:
+                        n = 3
+                        while n + 16 <= max_len and data[cand + n:cand + n + 16] == data[i + n:i + n + 16]:
+                            n += 16
+                        while n < max_len and data[cand + n] == data[i + n]:
+                            n += 1
+                        if n > best_len:
+                            best_len, best_off = n, off
+                            if n >= good_len:
+                                break
+                    cand = chain[cand]
+                    depth -= 1
+            if best_len >= 3:
+                tokens.append((best_len << 17) | best_off)
+                if best_len <= max_insert:  # 匹配中的位置也加入 hash 链; fast 时长的匹配不加, 快很多, 但之后的匹配差一些
+                    for j in range(i + 1, min(i + best_len, last + 1)):
+                        key = data[j:j + 3]
+                        chain[j] = head.get(key, -1)
+                        head[key] = j
+                i += best_len
+            else:
+                tokens.append(data[i])
+                i += 1
+        return tokens
+
+    @staticmethod
+    def _put_verbatim(bw: LzxBitWriter, tokens: list, block_len: int, prev_lens: tuple, rs: list):
+        """ 写出一个 verbatim 块: 块头, 主树与长度树的码长, 记号 """
+        main_freq = [0] * MAIN_TREE_SIZE
+        len_freq = [0] * LENGTH_TREE_SIZE
+        syms = []  # (主树符号, 长度树符号或-1, 附加位数, 附加位的值)
+        r0, r1, r2 = rs
+        for t in tokens:
+            if t < NUM_CHARS:
+                main_freq[t] += 1
+                syms.append((t, -1, 0, 0))
+                continue
+            length, off = t >> 17, t & 0x1FFFF
+            extra_n = extra_v = 0
+            if off == r0:
+                slot = 0
+            elif off == r1:
+                slot = 1
+                r1, r0 = r0, off
+            elif off == r2:
+                slot = 2
+                r2, r0 = r0, off
+            else:
+                slot = position_slot(off + 2)
+                extra_n = EXTRA_BITS[slot]
+                extra_v = off + 2 - POSITION_BASE[slot]
+                r2, r1, r0 = r1, r0, off
+            len_hdr = min(length - MIN_MATCH, NUM_PRIMARY_LENGTHS)
+            main_sym = NUM_CHARS + (slot << 3) + len_hdr
+            main_freq[main_sym] += 1
+            if len_hdr == NUM_PRIMARY_LENGTHS:
+                len_sym = length - MIN_MATCH - NUM_PRIMARY_LENGTHS
+                len_freq[len_sym] += 1
+            else:
+                len_sym = -1
+            syms.append((main_sym, len_sym, extra_n, extra_v))
+        rs[:] = r0, r1, r2
+
+        main_lens = huff_lengths(main_freq, 16)
+        len_lens = huff_lengths(len_freq, 16)
+        bw.put(BLOCKTYPE_VERBATIM, 3)
+        bw.put(block_len >> 8, 16)
+        bw.put(block_len & 0xFF, 8)
+        prev_main, prev_len = prev_lens
+        _put_tree_lens(bw, main_lens, prev_main, 0, NUM_CHARS)
+        _put_tree_lens(bw, main_lens, prev_main, NUM_CHARS, MAIN_TREE_SIZE)
+        _put_tree_lens(bw, len_lens, prev_len, 0, LENGTH_TREE_SIZE)
+        prev_main[:] = main_lens
+        prev_len[:] = len_lens
+
+        main_codes = huff_codes(main_lens)
+        len_codes = huff_codes(len_lens)
+        put = bw.put
+        for main_sym, len_sym, extra_n, extra_v in syms:
+            put(main_codes[main_sym], main_lens[main_sym])
+            if len_sym >= 0:
+                put(len_codes[len_sym], len_lens[len_sym])
+            if extra_n:
+                put(extra_v, extra_n)
+
+
+def _put_tree_lens(bw: LzxBitWriter, lens: list, prev: list, first: int, last: int):
+    """
+    用 pretree 写出 lens[first:last], 码长按与上一块(prev)的差值编码
+    pretree 符号: 0~16: 差值 (prev - len) % 17; 17: 4~19个0; 18: 20~51个0
+    """
+    items = []  # (pretree 符号, 附加位数, 附加位的值)
+    i = first
+    while i < last:
+        if lens[i] == 0:
+            n = 1
+            while i + n < last and n < 51 and lens[i + n] == 0:
+                n += 1
+            if n >= 20:
+                items.append((18, 5, n - 20))
+                i += n
+                continue
+            if n >= 4:
+                items.append((17, 4, n - 4))
+                i += n
+                continue
+        items.append(((prev[i] - lens[i]) % 17, 0, 0))
+        i += 1
+
+    freq = [0] * PRETREE_SIZE
+    for sym, _, _ in items:
+        freq[sym] += 1
+    pre_lens = huff_lengths(freq, 15)  # pretree 的码长用4位写出
+    pre_codes = huff_codes(pre_lens)
+    for ln in pre_lens:
+        bw.put(ln, 4)
+    for sym, extra_n, extra_v in items:
+        bw.put(pre_codes[sym], pre_lens[sym])
+        if extra_n:
+            bw.put(extra_v, extra_n)
+
+
+def _compress_job(args) -> list:
+    """ 压缩连续的若干个复位区间, 可在进程池中执行 :return: [(压缩结果, [各帧的偏移]), ...] """
+    data, mode, level = args
+    enc = LzxEncoder(mode, level)
+    return [enc.compress_interval(data[start:start + RESET_SIZE]) for start in range(0, len(data), RESET_SIZE)]
+
+
+def compress(data: bytes, mode='lzx', level='default', executor=None, batch=8) -> tuple:
+    """
+    压缩整个流, 各复位区间压缩后按顺序拼接, 结果与是否并行无关
+    :param executor: concurrent.futures 的执行器(进程池), 给出时每 batch 个复位区间一组并行压缩; 'stored' 总是串行
+    :return: (压缩结果, [各帧在压缩结果中的偏移]), 后者即 ResetTable 的内容
+    """
+    step = RESET_SIZE * batch
+    jobs = [(data[start:start + step], mode, level) for start in range(0, len(data), step)]
+    if executor is not None and mode != 'stored' and len(jobs) > 1:
+        results = executor.map(_compress_job, jobs)
+    else:
+        results = map(_compress_job, jobs)
+    out = bytearray()
+    frame_offs = []
+    for intervals in results:
+        for comp, offs in intervals:
+            frame_offs += [len(out) + off for off in offs]
+            out += comp
+    return bytes(out), frame_offs
+
+
+def huff_table(lengths: list) -> list | None:
+    """
+    解压用的查找表: 以接下来的16位为下标, 值为 (符号 << 5) | 码长; 码长全是0(没有用到的树)时返回 None
+    编码不完整或超出时报错(同 libmspack)
+    """
+    order = sorted((ln, sym) for sym, ln in enumerate(lengths) if ln)
+    if not order:
+        return None
+    table = [0] * 0x10000
+    code = prev_len = 0
+    for ln, sym in order:
+        code <<= ln - prev_len
+        prev_len = ln
+        span = 1 << (16 - ln)
+        if (code + 1) * span > 0x10000:
+            raise ValueError('LZX: Huffman 编码超出')
+        table[code * span:(code + 1) * span] = [(sym << 5) | ln] * span
+        code += 1
+    if code << (16 - prev_len) != 0x10000:
+        raise ValueError('LZX: Huffman 编码不完整')
+    return table
+
+
+class LzxDecoder:
+    """
+    解压一个复位区间, 用法: LzxDecoder(window_bits).decompress_interval(comp, out_len, out_pos)
+    verbatim, aligned offset, uncompressed 块及 E8 转换都支持, 不只用于 LzxEncoder 的输出
+    """
+
+    def __init__(self, window_bits=WINDOW_BITS):
+        assert window_bits in POSITION_SLOTS, f'{window_bits=}'
+        self.window_bits = window_bits
+        self.main_size = NUM_CHARS + POSITION_SLOTS[window_bits] * 8
+
+    def decompress_interval(self, comp: bytes, out_len: int, out_pos: int = 0) -> bytes:
+        """
+        :param comp: 一个复位区间的压缩数据
+        :param out_len: 解压后的长度
+        :param out_pos: 本区间在整个流中的位置, E8 转换要用
+        :return: 解压结果
+        """
+        # 位流按16位小端字, 字内从高位到低位; 把每个字的两个字节对调后, 位流就是按字节从高位到低位
+        src = bytes(comp) + b'\0' * (len(comp) & 1) + b'\0' * 4
+        sw = bytearray(len(src))
+        sw[0::2], sw[1::2] = src[1::2], src[0::2]
+        from_bytes = int.from_bytes
+        pos = 0  # 位流中的位置(位)
+
+        def bits(n: int) -> int:  # n <= 24
+            nonlocal pos
+            i = pos >> 3
+            val = (from_bytes(sw[i:i + 4], 'big') >> (32 - (pos & 7) - n)) & ((1 << n) - 1)
+            pos += n
+            return val
+
+        def sym(table: list) -> int:
+            nonlocal pos
+            i = pos >> 3
+            ent = table[(from_bytes(sw[i:i + 3], 'big') >> (8 - (pos & 7))) & 0xFFFF]
+            pos += ent & 31
+            return ent >> 5
+
+        def read_lens(lens: list, first: int, last: int):  # 码长按与上一块的差值编码, ref: _put_tree_lens
+            pre = huff_table([bits(4) for _ in range(PRETREE_SIZE)])
+            i = first
+            while i < last:
+                z = sym(pre)
+                if z == 17:
+                    n = bits(4) + 4
+                    lens[i:i + n] = [0] * n
+                elif z == 18:
+                    n = bits(5) + 20
+                    lens[i:i + n] = [0] * n
+                elif z == 19:
+                    n = bits(1) + 4
+                    lens[i:i + n] = [(lens[i] - sym(pre)) % 17] * n
+                else:
+                    lens[i] = (lens[i] - z) % 17
+                    n = 1
+                if i + n > last:
+                    raise ValueError('LZX: 码长超出')
+                i += n
+
+        out = bytearray()
+        result = bytearray()  # E8 转换后的结果, 窗口(out)中保持原样
+        main_lens, len_lens = [0] * self.main_size, [0] * LENGTH_TREE_SIZE
+        main_t = len_t = aligned_t = None
+        r0 = r1 = r2 = 1
+        intel_size = (bits(16) << 16 | bits(16)) if bits(1) else 0
+        intel_started = raw = False
+        block_type = block_len = block_rem = 0
+        while len(out) < out_len:
+            frame_start = len(out)
+            frame_end = min(frame_start + FRAME_SIZE, out_len)
+            while len(out) < frame_end:
+                if block_rem == 0:  # 新的块
+                    if raw and block_len & 1:
+                        pos += 8  # 奇数长度的 uncompressed 块后面有一个填充字节
+                    raw = False
+                    block_type = bits(3)
+                    block_len = block_rem = bits(16) << 8 | bits(8)
+                    if block_type == BLOCKTYPE_ALIGNED:
+                        aligned_t = huff_table([bits(3) for _ in range(ALIGNED_TREE_SIZE)])
+                    if block_type in (BLOCKTYPE_VERBATIM, BLOCKTYPE_ALIGNED):
+                        read_lens(main_lens, 0, NUM_CHARS)
+                        read_lens(main_lens, NUM_CHARS, self.main_size)
+                        main_t = huff_table(main_lens)
+                        read_lens(len_lens, 0, LENGTH_TREE_SIZE)
+                        len_t = huff_table(len_lens)
+                        intel_started |= main_lens[0xE8] != 0
+                    elif block_type == BLOCKTYPE_UNCOMPRESSED:
+                        intel_started = raw = True
+                        pos = pos + 16 if pos & 15 == 0 else (pos + 15) & ~15  # 跳过 1~16 位对齐
+                        r0, r1, r2 = struct.unpack_from('<III', src, pos >> 3)
+                        pos += 96
+                    else:
+                        raise ValueError(f'LZX: 块类型错误 {block_type}')
+                    if main_t is None and not raw:
+                        raise ValueError('LZX: 主树为空')
+                run = min(block_rem, frame_end - len(out))
+                block_rem -= run
+                if raw:
+                    i = pos >> 3
+                    out += src[i:i + run]
+                    pos += run * 8
+                    continue
+                target = len(out) + run
+                while len(out) < target:
+                    s = sym(main_t)
+                    if s < NUM_CHARS:
+                        out.append(s)
+                        continue
+                    s -= NUM_CHARS
+                    length = s & 7
+                    if length == NUM_PRIMARY_LENGTHS:
+                        length += sym(len_t)
+                    length += MIN_MATCH
+                    slot = s >> 3
+                    if slot > 2:
+                        extra = EXTRA_BITS[slot]
+                        off = POSITION_BASE[slot] - 2
+                        if block_type == BLOCKTYPE_ALIGNED and extra >= 3:
+                            if extra > 3:
+                                off += bits(extra - 3) << 3
+                            off += sym(aligned_t)
+                        elif extra:
+                            off += bits(extra)
+                        r2, r1, r0 = r1, r0, off
+                    elif slot == 0:
+                        off = r0
+                    elif slot == 1:
+                        off, r1 = r1, r0
+                        r0 = off
+                    else:
+                        off, r2 = r2, r0
+                        r0 = off
+                    start = len(out) - off
+                    if start < 0:
+                        raise ValueError('LZX: 匹配的偏移超出窗口')
+                    if off >= length:
+                        out += out[start:start + length]
+                    else:  # 与自身重叠, 即重复前面的 off 个字节
+                        out += (out[start:] * (length // off + 1))[:length]
+                if (over := len(out) - target) > 0:  # 最后一个匹配超出了 run
+                    if over > block_rem:
+                        raise ValueError('LZX: 匹配超出块')
+                    block_rem -= over
+            if len(out) != frame_end:
+                raise ValueError('LZX: 匹配超出帧')
+            frame = out[frame_start:frame_end]
+            if intel_started and intel_size and (out_pos + frame_start) // FRAME_SIZE < 32768 and len(frame) > 10:
+                _e8_decode(frame, out_pos + frame_start, intel_size)
+            result += frame
+            if not raw:
+                pos = (pos + 15) & ~15  # 帧结束, 对齐到16位
+        return bytes(result)
+
+
+def _e8_decode(frame: bytearray, cur_pos: int, intel_size: int):
+    """ 还原 E8 转换: call 指令(0xE8)后面的绝对地址改回相对地址, 就地修改 """
+    end = len(frame) - 10
+    i = frame.find(0xE8, 0, end)
+    while i != -1:
+        abs_off = int.from_bytes(frame[i + 1:i + 5], 'little', signed=True)
+        cur = cur_pos + i
+        if -cur <= abs_off < intel_size:
+            rel = abs_off - cur if abs_off >= 0 else abs_off + intel_size
+            frame[i + 1:i + 5] = (rel & 0xFFFFFFFF).to_bytes(4, 'little')
+        i = frame.find(0xE8, i + 5, end)
@@ -0,0 +1,87 @@
+"""npminify.py
+    nipow minify, 压缩输出的页面及 css, chm 更小, 编译及全文检索更快
+
+    html(处理后已编码的页面, ref: Html2Chm.finish_page_src):
+      去掉注释(IE 的条件注释 <!--[if ...]> 除外)
+      多个连续的空白变成一个(含换行的变成一个换行), 块级标签之间的空白去掉
+      去掉多余的属性: <link>, <style> 的 type="text/css", <script> 的 type="text/javascript"
+      <pre>, <textarea>, <script> 的内容保持原样, <style> 的内容按 css 压缩
+    css:
+      去掉注释, 多个空白变成一个, { } ; , > 前后及 : 后面的空白去掉, } 前面的 ; 去掉; 字符串保持原样
+
+    只在字节层面处理, 与解析页面的引擎(bs4, lxml)无关
+
+2026-10-18: created
+            注释与受保护的块(<pre> 等)由同一个正则依次匹配, 受保护块中的 <!-- 不再被当作注释删除, ref: minify_html
+"""
+import re
+
+# 块级(及不显示的)标签, 它们之间的空白不影响显示
+_BLOCK_TAGS = (rb'html|head|body|title|meta|link|base|div|section|article|aside|nav|header|footer|main|p|h[1-6]|hr|br|'
+               rb'pre|ul|ol|li|dl|dt|dd|table|caption|thead|tbody|tfoot|tr|td|th|col|colgroup|blockquote|figure|figcaption|'
+               rb'form|fieldset|legend|object|param|iframe|noscript|script|style')
+# 受保护的块(<pre> 等, 内容不动)或注释, 用一个正则依次匹配, 受保护块中的 <!-- 不会被当作注释, 注释也不会跨进受保护块
+_HTML_TOKEN_RE = re.compile(rb'(<(pre|textarea|script|style)\b[^>]*>)(.*?)(</\2\s*>)|<!--(?!\[if).*?-->', re.I | re.S)
+_BLOCK_GAP_RE = re.compile(rb'(</?(?:' + _BLOCK_TAGS + rb')\b[^>]*>)\s+(?=</?(?:' + _BLOCK_TAGS + rb')\b)', re.I)
+_SPACES_RE = re.compile(rb'[ \t\r\n\f]{2,}|[\t\r\f]')
+_TYPE_ATTR_RE = re.compile(rb'''(<(?:link|style|script)\b[^>]*?)\s+type\s*=\s*["']text/(?:css|javascript)["']''', re.I)
+
+_CSS_TOKEN_RE = re.compile(rb'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/''', re.S)  # 字符串, 注释
+_CSS_SPACE_RE = re.compile(rb'\s+')
+_CSS_PUNCT_RE = re.compile(rb' ?([{};,>]) ?')
+_CSS_COLON_RE = re.compile(rb': ')
+
+
+def _collapse_space(m: re.Match) -> bytes:
+    return b'\n' if b'\n' in m.group() else b' '
+
+
+def _minify_html_seg(seg: bytes) -> bytes:
+    """ 不含受保护内容(<pre> 等)及注释的一段 html """
+    seg = _TYPE_ATTR_RE.sub(rb'\1', seg)
+    seg = _BLOCK_GAP_RE.sub(rb'\1', seg)
+    return _SPACES_RE.sub(_collapse_space, seg)
+
+
+def minify_html(src: bytes) -> bytes:
+    """ 压缩已编码的 html 页面, ref: 模块说明 """
+    parts = []
+    seg = []  # 两个受保护块之间的部分, 注释去掉
+    pos = 0
+    for m in _HTML_TOKEN_RE.finditer(src):
+        seg.append(src[pos:m.start()])
+        pos = m.end()
+        if m.group(1) is None:  # 注释
+            continue
+        seg.append(m.group(1))  # 开始标签本身也压缩
+        parts.append(_minify_html_seg(b''.join(seg)))
+        parts.append(minify_css(m.group(3)) if m.group(2).lower() == b'style' else m.group(3))
+        seg = [m.group(4)]
+    seg.append(src[pos:])
+    parts.append(_minify_html_seg(b''.join(seg)))
+    return b''.join(parts)
+
+
+def _minify_css_seg(seg: bytes) -> bytes:
+    """ 不含字符串, 注释的一段 css """
+    seg = _CSS_SPACE_RE.sub(b' ', seg)
+    seg = _CSS_PUNCT_RE.sub(rb'\1', seg)
+    return _CSS_COLON_RE.sub(b':', seg).replace(b';}', b'}')
+
+
+def minify_css(src: bytes) -> bytes:
+    """ 压缩 css, ref: 模块说明 """
+    parts = []
+    seg = []  # 两个字符串之间的部分, 注释相当于空白
+    pos = 0
+    for m in _CSS_TOKEN_RE.finditer(src):
+        seg.append(src[pos:m.start()])
+        if m.group(1):  # 字符串保持原样
+            parts += [_minify_css_seg(b''.join(seg)), m.group(1)]
+            seg = []
+        else:
+            seg.append(b' ')
+        pos = m.end()
+    seg.append(src[pos:])
+    parts.append(_minify_css_seg(b''.join(seg)))
+    return b''.join(parts).strip()
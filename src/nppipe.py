@@ -0,0 +1,167 @@
+"""nppipe.py
+    nipow page pipeline, 页面的读取, 转换, 写出三个阶段流水线执行, 磁盘(或网络存储)的读写与转换同时进行
+
+      读取: 一个线程, 按顺序读取(zip 或文件), 放入有界队列
+      转换: 一个调度线程, 从队列中取出交给执行器(进程池或线程池; 没有时在调度线程中直接转换),
+            同时在执行的最多 queue_size 个, 按原来的顺序把结果放入写出队列
+      写出: 调用 run 的线程
+    队列满时上一阶段等待(背压), 内存占用有上限; 各阶段统计处理的个数, 字节数, 忙碌及等待的时间, ref: stats
+
+    用法:
+        pipe = PagePipeline(read_fn, write_fn, queue_size=16)
+        results = pipe.run(items, transform_fn, executor)
+        pipe.stats()
+
+2026-10-18: created
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+_END = object()  # 队列结束的标记
+
+
+class StageCounter:
+    """ 一个阶段的统计 """
+    __slots__ = ('items', 'bytes', 'busy', 'wait')
+
+    def __init__(self):
+        self.items = 0  # 处理的个数
+        self.bytes = 0  # 处理的字节数
+        self.busy = 0.0  # 处理用的时间(秒), 转换交给执行器时包括等待结果的时间
+        self.wait = 0.0  # 等待的时间(秒): 读取, 转换等下一阶段(队列满, 背压), 写出等上一阶段(队列空)
+
+    def as_dict(self) -> dict:
+        return {'items': self.items, 'bytes': self.bytes, 'busy': round(self.busy, 4), 'wait': round(self.wait, 4),
+                'items_per_sec': round(self.items / self.busy, 1) if self.busy else 0,
+                'mb_per_sec': round(self.bytes / self.busy / 1e6, 2) if self.busy else 0}
+
+
+class PagePipeline:
+    def __init__(self, read_fn, write_fn, queue_size=16):
+        """
+        :param read_fn: read_fn(item) -> bytes, 读取
+        :param write_fn: write_fn(item, out: bytes), 写出
+        :param queue_size: 各队列的长度, 也是同时转换的最多个数
+        """
+        self.read_fn = read_fn
+        self.write_fn = write_fn
+        self.queue_size = queue_size
+        self.counters = {'read': StageCounter(), 'transform': StageCounter(), 'write': StageCounter()}
+        self.wall = 0.0  # 各次 run 的总时间
+
+    @staticmethod
+    def _put(q: queue.Queue, val, counter: StageCounter, stop: threading.Event) -> bool:
+        """ 放入队列, 满时等待; 写出阶段出错(stop)时放弃, 返回 False """
+        t0 = time.perf_counter()
+        while not stop.is_set():
+            try:
+                q.put(val, timeout=0.1)
+                counter.wait += time.perf_counter() - t0
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    @staticmethod
+    def _get(q: queue.Queue, stop: threading.Event):
+        """ 从队列中取出, 空时等待; 写出阶段出错(stop)时返回 _END """
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _END
+
+    def _reader(self, items, read_q, stop):
+        counter = self.counters['read']
+        try:
+            for item in items:
+                t0 = time.perf_counter()
+                src = self.read_fn(item)
+                counter.busy += time.perf_counter() - t0
+                counter.items += 1
+                counter.bytes += len(src)
+                if not self._put(read_q, (item, src), counter, stop):
+                    return
+            self._put(read_q, _END, counter, stop)
+        except BaseException as e:
+            self._put(read_q, e, counter, stop)
+
+    def _transformer(self, transform_fn, executor, read_q, write_q, stop):
+        counter = self.counters['transform']
+        pending = deque()  # (item, future 或结果), 按读取的顺序
+
+        def flush_one() -> bool:
+            item, fut = pending.popleft()
+            if executor is not None:
+                t0 = time.perf_counter()
+                fut = fut.result()
+                counter.busy += time.perf_counter() - t0  # 等执行器的结果也算转换阶段忙碌
+            counter.bytes += len(fut[0])
+            return self._put(write_q, (item, fut), counter, stop)
+
+        try:
+            while (val := self._get(read_q, stop)) is not _END:
+                if isinstance(val, BaseException):
+                    raise val
+                item, src = val
+                t0 = time.perf_counter()
+                pending.append((item, transform_fn(src) if executor is None else executor.submit(transform_fn, src)))
+                counter.busy += time.perf_counter() - t0
+                counter.items += 1
+                while len(pending) >= self.queue_size or (executor is None and pending):
+                    if not flush_one():
+                        return
+            while pending:
+                if not flush_one():
+                    return
+            self._put(write_q, _END, counter, stop)
+        except BaseException as e:
+            self._put(write_q, e, counter, stop)
+
+    def run(self, items, transform_fn, executor=None) -> list:
+        """
+        :param items: 要处理的条目, 传给 read_fn, write_fn
+        :param transform_fn: transform_fn(src: bytes) -> (out: bytes, result), 交给执行器时要能 pickle
+        :param executor: concurrent.futures 的执行器, None: 在调度线程中直接转换
+        :return: 各条目的 result, 与 items 一一对应
+        """
+        t_run = time.perf_counter()
+        read_q, write_q = queue.Queue(self.queue_size), queue.Queue(self.queue_size)
+        stop = threading.Event()
+        threads = [threading.Thread(target=self._reader, args=(items, read_q, stop), daemon=True),
+                   threading.Thread(target=self._transformer, args=(transform_fn, executor, read_q, write_q, stop),
+                                    daemon=True)]
+        for th in threads:
+            th.start()
+        counter = self.counters['write']
+        results = []
+        try:
+            while True:
+                t0 = time.perf_counter()
+                val = write_q.get()
+                counter.wait += time.perf_counter() - t0
+                if val is _END:
+                    break
+                if isinstance(val, BaseException):
+                    raise val
+                item, (out, result) = val
+                t0 = time.perf_counter()
+                self.write_fn(item, out)
+                counter.busy += time.perf_counter() - t0
+                counter.items += 1
+                counter.bytes += len(out)
+                results.append(result)
+        finally:
+            stop.set()
+            for th in threads:
+                th.join()
+            self.wall += time.perf_counter() - t_run
+        return results
+
+    def stats(self) -> dict:
+        """ 各阶段的统计, 及总时间 """
+        return {'wall': round(self.wall, 4), 'queue_size': self.queue_size,
+                **{name: counter.as_dict() for name, counter in self.counters.items()}}
@@ -0,0 +1,144 @@
+"""npprof.py
+    nipow build profiler, 构建过程各阶段的耗时与内存统计, 生成 json 报告
+
+    每个阶段记录:
+      wall:  墙钟时间(秒)
+      cpu:   本进程的 CPU 时间(秒, user + system)
+      cpu_children: 已结束的子进程(进程池的工作进程)的 CPU 时间, Windows 下总为 0
+      peak_rss: 阶段结束时本进程的峰值内存(KB), 是整个进程生命期内的最大值, 只增不减
+      tracemalloc_peak: 阶段内 Python 对象分配的峰值(KB), 只有 trace_mem 为 True 时才有, 开启后会明显变慢
+    另外记录每个页面的转换耗时(在工作进程中测得), 报告中给出最慢的 top_n 个页面,
+    用于对比不同文档版本(或不同代码版本)的构建, 发现性能退化
+
+    用法:
+        prof = BuildProfiler()
+        with prof.stage('adjust_files'):
+            h2c.adjust_files()
+        prof.write_report('build_report.json', doc_ver='3.11.9')
+
+2026-10-18: created
+            增加 add_counters, 报告中附加其它统计(如页面流水线各阶段的吞吐量)
+            各阶段处理的页面数, 缓存命中数记在阶段的 counts 中, 阶段结束时写一行日志, 代替逐页的日志
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from nipow import applog
+
+
+def peak_rss() -> int | None:
+    """ 本进程的峰值内存(KB), 取不到时返回 None """
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        get_info = ctypes.windll.psapi.GetProcessMemoryInfo
+        get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+        if not get_info(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize // 1024
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss  # macOS 下单位是字节
+
+
+def _secs(t: float) -> float:
+    return round(t, 4) or 0.0  # 避免 -0.0
+
+
+class BuildProfiler:
+    def __init__(self, top_n=20, trace_mem=False):
+        """
+        :param top_n: 报告中列出最慢的多少个页面
+        :param trace_mem: 是否用 tracemalloc 统计各阶段的分配峰值
+        """
+        self.top_n = top_n
+        self.trace_mem = trace_mem
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.stages = []  # 各阶段的统计, 按执行顺序
+        self.pages = {}  # 页面 -> (转换耗时, 缓存是否命中)
+        self.counters = {}  # 名字 -> 其它统计, ref: add_counters
+        self._counts = {}  # 当前阶段的计数, ref: count
+
+    @contextmanager
+    def stage(self, name):
+        """ 统计 with 块内一个阶段的耗时与内存 """
+        if self.trace_mem:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+        t0, tms0 = time.perf_counter(), os.times()
+        outer, self._counts = self._counts, {}
+        try:
+            yield self
+        finally:
+            counts, self._counts = self._counts, outer
+            tms = os.times()
+            rec = {'name': name,
+                   'wall': _secs(time.perf_counter() - t0),
+                   'cpu': _secs(tms.user + tms.system - tms0.user - tms0.system),
+                   'cpu_children': _secs(tms.children_user + tms.children_system
+                                         - tms0.children_user - tms0.children_system),
+                   'peak_rss': peak_rss()}
+            if self.trace_mem:
+                rec['tracemalloc_peak'] = tracemalloc.get_traced_memory()[1] // 1024
+            if counts:
+                rec['counts'] = counts
+            self.stages.append(rec)
+            applog.info('%s: %.3fs, %s', name, rec['wall'], counts)
+
+    def add_page(self, page: str, secs: float, hit=None):
+        """ 登记一个页面的转换耗时, hit: 增量构建缓存是否命中, None 表示没有使用缓存 """
+        self.pages[page] = (secs, hit)
+        self.count('pages')
+        if hit:
+            self.count('cache_hits')
+
+    def count(self, name, n=1):
+        """ 当前阶段的计数加 n, 阶段结束时记到阶段的 counts 中 """
+        self._counts[name] = self._counts.get(name, 0) + n
+
+    def add_counters(self, name, counters: dict):
+        """ 附加一组统计, 如 io_pipeline: PagePipeline.stats() """
+        self.counters[name] = counters
+
+    def report(self, **info) -> dict:
+        """
+        :param info: 附加到报告中的信息, 如 doc_ver, engine, workers
+        """
+        secs = [s for s, _ in self.pages.values()]
+        slowest = sorted(self.pages.items(), key=lambda kv: kv[1][0], reverse=True)[:self.top_n]
+        return {'started': self.started,
+                **info,
+                'total_wall': _secs(sum(s['wall'] for s in self.stages)),
+                'stages': self.stages,
+                'pages': {'count': len(secs),
+                          'total': _secs(sum(secs)),
+                          'mean': round(sum(secs) / len(secs), 6) if secs else 0,
+                          'cache_hits': sum(hit is True for _, hit in self.pages.values()),
+                          'slowest': [{'page': page, 'secs': round(s, 6), 'hit': hit} for page, (s, hit) in slowest]},
+                'counters': self.counters}
+
+    def write_report(self, fn, **info) -> dict:
+        """ 生成报告并写到 json 文件 fn, ref: report """
+        rpt = self.report(**info)
+        with open(fn, 'w', encoding='utf-8') as f:
+            json.dump(rpt, f, ensure_ascii=False, indent=2)
+        return rpt
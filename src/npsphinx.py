@@ -0,0 +1,176 @@
+"""npsphinx.py
+    nipow Sphinx doc profiles, 各版本 python 文档(由 Sphinx 生成)的页面规则
+
+    页面公共调整要删除的元素(导航条, 侧栏, 页脚, 标题后的 ¶ 等), 目录提取用的选择器, chm 的一级目录, 要删除的零散文件,
+    都与文档的版本(Sphinx 及 python-docs-theme 的版本)有关, 按版本区间整理成 DocProfile, 由 get_profile(doc_ver) 选取.
+    规则在每个进程中只编译一次:
+      lxml 引擎: 编译成 XPath, ref: DocProfile.xp, apply_lx
+      bs4 引擎: 编译成按标签名分组的匹配表, 一次遍历就找出所有要删除的元素, 不再每条规则 find_all 一遍, ref: apply_bs4
+
+    目前只有两个配置: PY39(3.9 ~ 3.11), PY312(3.12 起, 一级目录多了 Deprecations 一章), 删除规则共用;
+    规则是按 3.11.9 的页面整理核对的, 其它版本只在合成的文档(bench\gen_sphinx_docs.py)上跑过, 没有逐个分支核对;
+    找不到的元素什么也不做, 一级目录的页面不存在时跳过并记录警告, ref: Html2Chm.gen_hhc_file
+
+2026-10-18: created
+"""
+from collections import namedtuple
+import bs4
+from lxml import etree
+from packaging.version import Version
+from nphtml import lx_class_xpath
+
+# 选择器: 与 bs4 的 find_all(tag, class_=class_, attrs=dict(attrs)) 的匹配规则一致, first: 只取第一个
+Selector = namedtuple('Selector', 'tag class_ attrs first', defaults=((), False))
+
+
+def bs4_match(tag: bs4.Tag, sel: Selector) -> bool:
+    """ tag(名字已相同)是否与选择器匹配, 规则同 bs4: class_ 含空格时匹配整个 class 串, 否则匹配其中的任一个类名 """
+    if (cls := tag.get('class')) is None:
+        return False
+    if ' ' in sel.class_:
+        if ' '.join(cls) != sel.class_:
+            return False
+    elif sel.class_ not in cls:
+        return False
+    return all(tag.get(attr) == val for attr, val in sel.attrs)
+
+
+class DocProfile:
+    def __init__(self, name, since: str, removals: tuple, selectors: dict, chapters: tuple, junk: tuple):
+        """
+        :param name: 名字, 也用在页面任务的参数中, ref: get_profile_by_name
+        :param since: 适用的最低文档版本
+        :param removals: 页面公共调整时按顺序执行的 (动作, Selector): 'drop': 删除(保留后面的文本), 'unwrap': 脱掉标签
+        :param selectors: 名字 -> Selector, 目录提取等使用
+        :param chapters: chm 中用下级目录展开的一级目录 (名字, href), ref: Html2Chm.gen_hhc_file
+        :param junk: 制作chm不再需要的零散文件, ref: Html2Chm.adjust_files
+        """
+        self.name = name
+        self.since = Version(since)
+        self.removals = removals
+        self.selectors = selectors
+        self.chapters = chapters
+        self.junk = junk
+        self._lx = None  # 名字 -> XPath, ref: xp
+        self._lx_removals = None  # [(动作, XPath), ...]
+        self._bs4_names = None  # removals 涉及的标签名
+        self._bs4_table = None  # 标签名 -> [(removals 中的序号, Selector), ...]
+
+    def derive(self, name, since: str, **changes) -> 'DocProfile':
+        """ 以本配置为基础, 改变其中的一些, 生成新版本区间的配置 """
+        args = dict(removals=self.removals, selectors=self.selectors, chapters=self.chapters, junk=self.junk)
+        args.update(changes)
+        return DocProfile(name, since, **args)
+
+    @staticmethod
+    def _xpath(sel: Selector) -> etree.XPath:
+        extra = ''.join(f'[@{attr}="{val}"]' for attr, val in sel.attrs) + ('[1]' if sel.first else '')
+        return lx_class_xpath(sel.tag, sel.class_, extra)
+
+    def xp(self, name) -> etree.XPath:
+        """ 选择器编译成的 XPath(lxml 引擎) """
+        if self._lx is None:
+            self._lx = {key: self._xpath(sel) for key, sel in self.selectors.items()}
+        return self._lx[name]
+
+    def find(self, tag: bs4.Tag, name):
+        """ bs4 引擎: 按选择器查找第一个 """
+        sel = self.selectors[name]
+        return tag.find(sel.tag, attrs=dict(sel.attrs), class_=sel.class_)
+
+    def find_all(self, tag: bs4.Tag, name) -> list:
+        """ bs4 引擎: 按选择器查找全部 """
+        sel = self.selectors[name]
+        return tag.find_all(sel.tag, attrs=dict(sel.attrs), class_=sel.class_, limit=1 if sel.first else None)
+
+    def apply_lx(self, body: etree._Element):
+        """ lxml 引擎: 按顺序执行 removals """
+        if self._lx_removals is None:
+            self._lx_removals = [(action, self._xpath(sel)) for action, sel in self.removals]
+        for action, xpath in self._lx_removals:
+            for el in xpath(body):
+                if action == 'unwrap':
+                    el.drop_tag()
+                else:
+                    el.drop_tree()  # drop_tree 保留后面的文本(tail)
+
+    def apply_bs4(self, body: bs4.Tag):
+        """
+        bs4 引擎: 执行 removals, 结果与按顺序逐条 find/find_all 再删除相同:
+        一次遍历找出各条规则匹配的元素, 再按规则的顺序处理, 已随上级一起删除了的跳过
+        """
+        if self._bs4_table is None:
+            self._bs4_table = {}
+            for idx, (_, sel) in enumerate(self.removals):
+                self._bs4_table.setdefault(sel.tag, []).append((idx, sel))
+            self._bs4_names = list(self._bs4_table)
+        found = [[] for _ in self.removals]
+        for tag in body.find_all(self._bs4_names):
+            for idx, sel in self._bs4_table[tag.name]:
+                if bs4_match(tag, sel):
+                    found[idx].append(tag)
+        for (action, sel), tags in zip(self.removals, found):
+            for tag in tags:
+                if tag.decomposed:
+                    continue
+                if action == 'unwrap':
+                    tag.unwrap()
+                else:
+                    tag.decompose()
+                if sel.first:
+                    break
+
+
+_BASE_CHAPTERS = (
+    ('What’s new', 'whatsnew/index.html'),
+    ('Setup and usage', 'using/index.html'),
+    ('Tutorial', 'tutorial/index.html'),
+    ('Language reference', 'reference/index.html'),
+    ('Library reference', 'library/index.html'),
+    ('Installing modules', 'installing/index.html'),
+    ('Extending and embedding', 'extending/index.html'),
+    ('Python/C API', 'c-api/index.html'),
+    ('HOWTOs', 'howto/index.html'),
+    ('FAQs', 'faq/index.html'),
+)
+
+PY39 = DocProfile(
+    'py3.9', '3.9',
+    removals=(
+        ('drop', Selector('div', 'mobile-nav', first=True)),  # 窄屏的导航条, 3.11 起才有
+        ('drop', Selector('div', 'related', (('role', 'navigation'),))),  # 上下两个导航条
+        ('unwrap', Selector('div', 'bodywrapper', first=True)),
+        ('drop', Selector('div', 'sphinxsidebar', first=True)),
+        ('drop', Selector('div', 'footer', first=True)),
+        ('drop', Selector('a', 'headerlink')),  # 各级标题后面的锚点, 显示为 ¶
+    ),
+    selectors={
+        'toctree': Selector('div', 'toctree-wrapper compound', first=True),
+        'toctree-l1': Selector('li', 'toctree-l1'),
+        'ssb-wrapper': Selector('div', 'sphinxsidebarwrapper', first=True),
+        'bm-title': Selector('a', 'reference internal', (('href', '#'),), first=True),
+        'ref-internal': Selector('a', 'reference internal', first=True),
+        'modindex-jumpbox': Selector('div', 'modindex-jumpbox', first=True),
+    },
+    chapters=_BASE_CHAPTERS,
+    junk=('_static/glossary.json', '_static/opensearch.xml', '.buildinfo', 'objects.inv', 'search.html',
+          'searchindex.js'),
+)
+
+PY312 = PY39.derive('py3.12', '3.12', chapters=_BASE_CHAPTERS + (('Deprecations', 'deprecations/index.html'),))
+
+DOC_PROFILES = {prof.name: prof for prof in sorted((PY39, PY312), key=lambda prof: prof.since)}
+
+
+def get_profile(doc_ver: Version) -> DocProfile:
+    """ 文档版本适用的配置: since 不超过 doc_ver 的最后一个; 比所有的都旧时用最旧的 """
+    chosen = None
+    for prof in DOC_PROFILES.values():
+        if prof.since <= doc_ver:
+            chosen = prof
+    return chosen or next(iter(DOC_PROFILES.values()))
+
+
+def get_profile_by_name(name) -> DocProfile:
+    """ 按名字取配置, 进程池中的页面任务用, 编译结果在各进程中缓存在配置对象上 """
+    return DOC_PROFILES[name]